@@ -0,0 +1,338 @@
+# 命令行入口，不依赖 Qt，可在无界面的服务器上运行
+import os
+import sys
+import json
+import queue
+import argparse
+import threading
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, project_root)
+
+from service.daemon import IngestDaemon, DEFAULT_HOST, DEFAULT_PORT
+from service.hot_folder import DEFAULT_POLL_INTERVAL
+from service.job_runner import run_job
+from service.segment_worker import SegmentWorker
+from service.task_queue import DEFAULT_LEASE_SECONDS
+from service.coordinator import DEFAULT_DISTRIBUTED_SEGMENT_SECONDS
+from utils.process_utils import popen_hidden, kill_process_tree
+from utils.resource_governor import ResourceLimits
+from service.scheduler import normalize_options
+from processors.video_processor import PIXEL_MODE_BGR8, PIXEL_MODE_NATIVE
+from processors.audio_splicer import AUDIO_MODES, AUDIO_MODE_PCM
+from processors.video_analyzer import VideoProbe
+from processors.ffmpeg_engine import is_high_bit_depth
+from processors.stream_processor import StreamProcessor, StreamCancelled, STREAM_FORMAT_MP4, STREAM_FORMAT_MPEGTS
+from processors.deletion_planner import new_seed
+from processors.cost_estimator import CostEstimator, format_estimate, DEFAULT_SAMPLE_COUNT, DEFAULT_SAMPLE_SECONDS
+from utils.file_utils import get_output_path
+from utils.logging_setup import (setup_logging, parse_level, parse_module_levels, DEFAULT_LOG_MAX_BYTES,
+                                 DEFAULT_LOG_BACKUP_COUNT)
+
+
+def add_processing_arguments(parser):
+    parser.add_argument('--interval', default='1-3', help='删除间隔范围（秒），例如 1-3')
+    parser.add_argument('--delete-frames', type=int, default=1, help='每次删除的帧数（1-30）')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子，相同种子得到相同的删除计划')
+    parser.add_argument('--reuse-seed', action='store_true',
+                        help='未指定种子时沿用上次处理同一文件的种子，删除计划不变，已渲染的分段可以复用')
+    parser.add_argument('--pixel-mode', choices=(PIXEL_MODE_BGR8, PIXEL_MODE_NATIVE), default=PIXEL_MODE_BGR8,
+                        help='像素处理模式')
+    parser.add_argument('--rendition', action='append', default=[], metavar='高度:码率k[:profile]',
+                        help='额外输出的分辨率档位，可重复，例如 --rendition 720:2500k:main --rendition 480:1000k')
+    parser.add_argument('--content-aware', action='store_true',
+                        help='先做一遍低分辨率画面变化分析（结果按文件缓存），在选中的秒内优先删除低运动帧')
+    parser.add_argument('--audio-mode', choices=AUDIO_MODES, default=AUDIO_MODE_PCM,
+                        help='音频处理方式：pcm 解码后切分并重新编码；copy 整包删除压缩音频并直接复制，'
+                             '音画偏差不超过半个音频帧，不支持的编码自动退回 pcm')
+    parser.add_argument('--transform', action='append', default=[], metavar='名称[:参数=值,...]',
+                        help='逐帧变换，可重复，按顺序执行，例如 --transform noise:strength=3 --transform jitter:amount=0.02 '
+                             '--transform watermark:text=demo,opacity=0.3；也可以是插件类的完整路径')
+    parser.add_argument('--range', action='append', default=[], metavar='开始-结束',
+                        help='只处理并输出指定的时间范围，可重复，按时间顺序拼接，例如 --range 1:00-2:30 --range 600-；'
+                             '时间为秒数或 [时:]分:秒，结束留空表示到视频末尾')
+    parser.add_argument('--queue-depth', type=int, default=None,
+                        help='解码与编码之间缓存的帧数，4K 等大分辨率下调小可限制内存；同时指定内存预算时取两者中较小的值')
+    add_resource_arguments(parser)
+
+
+def add_resource_arguments(parser):
+    parser.add_argument('--max-threads', type=int, default=None, help='每个任务的线程上限（OpenCV、解码器和 ffmpeg）')
+    parser.add_argument('--nice', type=int, default=None, help='处理线程和 ffmpeg 子进程的 nice 值')
+    parser.add_argument('--memory-budget', type=int, default=None, help='每个任务的内存预算（MB），决定帧队列和音频分块大小')
+
+
+def resource_limits(args):
+    return ResourceLimits(args.max_threads, args.nice, args.memory_budget)
+
+
+def processing_options(args):
+    return normalize_options({
+        'interval_range': args.interval,
+        'delete_frames': args.delete_frames,
+        'seed': args.seed,
+        'pixel_mode': args.pixel_mode,
+        'resources': resource_limits(args).to_dict(),
+        'renditions': args.rendition,
+        'content_aware': args.content_aware,
+        'audio_mode': args.audio_mode,
+        'transforms': args.transform,
+        'time_ranges': args.range,
+        'queue_depth': args.queue_depth,
+        'reuse_seed': args.reuse_seed,
+    })
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='随机删帧视频处理（命令行）')
+    parser.add_argument('--log-level', default='INFO', help='日志级别')
+    parser.add_argument('--log-modules', default='', help='按模块设置日志级别，例如 processors=DEBUG,service.http_api=WARNING')
+    parser.add_argument('--log-file', default=None, help='日志文件，按大小滚动；不指定时输出到终端')
+    parser.add_argument('--log-max-bytes', type=int, default=DEFAULT_LOG_MAX_BYTES, help='单个日志文件的大小上限（字节）')
+    parser.add_argument('--log-backups', type=int, default=DEFAULT_LOG_BACKUP_COUNT, help='保留的历史日志文件数')
+    parser.add_argument('--log-json', action='store_true', help='以 JSON Lines 格式输出日志')
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve = subparsers.add_parser('serve', help='监视输入目录并提供本地 HTTP 任务接口')
+    serve.add_argument('watch_dir', help='输入目录')
+    serve.add_argument('done_dir', help='输出和报告目录')
+    serve.add_argument('--work-dir', default=None, help='处理中间文件目录，默认为完成目录下的 .work')
+    serve.add_argument('--workers', type=int, default=None, help='并发任务数，默认根据 CPU 和内存自动设置')
+    serve.add_argument('--host', default=DEFAULT_HOST, help='HTTP 接口监听地址')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help='HTTP 接口端口')
+    serve.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL, help='定时扫描间隔（秒）')
+    serve.add_argument('--no-inotify', action='store_true', help='不使用 inotify，始终定时扫描')
+    add_processing_arguments(serve)
+
+    process = subparsers.add_parser('process', help='处理单个视频文件')
+    process.add_argument('input_path', help='输入视频')
+    process.add_argument('-o', '--output', default=None, help='输出路径，默认为 <输入>_processed')
+    add_processing_arguments(process)
+
+    estimate = subparsers.add_parser('estimate', help='采样编码几个短窗口，估算处理时间、输出大小和临时空间')
+    estimate.add_argument('input_path', help='输入视频')
+    estimate.add_argument('--samples', type=int, default=DEFAULT_SAMPLE_COUNT, help='采样窗口数')
+    estimate.add_argument('--sample-seconds', type=float, default=DEFAULT_SAMPLE_SECONDS, help='每个采样窗口的秒数')
+    estimate.add_argument('--json', action='store_true', help='以 JSON 输出估算结果')
+    add_processing_arguments(estimate)
+
+    stream = subparsers.add_parser('stream', help='从标准输入或 FIFO 流式读取，边删帧边输出分片 MP4 或 MPEG-TS')
+    stream.add_argument('input_path', help='输入：- 表示标准输入，或 FIFO 路径')
+    stream.add_argument('-o', '--output', default='-', help='输出：- 表示标准输出（默认），或 FIFO/文件路径')
+    stream.add_argument('--format', choices=(STREAM_FORMAT_MP4, STREAM_FORMAT_MPEGTS), default=STREAM_FORMAT_MP4,
+                        help='输出封装格式')
+    stream.add_argument('--interval', default='1-3', help='删除间隔范围（秒），例如 1-3')
+    stream.add_argument('--delete-frames', type=int, default=1, help='每次删除的帧数（1-30）')
+    stream.add_argument('--seed', type=int, default=None, help='随机种子，相同种子得到相同的删除计划')
+    add_resource_arguments(stream)
+
+    distribute = subparsers.add_parser('distribute', help='作为协调节点，把分段发布给工作节点并合成输出')
+    distribute.add_argument('input_path', help='输入视频（所有节点可访问的共享路径）')
+    distribute.add_argument('-o', '--output', default=None, help='输出路径，默认为 <输入>_processed')
+    distribute.add_argument('--queue', default=None, help='共享任务队列数据库，默认位于输出目录')
+    distribute.add_argument('--segment-seconds', type=int, default=DEFAULT_DISTRIBUTED_SEGMENT_SECONDS,
+                            help='每个分段的目标秒数，边界对齐到关键帧')
+    distribute.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS, help='任务租约秒数')
+    distribute.add_argument('--local-workers', type=int, default=0, help='同时在本机启动的工作节点数量')
+    add_processing_arguments(distribute)
+
+    worker = subparsers.add_parser('worker', help='作为工作节点，从共享队列领取并渲染分段')
+    worker.add_argument('--queue', required=True, help='共享任务队列数据库')
+    worker.add_argument('--worker-id', default=None, help='工作节点标识，默认为 主机名-进程号')
+    worker.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS, help='任务租约秒数')
+    worker.add_argument('--idle-exit', type=float, default=None, help='连续空闲多少秒后退出，默认一直运行')
+    add_resource_arguments(worker)
+    return parser
+
+
+def command_serve(args):
+    daemon = IngestDaemon(
+        args.watch_dir,
+        args.done_dir,
+        processing_options(args),
+        workers=args.workers,
+        host=args.host,
+        port=args.port,
+        poll_interval=args.poll_interval,
+        work_dir=args.work_dir,
+        use_inotify=not args.no_inotify
+    )
+    daemon.run()
+    return 0
+
+
+def command_process(args):
+    spec = {
+        "job_id": "cli",
+        "input_path": os.path.abspath(args.input_path),
+        "output_path": os.path.abspath(args.output or get_output_path(args.input_path)),
+        "options": processing_options(args),
+    }
+    return run_spec_in_console(spec)
+
+
+def command_estimate(args):
+    options = processing_options(args)
+    video_info = VideoProbe(args.input_path).analyze()
+    pixel_mode = options['pixel_mode']
+    if is_high_bit_depth(video_info.get('video_stream_info', {}).get('pix_fmt')):
+        pixel_mode = PIXEL_MODE_NATIVE
+    estimator = CostEstimator(
+        os.path.abspath(args.input_path), video_info, options['interval_range'], options['delete_frames'],
+        pixel_mode=pixel_mode, resources=ResourceLimits.from_dict(options['resources']),
+        sample_count=args.samples, sample_seconds=args.sample_seconds, time_ranges=options['time_ranges']
+    )
+    result = estimator.estimate()
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_estimate(result))
+    return 0
+
+
+def command_stream(args):
+    # 标准输出用于视频数据，进度和结果只写到标准错误
+    options = normalize_options({
+        'interval_range': args.interval,
+        'delete_frames': args.delete_frames,
+        'seed': args.seed,
+        'resources': resource_limits(args).to_dict(),
+    })
+    seed = options['seed'] if options['seed'] is not None else new_seed()
+    processor = StreamProcessor(args.input_path, args.output, options['interval_range'], options['delete_frames'],
+                                seed, stream_format=args.format,
+                                resources=ResourceLimits.from_dict(options['resources']))
+    try:
+        stats = processor.run()
+    except (KeyboardInterrupt, StreamCancelled):
+        processor.stop()
+        print("流式处理已取消", file=sys.stderr)
+        return 1
+    except IOError as e:
+        print(f"流式处理失败: {str(e)}", file=sys.stderr)
+        return 1
+    print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
+    return 0
+
+
+def worker_log_arguments(args):
+    # 本机工作节点沿用协调节点的日志设置，但输出到终端，多个进程不能滚动同一个日志文件
+    arguments = ['--log-level', args.log_level]
+    if args.log_modules:
+        arguments += ['--log-modules', args.log_modules]
+    if args.log_json:
+        arguments.append('--log-json')
+    return arguments
+
+
+def command_distribute(args):
+    output_path = os.path.abspath(args.output or get_output_path(args.input_path))
+    queue_path = os.path.abspath(args.queue or output_path.rsplit('.', 1)[0] + '_tasks.db')
+    spec = {
+        "job_id": "distribute",
+        "input_path": os.path.abspath(args.input_path),
+        "output_path": output_path,
+        "options": processing_options(args),
+        "distributed": {
+            "queue_path": queue_path,
+            "lease_seconds": args.lease,
+            "segment_seconds": args.segment_seconds,
+        },
+    }
+    # 本机工作节点用于单机测试或与远程节点一起分担任务
+    workers = [
+        popen_hidden([sys.executable, os.path.abspath(__file__), *worker_log_arguments(args), 'worker',
+                      '--queue', queue_path, '--lease', str(args.lease), '--worker-id', f"local-{index + 1}"])
+        for index in range(args.local_workers)
+    ]
+    try:
+        return run_spec_in_console(spec)
+    finally:
+        for process in workers:
+            kill_process_tree(process)
+
+
+def command_worker(args):
+    worker = SegmentWorker(args.queue, worker_id=args.worker_id, lease_seconds=args.lease, idle_exit=args.idle_exit,
+                           resources=resource_limits(args))
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+    return 0
+
+
+def run_spec_in_console(spec):
+    events = queue.Queue()
+
+    def print_events():
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            if event["type"] == "progress":
+                print(f"\r{event['stage']}: {event['percent']}%", end='', flush=True)
+            elif event["type"] == "info":
+                print(f"\n{event['message']}")
+
+    printer = threading.Thread(target=print_events, daemon=True)
+    printer.start()
+    cancel_event = threading.Event()
+    outcome = {}
+    finished = threading.Event()
+
+    def work():
+        try:
+            outcome.update(run_job(spec, events, cancel_event))
+        finally:
+            finished.set()
+
+    # 处理在工作线程中运行，主线程保持响应 Ctrl+C 并转为取消
+    # 用事件等待而不是 join：被 Ctrl+C 中断的 join 会把仍在运行的线程当作已结束，任务来不及清理
+    worker = threading.Thread(target=work, daemon=True)
+    worker.start()
+    try:
+        while not finished.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        print("\n正在取消...")
+        cancel_event.set()
+        finished.wait()
+    result = outcome or {"status": "failed"}
+    events.put(None)
+    printer.join()
+    print()
+    summary = {key: result.get(key) for key in ("status", "message", "seed", "processing_time")}
+    summary["resource_summary"] = (result.get("final_video_info") or {}).get("resource_summary")
+    summary["renditions"] = [rendition["path"] for rendition in (result.get("final_video_info") or {}).get("renditions", [])]
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0 if result["status"] == "done" else 1
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        setup_logging(args.log_file, parse_level(args.log_level), parse_module_levels(args.log_modules), args.log_json,
+                      max_bytes=args.log_max_bytes, backup_count=args.log_backups)
+    except ValueError as e:
+        parser.error(str(e))
+    commands = {
+        'serve': command_serve,
+        'process': command_process,
+        'estimate': command_estimate,
+        'stream': command_stream,
+        'distribute': command_distribute,
+        'worker': command_worker,
+    }
+    if args.command in commands:
+        try:
+            return commands[args.command](args)
+        except ValueError as e:
+            parser.error(str(e))
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
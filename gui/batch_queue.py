@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+
+from PyQt5.QtWidgets import (QWidget, QPushButton, QLabel, QFileDialog, QVBoxLayout, QHBoxLayout,
+                             QProgressBar, QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QAbstractItemView, QMessageBox)
+from PyQt5.QtCore import QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from processors.video_analyzer import VideoProbe
+from processors.qt_workers import IsolatedVideoProcessor
+from processors.video_processor import PIXEL_MODE_NATIVE, build_audio_info
+from processors.ffmpeg_engine import is_high_bit_depth
+from utils.file_utils import get_output_path, is_valid_video_file, list_video_files
+from utils.system_utils import recommended_worker_count, recommended_probe_count
+from utils.resource_governor import ResourceLimits
+
+# 任务状态
+STATUS_PROBING = '分析中'
+STATUS_READY = '等待处理'
+STATUS_RUNNING = '处理中'
+STATUS_DONE = '完成'
+STATUS_FAILED = '失败'
+STATUS_CANCELLED = '已取消'
+
+# 批量任务的 nice 值
+BATCH_JOB_NICE = 5
+
+COLUMN_FILE = 0
+COLUMN_STATUS = 1
+COLUMN_PROGRESS = 2
+COLUMN_RESULT = 3
+
+
+class ProbeSignals(QObject):
+    finished = pyqtSignal(object, dict)
+    error = pyqtSignal(object, str)
+
+
+class ProbeTask(QRunnable):
+    # 在线程池中分析单个文件，多个文件可以同时等待 ffprobe
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.probe = VideoProbe(job.path)
+        self.signals = ProbeSignals()
+
+    def run(self):
+        try:
+            result = self.probe.analyze()
+            self.signals.finished.emit(self.job, result)
+        except Exception as e:
+            self.signals.error.emit(self.job, str(e))
+
+
+class BatchJob:
+    def __init__(self, path, row):
+        self.path = path
+        self.row = row
+        self.status = STATUS_PROBING
+        self.video_info = None
+        self.probe_task = None
+        self.processor = None
+        self.percent = 0
+        self.progress_bar = None
+
+    @property
+    def frame_count(self):
+        return self.video_info['视频总帧数'] if self.video_info else 0
+
+    @property
+    def processed_frames(self):
+        return self.frame_count * self.percent / 100
+
+
+class BatchQueueWindow(QWidget):
+    def __init__(self, options_provider, worker_pool, parent=None):
+        super().__init__(parent)
+        # options_provider 返回主窗口当前的处理参数，参数无效时返回 None
+        self.options_provider = options_provider
+        # 与主窗口共用处理工作进程池，每个运行中的任务占用一个工作进程
+        self.worker_pool = worker_pool
+        self.options = None
+        self.jobs = []
+        self.is_running = False
+        self.batch_start_time = None
+        self.finished_frames = 0
+        self.logger = logging.getLogger(__name__)
+        self.probe_pool = QThreadPool(self)
+        self.probe_pool.setMaxThreadCount(recommended_probe_count())
+        self.setup_ui()
+        self.throughput_timer = QTimer(self)
+        self.throughput_timer.timeout.connect(self.update_throughput)
+
+    def setup_ui(self):
+        self.setWindowTitle('批量处理队列')
+        self.resize(760, 460)
+        self.setAcceptDrops(True)
+        layout = QVBoxLayout(self)
+
+        toolbar = QHBoxLayout()
+        self.add_folder_button = QPushButton('添加文件夹', self)
+        self.add_files_button = QPushButton('添加文件', self)
+        self.clear_button = QPushButton('清除已结束', self)
+        self.worker_label = QLabel('并发任务数:', self)
+        self.worker_spin = QSpinBox(self)
+        self.worker_spin.setRange(1, 32)
+        self.worker_spin.setValue(recommended_worker_count())
+        self.worker_spin.setToolTip('根据 CPU 核心数和可用内存自动设置')
+        toolbar.addWidget(self.add_folder_button)
+        toolbar.addWidget(self.add_files_button)
+        toolbar.addWidget(self.clear_button)
+        toolbar.addStretch(1)
+        toolbar.addWidget(self.worker_label)
+        toolbar.addWidget(self.worker_spin)
+        layout.addLayout(toolbar)
+
+        self.table = QTableWidget(0, 4, self)
+        self.table.setHorizontalHeaderLabels(['文件', '状态', '进度', '结果'])
+        self.table.horizontalHeader().setSectionResizeMode(COLUMN_FILE, QHeaderView.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(COLUMN_RESULT, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table, 1)
+
+        bottom = QHBoxLayout()
+        self.throughput_label = QLabel('将视频文件或文件夹拖放到此处', self)
+        self.start_button = QPushButton('开始处理', self)
+        self.stop_button = QPushButton('停止', self)
+        self.stop_button.setEnabled(False)
+        bottom.addWidget(self.throughput_label, 1)
+        bottom.addWidget(self.start_button)
+        bottom.addWidget(self.stop_button)
+        layout.addLayout(bottom)
+
+        self.add_folder_button.clicked.connect(self.add_folder)
+        self.add_files_button.clicked.connect(self.add_files)
+        self.clear_button.clicked.connect(self.clear_finished)
+        self.start_button.clicked.connect(self.start_queue)
+        self.stop_button.clicked.connect(self.stop_queue)
+        self.worker_spin.valueChanged.connect(self.schedule_jobs)
+
+    def add_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择视频文件夹", os.path.expanduser("~"))
+        if folder:
+            self.add_paths([folder])
+
+    def add_files(self):
+        paths = QFileDialog.getOpenFileNames(self, "选择视频文件", os.path.expanduser("~"), "Video Files (*.mp4 *.avi *.mov)")[0]
+        self.add_paths(paths)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        self.add_paths([url.toLocalFile() for url in event.mimeData().urls()])
+
+    def add_paths(self, paths):
+        queued = set(job.path for job in self.jobs)
+        added = 0
+        for path in paths:
+            candidates = list_video_files(path) if os.path.isdir(path) else [path]
+            for file_path in candidates:
+                file_path = os.path.abspath(file_path)
+                if file_path in queued or not is_valid_video_file(file_path):
+                    continue
+                queued.add(file_path)
+                self.add_job(file_path)
+                added += 1
+        self.logger.info(f"批量队列添加了 {added} 个文件")
+        self.update_throughput()
+
+    def add_job(self, path):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        job = BatchJob(path, row)
+        item = QTableWidgetItem(os.path.basename(path))
+        item.setToolTip(path)
+        self.table.setItem(row, COLUMN_FILE, item)
+        job.progress_bar = QProgressBar(self.table)
+        job.progress_bar.setValue(0)
+        self.table.setCellWidget(row, COLUMN_PROGRESS, job.progress_bar)
+        self.table.setItem(row, COLUMN_RESULT, QTableWidgetItem(''))
+        self.jobs.append(job)
+        self.set_status(job, STATUS_PROBING)
+
+        # 加入队列后立即并行分析，开始处理时大部分文件已经就绪
+        job.probe_task = ProbeTask(job)
+        job.probe_task.signals.finished.connect(self.on_probe_finished)
+        job.probe_task.signals.error.connect(self.on_probe_error)
+        self.probe_pool.start(job.probe_task)
+
+    def set_status(self, job, status, result=None):
+        job.status = status
+        self.table.setItem(job.row, COLUMN_STATUS, QTableWidgetItem(status))
+        if result is not None:
+            item = QTableWidgetItem(result)
+            item.setToolTip(result)
+            self.table.setItem(job.row, COLUMN_RESULT, item)
+
+    def on_probe_finished(self, job, result):
+        job.probe_task = None
+        if job.status != STATUS_PROBING:
+            return
+        job.video_info = result
+        self.set_status(job, STATUS_READY, f"{result['分辨率']} {result['帧率']:.2f}fps {result['视频总帧数']}帧")
+        self.schedule_jobs()
+
+    def on_probe_error(self, job, message):
+        job.probe_task = None
+        if job.status == STATUS_PROBING:
+            self.set_status(job, STATUS_FAILED, f"分析失败: {message}")
+        self.schedule_jobs()
+
+    def start_queue(self):
+        self.options = self.options_provider()
+        if self.options is None:
+            return
+        self.is_running = True
+        self.batch_start_time = time.time()
+        self.finished_frames = 0
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.throughput_timer.start(1000)
+        self.schedule_jobs()
+
+    def running_jobs(self):
+        return [job for job in self.jobs if job.status == STATUS_RUNNING]
+
+    def schedule_jobs(self):
+        if not self.is_running:
+            return
+        # 调小并发数时不打断已运行的任务，只是不再启动新的任务
+        free_slots = self.worker_spin.value() - len(self.running_jobs())
+        for job in self.jobs:
+            if free_slots <= 0:
+                break
+            if job.status == STATUS_READY:
+                self.start_job(job)
+                free_slots -= 1
+
+        if not self.running_jobs() and not any(job.status in (STATUS_PROBING, STATUS_READY) for job in self.jobs):
+            self.finish_queue()
+
+    def start_job(self, job):
+        info = job.video_info
+        # 勾选原始像素格式或源为高位深时，保持源像素格式
+        pixel_mode = self.options['pixel_mode']
+        if is_high_bit_depth(info.get('video_stream_info', {}).get('pix_fmt')):
+            pixel_mode = PIXEL_MODE_NATIVE
+        try:
+            job.processor = IsolatedVideoProcessor(
+                self.worker_pool,
+                job.path,
+                get_output_path(job.path),
+                self.options['interval_range'],
+                self.options['delete_frames'],
+                info['帧率'],
+                build_audio_info(info),
+                info['视频总帧数'],
+                info,
+                seed=self.options['seed'],
+                pixel_mode=pixel_mode,
+                content_aware=self.options['content_aware'],
+                audio_mode=self.options['audio_mode'],
+                # 并发任务平分 CPU 核心，批量任务以较低优先级运行，界面保持流畅
+                resources=ResourceLimits.for_concurrent_jobs(self.worker_spin.value(), nice=BATCH_JOB_NICE)
+            )
+        except Exception as e:
+            self.logger.error(f"创建处理任务失败 {job.path}: {str(e)}", exc_info=True)
+            self.set_status(job, STATUS_FAILED, str(e))
+            return
+
+        job.processor.progress.connect(lambda value, stage, job=job: self.on_job_progress(job, value, stage))
+        job.processor.finished.connect(lambda result, deleted, final_info, job=job: self.on_job_finished(job, result, final_info))
+        job.percent = 0
+        self.set_status(job, STATUS_RUNNING)
+        job.processor.start()
+        self.logger.info(f"批量任务开始: {job.path}")
+
+    def on_job_progress(self, job, value, stage):
+        job.percent = value
+        job.progress_bar.setValue(value)
+        job.progress_bar.setFormat(f"{stage}: {value}%")
+
+    def on_job_finished(self, job, result, final_info):
+        if job.status != STATUS_RUNNING:
+            return
+        output_path = get_output_path(job.path)
+        # 输出信息带有 error 或输出文件不存在时，任务并没有成功
+        if final_info and "error" not in final_info and os.path.exists(output_path):
+            job.percent = 100
+            job.progress_bar.setValue(100)
+            job.progress_bar.setFormat("完成")
+            self.finished_frames += job.frame_count
+            self.set_status(job, STATUS_DONE, output_path)
+        else:
+            self.set_status(job, STATUS_FAILED, final_info.get("error", result) if final_info else result)
+        self.logger.info(f"批量任务结束: {job.path} - {result}")
+        self.schedule_jobs()
+        self.update_throughput()
+
+    def stop_queue(self):
+        self.is_running = False
+        for job in self.jobs:
+            if job.status == STATUS_RUNNING:
+                job.processor.stop()
+                job.processor.wait()
+                self.set_status(job, STATUS_CANCELLED)
+        self.finish_queue()
+
+    def finish_queue(self):
+        self.is_running = False
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.throughput_timer.stop()
+        self.update_throughput()
+
+    def clear_finished(self):
+        # 只保留还未结束的任务，重新编排行号
+        ended = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+        kept = [job for job in self.jobs if job.status not in ended]
+        for row in reversed(range(len(self.jobs))):
+            if self.jobs[row].status in ended:
+                self.table.removeRow(row)
+        for row, job in enumerate(kept):
+            job.row = row
+        self.jobs = kept
+        self.update_throughput()
+
+    def update_throughput(self):
+        total = len(self.jobs)
+        done = sum(1 for job in self.jobs if job.status == STATUS_DONE)
+        running = len(self.running_jobs())
+        summary = f"完成 {done}/{total} | 运行中 {running}/{self.worker_spin.value()}"
+        if self.batch_start_time is not None:
+            elapsed = time.time() - self.batch_start_time
+            frames = self.finished_frames + sum(job.processed_frames for job in self.running_jobs())
+            if elapsed > 0:
+                summary += f" | 吞吐量: {frames / elapsed:.1f} 帧/秒"
+        self.throughput_label.setText(summary)
+
+    def closeEvent(self, event):
+        if self.running_jobs():
+            reply = QMessageBox.question(self, "确认", "批量任务正在运行，关闭窗口将停止所有任务。是否继续？",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                event.ignore()
+                return
+            self.stop_queue()
+        for job in self.jobs:
+            if job.probe_task is not None:
+                job.probe_task.probe.cancel()
+        super().closeEvent(event)
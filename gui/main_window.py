@@ -8,7 +8,6 @@ import json
 import platform
 import subprocess
 import psutil
-import gc
 import logging
 import traceback
 
@@ -25,15 +24,26 @@ from PyQt5.QtWidgets import (QMainWindow, QPushButton, QLabel, QFileDialog,
                              QLineEdit, QVBoxLayout, QHBoxLayout, QWidget, 
                              QProgressBar, QTextEdit, QSizePolicy, QDesktopWidget, 
                              QGroupBox, QCheckBox, QGridLayout, QFrame)
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QPainter, QColor, QPalette, QBrush, QIcon
 
 # 导入OpenCV库
 import cv2
 
 # 导入自定义模块
-from processors.video_analyzer import VideoAnalyzer
-from processors.video_processor import VideoProcessor
+from processors.qt_workers import (VideoAnalyzer, IsolatedVideoProcessor, IsolatedMultiVariantProcessor,
+                                   CostEstimateWorker, PreviewWorker)
+from processors.job_worker import JobWorkerPool
+from processors.deletion_planner import plan_deletions, new_seed, parse_interval_range
+from gui.preview_dialog import PreviewDialog
+from gui.thumbnail_strip import ThumbnailStrip
+from utils.thumbnail_cache import ThumbnailCache, get_default_thumbnail_dir
+from processors.cost_estimator import format_estimate
+from processors.motion_analyzer import MotionAnalyzer, deletion_costs
+from processors.audio_splicer import AUDIO_MODE_PCM, AUDIO_MODE_COPY
+from processors.video_processor import PIXEL_MODE_BGR8, PIXEL_MODE_NATIVE, build_audio_info
+from processors.ffmpeg_engine import is_high_bit_depth
+from gui.batch_queue import BatchQueueWindow
 from utils.file_utils import get_output_path, get_file_size, is_valid_video_file
 
 # 自定义理类，用于去除按钮焦点边框
@@ -76,25 +86,44 @@ class FrameDeletionChart(QWidget):
             painter.setPen(QColor(255, 0, 0))  # 设置红色画笔
             painter.drawPoint(x, y)  # 绘制点
 
-# 性能监控线程类
-class PerformanceMonitor(QThread):
-    update_signal = pyqtSignal(float, float)  # 定义信号，用于更新UI
+# 资源走势图类，用折线显示当前任务的 CPU 和内存采样
+class ResourceSparkline(QWidget):
+    MAX_POINTS = 120  # 最多显示最近的采样数
 
-    def __init__(self):
-        super().__init__()
-        self.is_running = True  # 控制线程运行的标志
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.samples = []  # 初始化采样列表
+        self.setMinimumHeight(30)
+
+    def add_sample(self, sample):
+        self.samples.append(sample)
+        self.samples = self.samples[-self.MAX_POINTS:]
+        self.update()  # 触发重绘
+
+    def clear(self):
+        self.samples = []
+        self.update()
 
-    def run(self):
-        while self.is_running:
-            # 获取CPU和内存使用率
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory_percent = psutil.virtual_memory().percent
-            # 发送信号更新UI
-            self.update_signal.emit(cpu_percent, memory_percent)
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)  # 设置抗锯齿
 
-    def stop(self):
-        # 停止线程
-        self.is_running = False
+        if len(self.samples) < 2:
+            return  # 至少两个采样才能连线
+
+        width = self.width()
+        height = self.height()
+        step = width / (self.MAX_POINTS - 1)
+        # CPU 按多核累计可能超过 100%，两条线各自按最大值缩放
+        max_cpu = max(100.0, max(sample['cpu_percent'] for sample in self.samples))
+        max_rss = max(1.0, max(sample['rss_mb'] for sample in self.samples))
+
+        for key, scale, color in (('cpu_percent', max_cpu, QColor(0, 122, 255)),
+                                  ('rss_mb', max_rss, QColor(52, 199, 89))):
+            painter.setPen(color)
+            points = [QtCore.QPointF(index * step, (1 - sample[key] / scale) * (height - 1))
+                      for index, sample in enumerate(self.samples)]
+            painter.drawPolyline(QtGui.QPolygonF(points))
 
 # 自定义进度条类
 class CustomProgressBar(QProgressBar):
@@ -138,10 +167,11 @@ class VideoProcessorGUI(QMainWindow):
         super().__init__()
         self.temp_files = []  # 初始化 temp_files 属性
         self.video_info = {}  # 初始化 video_info 字典
+        # 处理任务在独立的工作进程中运行，界面进程的内存不随处理的任务数增长
+        self.job_worker_pool = JobWorkerPool()
         self.setup_ui_components()
         self.setup_connections()
         self.load_settings()
-        self.initialize_performance_monitor()
 
     def setup_ui_components(self):
         self.setFont(QFont("SF Pro Text", 12))  # 设置默认字体
@@ -157,6 +187,7 @@ class VideoProcessorGUI(QMainWindow):
         self.deleted_frames_count = 0  # 删除帧计数
         self.current_second = 0  # 前理的秒数
         self.analysis_start_time = None  # 分析开始时间
+        self.processing_eta = None  # 处理器根据阶段权重给出的剩余时间
         
         self.settings_file = 'settings.json'  # 设置文件名
         
@@ -238,10 +269,33 @@ class VideoProcessorGUI(QMainWindow):
         self.delete_label.setFont(font)
         self.delete_input = QLineEdit(self)
         self.delete_input.setFont(font)
+        self.seed_label = QLabel('随机种子:', self)
+        self.seed_label.setFont(font)
+        self.seed_input = QLineEdit(self)
+        self.seed_input.setFont(font)
+        self.seed_input.setPlaceholderText('留空则随机生成')
+        self.variant_label = QLabel('输出版本数:', self)
+        self.variant_label.setFont(font)
+        self.variant_input = QLineEdit(self)
+        self.variant_input.setFont(font)
+        self.variant_input.setPlaceholderText('1')
         params_layout.addWidget(self.interval_label, 0, 0)
         params_layout.addWidget(self.interval_input, 0, 1)
         params_layout.addWidget(self.delete_label, 1, 0)
         params_layout.addWidget(self.delete_input, 1, 1)
+        params_layout.addWidget(self.seed_label, 2, 0)
+        params_layout.addWidget(self.seed_input, 2, 1)
+        params_layout.addWidget(self.variant_label, 3, 0)
+        params_layout.addWidget(self.variant_input, 3, 1)
+        self.native_pixel_checkbox = QCheckBox('保留原始像素格式（10bit/HDR）', self)
+        self.native_pixel_checkbox.setFont(font)
+        params_layout.addWidget(self.native_pixel_checkbox, 4, 0, 1, 2)
+        self.content_aware_checkbox = QCheckBox('优先删除低运动帧（先分析画面变化，结果按文件缓存）', self)
+        self.content_aware_checkbox.setFont(font)
+        params_layout.addWidget(self.content_aware_checkbox, 5, 0, 1, 2)
+        self.audio_copy_checkbox = QCheckBox('音频直接复制（不重新编码，音画偏差不超过半个音频帧）', self)
+        self.audio_copy_checkbox.setFont(font)
+        params_layout.addWidget(self.audio_copy_checkbox, 6, 0, 1, 2)
         params_group.setLayout(params_layout)
         layout.addWidget(params_group)
 
@@ -254,29 +308,56 @@ class VideoProcessorGUI(QMainWindow):
         self.process_button.setMinimumHeight(button_height)
         self.process_button.setEnabled(False)
         
+        self.estimate_button = QPushButton('估算开销', self)
+        self.estimate_button.setFont(button_font)
+        self.estimate_button.setMinimumHeight(button_height)
+        self.estimate_button.setEnabled(False)
+        
+        self.preview_button = QPushButton('预览删除点', self)
+        self.preview_button.setFont(button_font)
+        self.preview_button.setMinimumHeight(button_height)
+        self.preview_button.setEnabled(False)
+        
         self.cancel_button = QPushButton('取消处理', self)
         self.cancel_button.setFont(button_font)  # 设置取消按钮字体
         self.cancel_button.setMinimumHeight(button_height)
         self.cancel_button.setEnabled(False)
+        
+        self.batch_button = QPushButton('批量处理', self)
+        self.batch_button.setFont(button_font)
+        self.batch_button.setMinimumHeight(button_height)
+        self.batch_window = None
         control_layout.addWidget(self.process_button)
+        tool_layout = QHBoxLayout()
+        tool_layout.addWidget(self.estimate_button)
+        tool_layout.addWidget(self.preview_button)
+        control_layout.addLayout(tool_layout)
         control_layout.addWidget(self.cancel_button)
+        control_layout.addWidget(self.batch_button)
         
         stats_layout = QVBoxLayout()
         self.time_label = QLabel('预计剩余: --:--', self)
         self.time_label.setFont(font)
         self.frames_deleted_label = QLabel('累计删除总帧数: 0', self)
         self.frames_deleted_label.setFont(font)
-        self.performance_label = QLabel('CPU: --%, 内存: --%', self)
+        self.performance_label = QLabel('任务 CPU: --%, 内存: -- MB', self)
         self.performance_label.setFont(font)
+        self.resource_chart = ResourceSparkline(self)
         stats_layout.addWidget(self.time_label)
         stats_layout.addWidget(self.frames_deleted_label)
         stats_layout.addWidget(self.performance_label)
+        stats_layout.addWidget(self.resource_chart)
         stats_layout.addWidget(self.memory_label)
         
         control_stats_layout.addLayout(control_layout)
         control_stats_layout.addLayout(stats_layout)
         layout.addLayout(control_stats_layout)
 
+        # 删除点缩略图条，缩略图在后台按需解码并缓存到磁盘
+        self.thumbnail_cache = ThumbnailCache(disk_dir=get_default_thumbnail_dir())
+        self.thumbnail_strip = ThumbnailStrip(self.thumbnail_cache, self)
+        layout.addWidget(self.thumbnail_strip)
+
         # 创建详细信息文本框
         info_group = QGroupBox("Processing Information")  # 设置信息组标题
         info_group.setFont(QFont("Microsoft YaHei" if self.is_windows else "SF Pro Text", 8))  # 设置信息组标题字体
@@ -321,14 +402,12 @@ class VideoProcessorGUI(QMainWindow):
     def setup_connections(self):
         self.load_button.clicked.connect(self.load_video)
         self.process_button.clicked.connect(self.process_video)
+        self.estimate_button.clicked.connect(self.estimate_cost)
+        self.preview_button.clicked.connect(self.preview_deletions)
         self.cancel_button.clicked.connect(self.cancel_processing)
+        self.batch_button.clicked.connect(self.open_batch_queue)
         self.timer.timeout.connect(self.update_estimated_time)
 
-    def initialize_performance_monitor(self):
-        self.performance_monitor = PerformanceMonitor()
-        self.performance_monitor.update_signal.connect(self.update_performance_info)
-        self.performance_monitor.start()
-
     def get_stylesheet(self):
         return """
             QMainWindow {
@@ -421,8 +500,8 @@ class VideoProcessorGUI(QMainWindow):
         # 确保 GUI 更新
         QtWidgets.QApplication.processEvents()
         
-        # 更新估计剩余时间
-        if self.start_time is not None:
+        # 更新估计剩余时间（处理器提供了加权预计时间时以其为准）
+        if self.start_time is not None and self.processing_eta is None:
             elapsed_time = time.time() - self.start_time
             if value > 0:
                 estimated_total_time = elapsed_time * 100 / value
@@ -444,6 +523,9 @@ class VideoProcessorGUI(QMainWindow):
         info_text += f"视频总帧数：{info['视频总帧数']}\n"
         info_text += f"帧率：{info['帧率']:.2f}\n"
         info_text += f"分辨率：{info['分辨率']}\n"
+        pix_fmt = info.get('video_stream_info', {}).get('pix_fmt')
+        if pix_fmt:
+            info_text += f"像素格式：{pix_fmt}\n"
         info_text += f"时长：{info['时长']:.2f} 秒\n"
         info_text += f"是否包含音频：{'是' if info['是否包含音频'] else '否'}\n"
         if info['是否包含音频']:
@@ -452,7 +534,12 @@ class VideoProcessorGUI(QMainWindow):
         info_text += f"分析用时：{info['分析用时']:.2f} 秒\n"
         
         self.info_text.setText(info_text)
+        # 高位深视频默认使用原始像素格式模式，避免降为 8 位
+        if is_high_bit_depth(pix_fmt):
+            self.native_pixel_checkbox.setChecked(True)
         self.process_button.setEnabled(True)
+        self.estimate_button.setEnabled(True)
+        self.preview_button.setEnabled(True)
 
     def process_video(self):
         logging.info("开始处理视频")
@@ -463,45 +550,70 @@ class VideoProcessorGUI(QMainWindow):
             self.show_error_message(f"视频文件不存在: {self.video_info['文件路径']}")
             return
         try:
-            interval_range = self.interval_input.text()
-            delete_frames = int(self.delete_input.text())
-            
-            if not interval_range or delete_frames <= 0 or delete_frames > 30:
-                self.show_warning("请输入有效的间隔范围和删除帧数（1-30）")
+            options = self.get_processing_options()
+            if options is None:
                 return
-            
+            interval_range = options['interval_range']
+            delete_frames = options['delete_frames']
+            seed = options['seed']
+            variant_count = options['variant_count']
+
             input_path = self.video_info['文件路径']
             output_path = get_output_path(input_path)
-            
-            self.processor = VideoProcessor(
-                input_path, 
-                output_path, 
-                interval_range, 
-                delete_frames,
-                self.video_info['帧率'],
-                {
-                    'has_audio': self.video_info['是否包含音频'],
-                    'audio_duration': self.video_info.get('音频时长'),
-                    'audio_fps': self.video_info.get('音频采样率')
-                },
-                self.video_info['视频总帧数'],
-                self.video_info
-            )
+            audio_info = build_audio_info(self.video_info)
+
+            if variant_count > 1:
+                # 多个版本共用一次解码，指定种子时各版本依次递增
+                seeds = [seed + index if seed is not None else None for index in range(variant_count)]
+                self.processor = IsolatedMultiVariantProcessor(
+                    self.job_worker_pool,
+                    input_path,
+                    interval_range,
+                    delete_frames,
+                    self.video_info['帧率'],
+                    audio_info,
+                    self.video_info['视频总帧数'],
+                    self.video_info,
+                    seeds
+                )
+                self.processor.variants_finished.connect(self.show_variant_results)
+            else:
+                self.processor = IsolatedVideoProcessor(
+                    self.job_worker_pool,
+                    input_path, 
+                    output_path, 
+                    interval_range, 
+                    delete_frames,
+                    self.video_info['帧率'],
+                    audio_info,
+                    self.video_info['视频总帧数'],
+                    self.video_info,
+                    seed=seed,
+                    pixel_mode=options['pixel_mode'],
+                    content_aware=options['content_aware'],
+                    audio_mode=options['audio_mode']
+                )
             
             self.processor.progress.connect(self.update_progress)
             self.processor.finished.connect(self.process_finished)
             self.processor.frame_deleted_signal.connect(self.update_deleted_frames_info)
             self.processor.info_signal.connect(self.update_info_text)
+            self.processor.eta_signal.connect(self.update_processing_eta)
+            self.processor.resource_signal.connect(self.update_resource_info)
             
+            self.resource_chart.clear()
+            self.processing_eta = None
             self.start_time = time.time()
             self.progress_bar.setValue(0)
             self.process_button.setEnabled(False)
+            self.estimate_button.setEnabled(False)
             self.load_button.setEnabled(False)
             self.cancel_button.setEnabled(True)
             self.timer.start(1000)
             self.processing_start_time = time.time()
             self.deleted_frames_count = 0
             self.frames_deleted_label.setText('预计删除总帧数: 0')
+            self.reset_thumbnail_strip()
             
             self.processor.start()
             logging.info("视频处理器已启动")
@@ -509,6 +621,137 @@ class VideoProcessorGUI(QMainWindow):
             logging.error(f"处理视频时出错: {str(e)}", exc_info=True)
             self.show_error_message(f"处理视频时出错: {str(e)}")
 
+    def get_processing_options(self):
+        # 校验界面上的处理参数，无效时提示并返回 None；单个视频和批量队列共用
+        try:
+            delete_frames = int(self.delete_input.text())
+        except ValueError:
+            delete_frames = 0
+        if delete_frames <= 0 or delete_frames > 30:
+            self.show_warning("请输入有效的删除帧数（1-30）")
+            return None
+        # 与服务端 normalize_options 的校验相同，预览和缩略图条直接用它生成删除计划
+        try:
+            start_sec, end_sec = parse_interval_range(self.interval_input.text().strip())
+        except ValueError:
+            self.show_warning("间隔范围格式应为 \"最小秒数-最大秒数\"，例如 1-3")
+            return None
+        if start_sec > end_sec or end_sec <= 0:
+            self.show_warning("间隔范围无效：最小秒数不能大于最大秒数，最大秒数必须大于 0")
+            return None
+        interval_range = f"{start_sec}-{end_sec}"
+
+        # 相同的种子和参数会得到相同的删除计划，可直接命中输出缓存
+        seed_text = self.seed_input.text().strip()
+        if seed_text and not seed_text.isdigit():
+            self.show_warning("随机种子必须是非负整数")
+            return None
+
+        variant_text = self.variant_input.text().strip() or '1'
+        if not variant_text.isdigit() or not 1 <= int(variant_text) <= 16:
+            self.show_warning("输出版本数必须是 1-16 之间的整数")
+            return None
+
+        return {
+            'interval_range': interval_range,
+            'delete_frames': delete_frames,
+            'seed': int(seed_text) if seed_text else None,
+            'variant_count': int(variant_text),
+            'pixel_mode': PIXEL_MODE_NATIVE if self.native_pixel_checkbox.isChecked() else PIXEL_MODE_BGR8,
+            'content_aware': self.content_aware_checkbox.isChecked(),
+            'audio_mode': AUDIO_MODE_COPY if self.audio_copy_checkbox.isChecked() else AUDIO_MODE_PCM,
+        }
+
+    def estimate_cost(self):
+        # 采样编码几个短窗口，估算处理时间、输出大小和临时文件空间
+        if not self.video_info:
+            self.show_warning("请先加载视频")
+            return
+        options = self.get_processing_options()
+        if options is None:
+            return
+        input_path = self.video_info['文件路径']
+        self.estimator = CostEstimateWorker(
+            input_path,
+            self.video_info,
+            options['interval_range'],
+            options['delete_frames'],
+            pixel_mode=options['pixel_mode'],
+            variant_count=options['variant_count'],
+            output_dir=os.path.dirname(get_output_path(input_path))
+        )
+        self.estimator.progress.connect(self.update_progress)
+        self.estimator.finished.connect(self.show_cost_estimate)
+        self.estimator.error.connect(self.on_estimate_error)
+        self.estimate_button.setEnabled(False)
+        self.process_button.setEnabled(False)
+        self.update_info_text("正在采样估算处理开销...")
+        self.estimator.start()
+
+    def show_cost_estimate(self, estimate):
+        self.estimate_button.setEnabled(True)
+        self.process_button.setEnabled(True)
+        self.update_info_text("\n" + format_estimate(estimate))
+
+    def on_estimate_error(self, message):
+        self.estimate_button.setEnabled(True)
+        self.process_button.setEnabled(True)
+        self.show_error_message(message)
+
+    def preview_deletions(self):
+        # 按当前参数生成删除计划，只渲染几个删除点附近的短片，不必处理整个文件
+        if not self.video_info:
+            self.show_warning("请先加载视频")
+            return
+        options = self.get_processing_options()
+        if options is None:
+            return
+        seed = options['seed'] if options['seed'] is not None else new_seed()
+        frame_costs = None
+        if options['content_aware']:
+            # 预览不做分析，只使用已缓存的结果，与处理时得到相同的计划
+            scores = MotionAnalyzer(self.video_info['文件路径'], self.video_info['视频总帧数']).load_cached()
+            if scores is not None:
+                frame_costs = deletion_costs(scores)
+            else:
+                self.update_info_text("尚无该文件的画面变化分析结果，预览按随机选择的帧，处理时会先进行分析")
+        plan = plan_deletions(self.video_info['视频总帧数'], self.video_info['帧率'], options['interval_range'],
+                              options['delete_frames'], seed, frame_costs)
+        if not plan:
+            self.show_warning("当前参数下没有需要删除的帧")
+            return
+        self.preview_worker = PreviewWorker(self.video_info['文件路径'], self.video_info, plan)
+        self.preview_worker.progress.connect(self.update_progress)
+        self.preview_worker.finished.connect(self.show_preview)
+        self.preview_worker.error.connect(self.on_preview_error)
+        self.preview_button.setEnabled(False)
+        self.reset_thumbnail_strip()
+        for sec, frames in plan:
+            self.thumbnail_strip.add_point(sec, frames)
+        self.update_info_text(f"正在渲染删除点预览，随机种子 {seed}（填入该种子处理可得到相同的删除计划）")
+        self.preview_worker.start()
+
+    def show_preview(self, results):
+        self.preview_button.setEnabled(True)
+        self.preview_dialog = PreviewDialog(results, self.preview_worker.renderer, self)
+        self.preview_dialog.show()
+
+    def on_preview_error(self, message):
+        self.preview_button.setEnabled(True)
+        self.show_error_message(message)
+
+    def open_batch_queue(self):
+        if self.batch_window is None:
+            self.batch_window = BatchQueueWindow(self.get_processing_options, self.job_worker_pool)
+        self.batch_window.show()
+        self.batch_window.raise_()
+        self.batch_window.activateWindow()
+
+    def reset_thumbnail_strip(self):
+        width, height = (int(value) for value in self.video_info['分辨率'].split('x'))
+        self.thumbnail_strip.set_source(self.video_info['文件路径'], self.video_info['帧率'],
+                                        self.video_info['视频总帧数'], width / height if height else None)
+
     def update_deleted_frames_info(self, sec, frames):
         frames_per_second = int(self.video_info['帧率'])  # 修改这里
         start_frame = sec * frames_per_second
@@ -517,6 +760,7 @@ class VideoProcessorGUI(QMainWindow):
         frame_numbers = [f"{frame}/{self.video_info['视频总帧数']}" for frame in frames]  # 修改这里
         delete_info = f"视频第{sec}秒 (帧{start_frame}-{end_frame}): 删除第{', '.join(frame_info)}帧 (总帧数: {', '.join(frame_numbers)})"
         self.info_text.append(delete_info)
+        self.thumbnail_strip.add_point(sec, frames)
         self.deleted_frames_count += len(frames)
         self.frames_deleted_label.setText(f'预计删除总帧数: {self.deleted_frames_count}')
         self.info_text.verticalScrollBar().setValue(self.info_text.verticalScrollBar().maximum())
@@ -528,10 +772,12 @@ class VideoProcessorGUI(QMainWindow):
         self.process_finished_called = True
 
         self.process_button.setEnabled(True)
+        self.estimate_button.setEnabled(True)
         self.load_button.setEnabled(True)
         self.cancel_button.setEnabled(False)
         self.timer.stop()
         self.time_label.setText('处理完成')
+        self.performance_label.setText('任务 CPU: --%, 内存: -- MB')
 
         processing_end_time = time.time()
         total_processing_time = processing_end_time - self.processing_start_time
@@ -569,6 +815,10 @@ class VideoProcessorGUI(QMainWindow):
 
         verification_text += f"总共删除的帧数：{self.deleted_frames_count}\n"
         verification_text += f"总处理时间：{total_processing_time:.2f} 秒\n"
+        resource_summary = final_video_info.get('resource_summary')
+        if resource_summary:
+            verification_text += (f"资源峰值：CPU {resource_summary['peak_cpu_percent']:.0f}%，"
+                                  f"内存 {resource_summary['peak_rss_mb']:.0f} MB\n")
 
         self.info_text.append(verification_text)
         self.info_text.verticalScrollBar().setValue(self.info_text.verticalScrollBar().maximum())
@@ -577,6 +827,13 @@ class VideoProcessorGUI(QMainWindow):
             output_dir = os.path.dirname(final_video_info['path'])
             self.open_file(output_dir)
 
+    def show_variant_results(self, results):
+        lines = ["\n各版本输出："]
+        for result in results:
+            deleted_count = sum(len(frames) for _, frames in result['deleted_frames_info'])
+            lines.append(f"版本 {result['index']}（种子 {result['seed']}，删除 {deleted_count} 帧）：{result['output_path']}")
+        self.update_info_text("\n".join(lines))
+
     def open_file(self, path):
         if platform.system() == "Windows":
             os.startfile(path)
@@ -585,8 +842,17 @@ class VideoProcessorGUI(QMainWindow):
         else:  # Linux
             subprocess.call(["xdg-open", path])
 
+    def update_processing_eta(self, remaining_time):
+        self.processing_eta = remaining_time
+        self.processing_eta_time = time.time()
+
     def update_estimated_time(self):
-        if self.analysis_start_time is not None:
+        if self.processing_eta is not None and self.start_time is not None:
+            # 两次更新之间按经过的时间递减
+            remaining_time = max(0, self.processing_eta - (time.time() - self.processing_eta_time))
+            minutes, seconds = divmod(int(remaining_time), 60)
+            self.time_label.setText(f'预计剩余: {minutes}分{seconds}秒')
+        elif self.analysis_start_time is not None:
             elapsed_time = time.time() - self.analysis_start_time
             progress = self.progress_bar.value()
             if progress > 0:
@@ -608,11 +874,13 @@ class VideoProcessorGUI(QMainWindow):
             self.processor.stop()
             self.processor.wait()
             self.process_button.setEnabled(True)
+            self.estimate_button.setEnabled(True)
             self.load_button.setEnabled(True)
             self.cancel_button.setEnabled(False)
             self.info_text.append("处理已取消。")
             self.timer.stop()
             self.time_label.setText('处理已取消')
+            self.performance_label.setText('任务 CPU: --%, 内存: -- MB')
 
     def get_output_frame_count(self, output_path):
         cap = cv2.VideoCapture(output_path)
@@ -620,11 +888,13 @@ class VideoProcessorGUI(QMainWindow):
         cap.release()
         return frame_count
 
-    def update_performance_info(self, cpu_percent, memory_percent):
-        if hasattr(self, 'performance_label'):
-            self.performance_label.setText(f'CPU: {cpu_percent:.1f}%, 内存: {memory_percent:.1f}%')
-            self.update_memory_info()  # 更新内存使用信息
-            self.performance_label.repaint()
+    def update_resource_info(self, sample):
+        # 采样来自处理任务本身（处理线程和 ffmpeg 子进程树），空闲时不再刷新
+        self.performance_label.setText(
+            f"任务 CPU: {sample['cpu_percent']:.0f}%, 内存: {sample['rss_mb']:.0f} MB, "
+            f"线程: {sample['threads']}, 子进程: {sample['processes'] - 1}")
+        self.resource_chart.add_sample(sample)
+        self.update_memory_info()  # 更新内存使用信息
 
     def closeEvent(self, event):
         try:
@@ -637,10 +907,21 @@ class VideoProcessorGUI(QMainWindow):
                 self.analyzer.stop()
                 self.analyzer.wait()
 
-            # 停止性能监控
-            if hasattr(self, 'performance_monitor'):
-                self.performance_monitor.stop()
-                self.performance_monitor.wait()
+            if hasattr(self, 'estimator') and self.estimator.isRunning():
+                self.estimator.stop()
+
+            if hasattr(self, 'preview_worker') and self.preview_worker.isRunning():
+                self.preview_worker.stop()
+
+            self.thumbnail_strip.stop()
+
+            # 关闭批量队列窗口会停止其中正在运行的任务
+            if self.batch_window is not None:
+                self.batch_window.stop_queue()
+                self.batch_window.close()
+
+            # 退出处理工作进程，任务已在上面停止
+            self.job_worker_pool.shutdown()
 
             # 保存设置
             self.save_settings()
@@ -654,9 +935,6 @@ class VideoProcessorGUI(QMainWindow):
             if hasattr(self, 'audio_clip'):
                 self.audio_clip.close()
 
-            # 强制垃圾回收
-            gc.collect()
-
         except Exception:
             pass
 
@@ -670,7 +948,8 @@ class VideoProcessorGUI(QMainWindow):
                 temp_files = [
                     output_path.rsplit('.', 1)[0] + '_temp_video.mp4',
                     output_path.rsplit('.', 1)[0] + '_temp_audio.wav',
-                    output_path.rsplit('.', 1)[0] + '_temp_processed_audio.wav'
+                    output_path.rsplit('.', 1)[0] + '_temp_processed_audio.wav',
+                    output_path.rsplit('.', 1)[0] + '_temp_processed_audio.mka'
                 ]
                 for file in temp_files:
                     if os.path.exists(file):
@@ -685,6 +964,8 @@ class VideoProcessorGUI(QMainWindow):
                 settings = json.load(f)
                 self.interval_input.setText(settings.get('interval', ''))
                 self.delete_input.setText(settings.get('delete_frames', ''))
+                self.seed_input.setText(settings.get('seed', ''))
+                self.variant_input.setText(settings.get('variant_count', ''))
                 self.auto_open_checkbox.setChecked(settings.get('auto_open', False))
         except FileNotFoundError:
             # 如果文件不存在，就使用默认值
@@ -696,6 +977,8 @@ class VideoProcessorGUI(QMainWindow):
         settings = {
             'interval': self.interval_input.text(),
             'delete_frames': self.delete_input.text(),
+            'seed': self.seed_input.text(),
+            'variant_count': self.variant_input.text(),
             'auto_open': self.auto_open_checkbox.isChecked()
         }
         with open(self.settings_file, 'w') as f:
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from PyQt5.QtWidgets import (QDialog, QPushButton, QLabel, QListWidget, QVBoxLayout, QHBoxLayout, QGridLayout)
+from PyQt5.QtCore import QUrl
+from PyQt5.QtGui import QDesktopServices
+
+# Qt 多媒体组件依赖系统的音视频库，缺少时改用系统播放器打开预览
+try:
+    from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+    from PyQt5.QtMultimediaWidgets import QVideoWidget
+except ImportError:
+    QMediaPlayer = None
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewDialog(QDialog):
+    # 左侧列出预览的删除点，右侧并排播放删除前和删除后的短片
+    def __init__(self, results, renderer, parent=None):
+        super().__init__(parent)
+        self.results = results
+        self.renderer = renderer
+        self.players = []
+        self.setWindowTitle('删除点预览')
+        self.resize(1000, 420)
+
+        self.point_list = QListWidget(self)
+        for result in results:
+            self.point_list.addItem(f"第 {result['second']} 秒：删除 {len(result['deleted_frames'])} 帧")
+        self.point_list.setMaximumWidth(200)
+        self.point_list.currentRowChanged.connect(self.load_point)
+
+        self.play_button = QPushButton('播放', self)
+        self.play_button.clicked.connect(self.play)
+
+        layout = QHBoxLayout(self)
+        layout.addWidget(self.point_list)
+        view_layout = QGridLayout()
+        if QMediaPlayer is not None:
+            for column, title in enumerate(('删除前', '删除后')):
+                video_widget = QVideoWidget(self)
+                video_widget.setMinimumSize(360, 240)
+                player = QMediaPlayer(self, QMediaPlayer.VideoSurface)
+                player.setVideoOutput(video_widget)
+                self.players.append(player)
+                view_layout.addWidget(QLabel(title, self), 0, column)
+                view_layout.addWidget(video_widget, 1, column)
+        else:
+            view_layout.addWidget(QLabel('未能加载 Qt 多媒体组件，将使用系统播放器打开预览短片', self), 0, 0, 1, 2)
+            self.before_button = QPushButton('打开删除前', self)
+            self.after_button = QPushButton('打开删除后', self)
+            self.before_button.clicked.connect(lambda: self.open_external('before_path'))
+            self.after_button.clicked.connect(lambda: self.open_external('after_path'))
+            view_layout.addWidget(self.before_button, 1, 0)
+            view_layout.addWidget(self.after_button, 1, 1)
+            self.play_button.setVisible(False)
+        right_layout = QVBoxLayout()
+        right_layout.addLayout(view_layout, 1)
+        right_layout.addWidget(self.play_button)
+        layout.addLayout(right_layout, 1)
+
+        self.finished.connect(self.release)
+        if results:
+            self.point_list.setCurrentRow(0)
+
+    def current_result(self):
+        row = self.point_list.currentRow()
+        return self.results[row] if 0 <= row < len(self.results) else None
+
+    def load_point(self, row):
+        result = self.current_result()
+        if result is None:
+            return
+        for player, key in zip(self.players, ('before_path', 'after_path')):
+            player.setMedia(QMediaContent(QUrl.fromLocalFile(result[key])))
+        self.play()
+
+    def play(self):
+        # 两个短片同时从头播放，便于对比删除点前后的画面和声音
+        for player in self.players:
+            player.setPosition(0)
+            player.play()
+
+    def open_external(self, key):
+        result = self.current_result()
+        if result is not None:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(result[key]))
+
+    def release(self):
+        # 关闭窗口（包括按 Esc）时停止播放并删除预览短片
+        for player in self.players:
+            player.stop()
+            player.setMedia(QMediaContent())
+        self.renderer.cleanup()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+
+from PyQt5.QtWidgets import QListWidget, QListWidgetItem, QListView, QAbstractItemView
+from PyQt5.QtCore import Qt, QSize, QPoint, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QImage, QIcon
+
+from processors.thumbnail_extractor import ThumbnailExtractor, DEFAULT_THUMBNAIL_HEIGHT
+
+# 每个删除点最多显示的被删除帧数（另外显示前后各一帧）
+MAX_DELETED_SHOWN = 3
+# 可见范围两侧额外保留图标的条目数，更远的条目释放图标以限制内存
+LOADED_MARGIN = 20
+
+logger = logging.getLogger(__name__)
+
+
+def frames_around(frames, frame_count):
+    # 删除点前一帧、被删除的帧和删除点后一帧；返回 [(帧序号, 是否被删除), ...]
+    deleted = sorted(frames)
+    shown = [(frame, True) for frame in deleted[:MAX_DELETED_SHOWN]]
+    if deleted[0] > 0:
+        shown.insert(0, (deleted[0] - 1, False))
+    if deleted[-1] + 1 < frame_count:
+        shown.append((deleted[-1] + 1, False))
+    return shown
+
+
+class ThumbnailLoader(QThread):
+    # 后台解码线程：只处理最近一次请求中的条目，滚动后过期的请求直接丢弃
+    thumbnail_ready = pyqtSignal(int, list)
+
+    def __init__(self, path, fps, cache, height=DEFAULT_THUMBNAIL_HEIGHT):
+        super().__init__()
+        self.extractor = ThumbnailExtractor(path, fps, cache, height)
+        self.is_running = True
+        self._pending = {}
+        self._condition = threading.Condition()
+
+    def request(self, rows):
+        # rows: {行号: [(帧序号, 是否被删除), ...]}，替换尚未处理的请求
+        with self._condition:
+            self._pending = dict(rows)
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self.is_running = False
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        try:
+            self.extractor.open()
+        except Exception as e:
+            logger.error(f"无法打开视频生成缩略图: {str(e)}")
+            return
+        try:
+            while True:
+                with self._condition:
+                    while self.is_running and not self._pending:
+                        self._condition.wait()
+                    if not self.is_running:
+                        return
+                    # 按帧序号顺序解码，相邻的删除点可以连续读取而不必重新定位
+                    row = min(self._pending, key=lambda key: self._pending[key][0][0])
+                    shown = self._pending.pop(row)
+                images = []
+                for frame, deleted in shown:
+                    data = self.extractor.thumbnail(frame)
+                    if data is not None:
+                        images.append((data, deleted))
+                self.thumbnail_ready.emit(row, images)
+        except Exception as e:
+            logger.error(f"生成缩略图出错: {str(e)}", exc_info=True)
+        finally:
+            self.extractor.close()
+
+
+class ThumbnailStrip(QListWidget):
+    # 横向滚动的删除点缩略图条，只为滚动到可见范围内的条目解码
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.loader = None
+        self.frame_count = 0
+        self.aspect = 16 / 9
+        self.loaded_rows = set()
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setFixedHeight(DEFAULT_THUMBNAIL_HEIGHT + 50)
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(50)
+        self._refresh_timer.timeout.connect(self.refresh_visible)
+        self.horizontalScrollBar().valueChanged.connect(self._refresh_timer.start)
+
+    def set_source(self, path, fps, frame_count, aspect):
+        self.stop()
+        self.clear()
+        self.loaded_rows = set()
+        self.frame_count = frame_count
+        self.aspect = aspect or self.aspect
+        thumb_width = int(DEFAULT_THUMBNAIL_HEIGHT * self.aspect)
+        self.setIconSize(QSize((thumb_width + 2) * (MAX_DELETED_SHOWN + 2), DEFAULT_THUMBNAIL_HEIGHT + 4))
+        self.loader = ThumbnailLoader(path, fps, self.cache)
+        self.loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.loader.start()
+
+    def add_point(self, sec, frames):
+        if not frames:
+            return
+        item = QListWidgetItem(f"第{sec}秒 帧{min(frames)}")
+        item.setData(Qt.UserRole, frames_around(frames, self.frame_count))
+        item.setTextAlignment(Qt.AlignHCenter)
+        self.addItem(item)
+        self._refresh_timer.start()
+
+    def stop(self):
+        if self.loader is not None:
+            self.loader.thumbnail_ready.disconnect(self.on_thumbnail_ready)
+            self.loader.stop()
+            self.loader = None
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._refresh_timer.start()
+
+    def _visible_rows(self):
+        if self.count() == 0:
+            return range(0)
+        viewport = self.viewport().rect()
+        y = viewport.top() + self.iconSize().height() // 2
+        first = self.indexAt(QPoint(viewport.left() + 2, y)).row()
+        last = self.indexAt(QPoint(viewport.right() - 2, y)).row()
+        first = 0 if first < 0 else first
+        last = self.count() - 1 if last < 0 else last
+        return range(first, last + 1)
+
+    def refresh_visible(self):
+        if self.loader is None:
+            return
+        visible = self._visible_rows()
+        keep = range(max(0, visible.start - LOADED_MARGIN), min(self.count(), visible.stop + LOADED_MARGIN))
+        # 释放远离可见范围的图标，缩略图数据仍在 LRU 缓存中，滚回来时无需重新解码
+        for row in list(self.loaded_rows):
+            if row not in keep:
+                self.item(row).setIcon(QIcon())
+                self.loaded_rows.discard(row)
+        self.loader.request({row: self.item(row).data(Qt.UserRole) for row in visible if row not in self.loaded_rows})
+
+    def on_thumbnail_ready(self, row, images):
+        visible = self._visible_rows()
+        if not images or row >= self.count() or not (visible.start - LOADED_MARGIN <= row < visible.stop + LOADED_MARGIN):
+            return
+        self.item(row).setIcon(QIcon(self._compose(images)))
+        self.loaded_rows.add(row)
+
+    def _compose(self, images):
+        # 横向拼接，被删除的帧加红框
+        pixmaps = [(QPixmap.fromImage(QImage.fromData(data)), deleted) for data, deleted in images]
+        width = sum(pixmap.width() + 4 for pixmap, _ in pixmaps)
+        canvas = QPixmap(width, DEFAULT_THUMBNAIL_HEIGHT + 4)
+        canvas.fill(Qt.transparent)
+        painter = QPainter(canvas)
+        x = 0
+        for pixmap, deleted in pixmaps:
+            painter.drawPixmap(x + 2, 2, pixmap)
+            if deleted:
+                painter.setPen(QColor(255, 59, 48))
+                painter.drawRect(x + 1, 1, pixmap.width() + 1, pixmap.height() + 1)
+            x += pixmap.width() + 4
+        painter.end()
+        return canvas
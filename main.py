@@ -2,6 +2,7 @@
 import sys
 import os
 import subprocess
+import multiprocessing
 
 # 导入日志和异常追踪模块
 import logging
@@ -14,26 +15,29 @@ from PyQt5.QtGui import QIcon
 
 # 导入自定义的GUI模块
 from gui.main_window import VideoProcessorGUI
+from utils.logging_setup import setup_logging_from_env
 
 # 添加项目根目录到 Python 路径
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
-print("Python 路径:")
-print(sys.executable)
+def check_environment():
+    # 只在启动界面时执行：处理工作进程以 spawn 方式启动，会重新导入本模块
+    print("Python 路径:")
+    print(sys.executable)
 
-print("\n已安装的包:")
-result = subprocess.run([sys.executable, "-m", "pip", "list"], capture_output=True, text=True)
-print(result.stdout)
+    print("\n已安装的包:")
+    result = subprocess.run([sys.executable, "-m", "pip", "list"], capture_output=True, text=True)
+    print(result.stdout)
 
-# 强制使用系统 Python
-if sys.prefix != sys.base_prefix:
-    os.execl(sys.executable, sys.executable, *sys.argv)
+    # 强制使用系统 Python
+    if sys.prefix != sys.base_prefix:
+        os.execl(sys.executable, sys.executable, *sys.argv)
 
 def setup_logging():
+    # 日志经队列交给后台线程写入，app.log 按大小滚动；级别可通过环境变量按模块调整
     log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.log')
-    logging.basicConfig(filename=log_file, level=logging.DEBUG,
-                        format='%(asctime)s - %(levelname)s - %(message)s')
+    setup_logging_from_env(log_file)
 
 def exception_hook(exctype, value, tb):
     logging.error('Uncaught exception:', exc_info=(exctype, value, tb))
@@ -69,4 +73,7 @@ def main():
         error_box.exec_()
 
 if __name__ == '__main__':
+    # 打包后的程序启动工作进程时需要
+    multiprocessing.freeze_support()
+    check_environment()
     main()
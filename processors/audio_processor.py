@@ -2,43 +2,98 @@ from pydub import AudioSegment
 import numpy as np
 import logging
 import time
+import wave
+from processors.deletion_planner import kept_frame_ranges
+
+# 流式渲染音频时每次读写的字节数
+DEFAULT_AUDIO_CHUNK_BYTES = 4 * 1024 * 1024
 
 class AudioProcessor:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
-    def process_audio(self, audio_path, deleted_frames, fps, total_frames, progress_callback):
+    def load_audio(self, audio_path):
+        return AudioSegment.from_wav(audio_path)
+
+    def process_audio(self, audio_path, deleted_frames, fps, total_frames, progress_callback, should_continue=None,
+                      frame_ranges=None):
         try:
             self.logger.info("开始处理音频")
-            audio = AudioSegment.from_wav(audio_path)
-            
-            # 计算每帧对应的音频毫秒数
-            ms_per_frame = 1000 / fps
-            
-            # 创建一个新的音频段
-            processed_audio = AudioSegment.empty()
-            
-            current_ms = 0
-            start_time = time.time()
-
-            for frame in range(total_frames):
-                if frame not in deleted_frames:
-                    # 如果这一帧不需要删除，添加到处理后的音频中
-                    frame_audio = audio[current_ms:current_ms + ms_per_frame]
-                    processed_audio += frame_audio
-                
-                current_ms += ms_per_frame
-
-                if frame % 100 == 0:  # 每处理100帧更新一次进度
-                    progress = (frame + 1) / total_frames
-                    elapsed_time = time.time() - start_time
-                    estimated_total_time = elapsed_time / progress
-                    remaining_time = estimated_total_time - elapsed_time
-                    progress_callback(progress, remaining_time)
-
-            self.logger.info("音频处理完成")
+            audio = self.load_audio(audio_path)
+            processed_audio = self.render_audio(audio, deleted_frames, fps, total_frames, progress_callback, should_continue,
+                                                frame_ranges)
+            if processed_audio is not None:
+                self.logger.info("音频处理完成")
             return processed_audio
 
         except Exception as e:
             self.logger.error(f"音频处理出错: {str(e)}", exc_info=True)
             raise
+
+    def render_audio(self, audio, deleted_frames, fps, total_frames, progress_callback, should_continue=None,
+                     frame_ranges=None):
+        # 按保留帧的连续区间直接切取 PCM 数据，同一份已解码音频可以渲染多个版本
+        # frame_ranges 限定输出的帧范围，范围之外的音频不输出
+        raw_data = memoryview(audio.raw_data)
+        frame_width = audio.frame_width
+        # 每个视频帧对应的音频采样数
+        samples_per_frame = audio.frame_rate / fps
+
+        ranges = kept_frame_ranges(deleted_frames, total_frames, frame_ranges)
+        parts = []
+        start_time = time.time()
+
+        for index, (start, end) in enumerate(ranges):
+            if should_continue is not None and index % 100 == 0 and not should_continue():
+                self.logger.info("音频处理已取消")
+                return None
+
+            start_byte = int(round(start * samples_per_frame)) * frame_width
+            end_byte = int(round(end * samples_per_frame)) * frame_width
+            parts.append(raw_data[start_byte:end_byte])
+
+            if index % 100 == 0:  # 每处理100个区间更新一次进度
+                progress = end / total_frames
+                elapsed_time = time.time() - start_time
+                estimated_total_time = elapsed_time / progress
+                remaining_time = estimated_total_time - elapsed_time
+                progress_callback(progress, remaining_time)
+
+        return audio._spawn(b''.join(parts))
+
+    def render_audio_file(self, audio_path, output_path, deleted_frames, fps, total_frames, progress_callback,
+                          should_continue=None, chunk_bytes=DEFAULT_AUDIO_CHUNK_BYTES, frame_ranges=None):
+        # 按保留区间分块读写 WAV，不把整段音频载入内存；取消时返回 False
+        # 切分位置与 render_audio 相同，输出逐字节一致
+        with wave.open(audio_path, 'rb') as source, wave.open(output_path, 'wb') as target:
+            target.setparams(source.getparams())
+            frame_width = source.getsampwidth() * source.getnchannels()
+            total_samples = source.getnframes()
+            samples_per_frame = source.getframerate() / fps
+            chunk_samples = max(1, chunk_bytes // frame_width)
+
+            ranges = kept_frame_ranges(deleted_frames, total_frames, frame_ranges)
+            start_time = time.time()
+            for index, (start, end) in enumerate(ranges):
+                if should_continue is not None and index % 100 == 0 and not should_continue():
+                    self.logger.info("音频处理已取消")
+                    return False
+
+                start_sample = int(round(start * samples_per_frame))
+                end_sample = min(total_samples, int(round(end * samples_per_frame)))
+                if start_sample >= total_samples:
+                    break
+                source.setpos(start_sample)
+                remaining = end_sample - start_sample
+                while remaining > 0:
+                    data = source.readframes(min(chunk_samples, remaining))
+                    if not data:
+                        break
+                    target.writeframes(data)
+                    remaining -= len(data) // frame_width
+
+                if index % 100 == 0:
+                    progress = end / total_frames
+                    elapsed_time = time.time() - start_time
+                    progress_callback(progress, elapsed_time / progress - elapsed_time)
+        return True
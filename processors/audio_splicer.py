@@ -0,0 +1,176 @@
+import bisect
+import logging
+
+# PyAV 为可选依赖，未安装时音频退回 PCM 解码处理
+try:
+    import av
+except ImportError:
+    av = None
+
+AUDIO_MODE_PCM = 'pcm'
+AUDIO_MODE_COPY = 'copy'
+AUDIO_MODES = (AUDIO_MODE_PCM, AUDIO_MODE_COPY)
+# 按数据包删除时允许的最大音画偏差；偏差上限约为半个音频帧，超过时退回 PCM 处理
+DEFAULT_MAX_DRIFT_SECONDS = 0.03
+# 每个数据包都能独立解码、帧长固定的有损编码，可以直接整包删除
+SPLICEABLE_CODECS = ('aac', 'mp3', 'mp2', 'opus', 'ac3', 'eac3')
+# 输出容器，可容纳上述所有编码
+SPLICED_AUDIO_FORMAT = 'matroska'
+
+logger = logging.getLogger(__name__)
+
+
+class AudioSpliceUnsupported(Exception):
+    pass
+
+
+def deleted_intervals(deleted_frames, fps, frame_ranges=None):
+    # 源时间轴上被删除的区间 [(开始秒, 结束秒), ...]：被删除的帧，以及处理范围之外的部分
+    frame_intervals = [(frame, frame + 1) for frame in sorted(set(deleted_frames))]
+    if frame_ranges:
+        previous_end = 0
+        for start, end in frame_ranges:
+            if start > previous_end:
+                frame_intervals.append((previous_end, start))
+            previous_end = end
+        frame_intervals.append((previous_end, float('inf')))
+    merged = []
+    for start, end in sorted(frame_intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start / fps, end / fps) for start, end in merged]
+
+
+class DeletedTimeline:
+    # 被删除的画面在源时间轴上的位置，用于查询某一时刻之前共删除了多少秒画面
+    def __init__(self, intervals):
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+        self.cumulative = [0.0]
+        for start, end in intervals:
+            self.cumulative.append(self.cumulative[-1] + (end - start))
+
+    def deleted_before(self, time):
+        # 只计入 time 之前的部分，time 落在被删除区间内时按比例计算
+        count = bisect.bisect_right(self.starts, time)
+        if count == 0:
+            return 0.0
+        partial = min(self.ends[count - 1], time) - self.starts[count - 1]
+        return self.cumulative[count - 1] + partial
+
+
+class PacketDropper:
+    # 逐包决定是否删除：删除的音频时长跟随删除的画面时长，累计偏差超过半个数据包时删除当前包，
+    # 因此保留下来的每个包的音画偏差都不超过半个数据包
+    def __init__(self, deleted_frames, fps, frame_ranges=None):
+        self.timeline = DeletedTimeline(deleted_intervals(deleted_frames, fps, frame_ranges))
+        self.removed = 0.0
+        self.max_drift = 0.0
+        self.kept = 0
+        self.dropped = 0
+
+    def skip_to(self, start):
+        # 定位后从 start 开始读取，之前的音频全部视为已删除
+        self.removed = start
+
+    def should_drop(self, start, duration):
+        drift = self.timeline.deleted_before(start + duration / 2) - self.removed
+        if drift >= duration / 2:
+            self.removed += duration
+            self.dropped += 1
+            return True
+        self.kept += 1
+        self.max_drift = max(self.max_drift, abs(drift))
+        return False
+
+    def final_drift(self, end_time):
+        return self.timeline.deleted_before(end_time) - self.removed
+
+
+def check_spliceable(stream, max_drift=DEFAULT_MAX_DRIFT_SECONDS):
+    # 返回每个数据包的时长（秒），不满足条件时抛出 AudioSpliceUnsupported
+    codec_name = stream.codec_context.name
+    if codec_name not in SPLICEABLE_CODECS:
+        raise AudioSpliceUnsupported(f"音频编码 {codec_name} 不支持按数据包删除")
+    frame_size = stream.codec_context.frame_size
+    rate = stream.codec_context.sample_rate
+    if not frame_size or not rate:
+        raise AudioSpliceUnsupported(f"无法确定 {codec_name} 音频帧长")
+    packet_seconds = frame_size / rate
+    if packet_seconds / 2 > max_drift:
+        raise AudioSpliceUnsupported(
+            f"音频帧长 {packet_seconds * 1000:.1f}ms，按数据包删除的偏差会超过 {max_drift * 1000:.0f}ms")
+    return packet_seconds
+
+
+class AudioSplicer:
+    # 在压缩域处理音频：与被删除视频帧重叠的整包丢弃，其余数据包直接复制并平移时间戳，
+    # 不解码、不重新编码，保留源音频的质量
+    def __init__(self, input_path, max_drift=DEFAULT_MAX_DRIFT_SECONDS):
+        self.input_path = input_path
+        self.max_drift = max_drift
+        self.stats = None
+
+    def splice(self, output_path, deleted_frames, fps, total_frames, progress_callback=None, should_continue=None,
+               frame_ranges=None):
+        # 成功时返回 True，取消时返回 False；frame_ranges 限定输出的帧范围，
+        # 此时先定位到第一个范围之前，读到最后一个范围结束即停止
+        if av is None:
+            raise AudioSpliceUnsupported("未安装 PyAV")
+        with av.open(self.input_path) as source:
+            if not source.streams.audio:
+                raise AudioSpliceUnsupported("视频中没有音频流")
+            stream = source.streams.audio[0]
+            packet_seconds = check_spliceable(stream, self.max_drift)
+            time_base = stream.time_base
+            start_pts = stream.start_time or 0
+            default_ticks = int(round(packet_seconds / time_base))
+            total_seconds = total_frames / fps
+            dropper = PacketDropper(deleted_frames, fps, frame_ranges)
+            removed_ticks = None
+            stop_time = float('inf')
+            if frame_ranges:
+                source.seek(start_pts + int(frame_ranges[0][0] / fps / time_base), stream=stream, backward=True)
+                stop_time = frame_ranges[-1][1] / fps
+            else:
+                removed_ticks = 0
+            end_time = 0.0
+            with av.open(output_path, 'w', format=SPLICED_AUDIO_FORMAT) as target:
+                output_stream = target.add_stream_from_template(stream)
+                for index, packet in enumerate(source.demux(stream)):
+                    if packet.pts is None or packet.size == 0:
+                        continue
+                    if should_continue is not None and index % 500 == 0 and not should_continue():
+                        logger.info("音频处理已取消")
+                        return False
+                    ticks = packet.duration or default_ticks
+                    start = float((packet.pts - start_pts) * time_base)
+                    duration = float(ticks * time_base)
+                    if start >= stop_time:
+                        break
+                    if removed_ticks is None:
+                        removed_ticks = packet.pts - start_pts
+                        dropper.skip_to(start)
+                    end_time = start + duration
+                    if dropper.should_drop(start, duration):
+                        removed_ticks += ticks
+                        continue
+                    packet.pts -= removed_ticks
+                    if packet.dts is not None:
+                        packet.dts -= removed_ticks
+                    packet.stream = output_stream
+                    target.mux(packet)
+                    if progress_callback is not None and index % 500 == 0 and total_seconds > 0:
+                        progress_callback(min(1.0, start / total_seconds))
+        self.stats = {
+            "kept_packets": dropper.kept,
+            "dropped_packets": dropper.dropped,
+            "packet_seconds": packet_seconds,
+            "max_drift": dropper.max_drift,
+            "final_drift": dropper.final_drift(end_time),
+        }
+        logger.info(f"音频按数据包处理完成: 保留 {dropper.kept} 包，删除 {dropper.dropped} 包，"
+                    f"最大音画偏差 {dropper.max_drift * 1000:.1f}ms")
+        return True
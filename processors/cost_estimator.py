@@ -0,0 +1,272 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+
+import cv2
+
+from processors.video_processor import build_encoding_profile, PIXEL_MODE_BGR8, PIXEL_MODE_NATIVE
+from processors.ffmpeg_engine import build_native_segment_command, video_encode_args
+from processors.deletion_planner import plan_deletions
+from processors.decode_backends import open_backend, BACKEND_AUTO
+from processors.time_ranges import normalize_time_ranges, time_ranges_to_frames
+from utils.process_utils import popen_hidden, kill_process_tree
+from utils.resource_governor import ResourceLimits
+from utils.throughput_store import ThroughputStore
+
+# 在全片（或处理范围内）均匀分布的采样窗口数和每个窗口的时长（秒）
+DEFAULT_SAMPLE_COUNT = 3
+DEFAULT_SAMPLE_SECONDS = 2.0
+# 分析结果中没有声道数，按立体声 16 位 PCM 估算中间 WAV 文件
+ASSUMED_AUDIO_CHANNELS = 2
+PCM_SAMPLE_BYTES = 2
+# 封装格式的额外开销
+CONTAINER_OVERHEAD = 1.02
+
+logger = logging.getLogger(__name__)
+
+
+class EstimateCancelled(Exception):
+    pass
+
+
+class CostEstimator:
+    # 处理前的开销估算：用选定的编码参数实际编码几个短窗口，按测得的速度和码率外推
+    # 全片的处理时间、输出大小和临时文件所需的磁盘空间；不依赖 Qt
+    def __init__(self, input_path, video_info, interval_range, delete_frames, pixel_mode=PIXEL_MODE_BGR8,
+                 variant_count=1, resources=None, sample_count=DEFAULT_SAMPLE_COUNT,
+                 sample_seconds=DEFAULT_SAMPLE_SECONDS, output_dir=None, time_ranges=None):
+        self.input_path = input_path
+        self.video_info = video_info
+        self.interval_range = interval_range
+        self.delete_frames = delete_frames
+        self.pixel_mode = pixel_mode
+        self.variant_count = max(1, variant_count)
+        self.resources = resources or ResourceLimits()
+        self.sample_count = max(1, sample_count)
+        self.sample_seconds = sample_seconds
+        self.output_dir = output_dir or os.path.dirname(os.path.abspath(input_path))
+        self.fps = video_info['帧率']
+        self.frame_count = video_info['视频总帧数']
+        # 指定处理范围时只在范围内采样，按范围内的帧数外推
+        self.time_ranges = normalize_time_ranges(time_ranges)
+        self.frame_ranges = time_ranges_to_frames(self.time_ranges, self.fps, self.frame_count)
+        self.range_frame_count = sum(end - start for start, end in self.frame_ranges)
+        self.profile = build_encoding_profile(video_info, self.fps, pixel_mode)
+        self.is_running = True
+        self._process_lock = threading.Lock()
+        self._process = None
+
+    def cancel(self):
+        self.is_running = False
+        with self._process_lock:
+            process = self._process
+        kill_process_tree(process)
+
+    def _check_cancelled(self):
+        if not self.is_running:
+            raise EstimateCancelled()
+
+    def _range_position(self, offset):
+        # 各处理范围拼接后的第 offset 帧所在的范围和源视频帧序号
+        for start, end in self.frame_ranges:
+            if offset < end - start:
+                return start, end, start + offset
+            offset -= end - start
+        start, end = self.frame_ranges[-1]
+        return start, end, end - 1
+
+    def _sample_windows(self):
+        # 返回 [(起始帧, 帧数), ...]，窗口不跨越处理范围；范围太短时每个范围整段作为一个窗口
+        window_frames = max(1, int(self.sample_seconds * self.fps))
+        if self.range_frame_count <= window_frames * self.sample_count:
+            return [(start, end - start) for start, end in self.frame_ranges]
+        windows = []
+        for index in range(self.sample_count):
+            range_start, range_end, center = self._range_position(
+                int(self.range_frame_count * (index + 0.5) / self.sample_count))
+            frames = min(window_frames, range_end - range_start)
+            start = min(max(range_start, center - frames // 2), range_end - frames)
+            windows.append((start, frames))
+        return windows
+
+    def _run_ffmpeg(self, command):
+        process = popen_hidden(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.resources.apply_to_pid(process.pid)
+        with self._process_lock:
+            self._process = process
+        try:
+            _, stderr = process.communicate()
+        finally:
+            with self._process_lock:
+                self._process = None
+        self._check_cancelled()
+        if process.returncode != 0:
+            raise IOError(f"采样编码失败: {stderr.decode(errors='ignore')}")
+
+    def _sample_native(self, windows, work_dir, progress_callback):
+        # 原始像素格式模式：视频阶段就是最终编码，合成时只复制视频流
+        samples = []
+        for index, (start, frames) in enumerate(windows):
+            output_path = os.path.join(work_dir, f'sample{index}.mp4')
+            command = build_native_segment_command(
+                self.input_path, output_path, start, frames, [], self.fps,
+                self.video_info.get('video_stream_info', {}), self.profile, self.resources.ffmpeg_args()
+            )
+            started = time.time()
+            self._run_ffmpeg(command)
+            elapsed = time.time() - started
+            size = os.path.getsize(output_path)
+            samples.append({"frames": frames, "video_seconds": elapsed, "encode_seconds": 0.0,
+                            "intermediate_bytes": size, "output_bytes": size})
+            progress_callback(int((index + 1) / len(windows) * 100), "采样编码")
+        return samples
+
+    def _sample_bgr8(self, windows, work_dir, progress_callback):
+        # 与正式处理相同的两步：解码后经 OpenCV 写入中间分段，合成时再按输出参数编码
+        backend = open_backend(self.input_path, BACKEND_AUTO, self.resources.max_threads)
+        try:
+            samples = []
+            for index, (start, frames) in enumerate(windows):
+                segment_path = os.path.join(work_dir, f'sample{index}_seg.mp4')
+                output_path = os.path.join(work_dir, f'sample{index}.mp4')
+                started = time.time()
+                backend.seek(start)
+                writer = cv2.VideoWriter(segment_path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps,
+                                         (backend.width, backend.height))
+                written = 0
+                try:
+                    while written < frames:
+                        self._check_cancelled()
+                        ret, frame = backend.read()
+                        if not ret:
+                            break
+                        writer.write(frame)
+                        written += 1
+                finally:
+                    writer.release()
+                video_seconds = time.time() - started
+                if written == 0:
+                    continue
+                progress_callback(int((index + 0.5) / len(windows) * 100), "采样编码")
+
+                command = ['ffmpeg', '-i', segment_path, '-an'] + video_encode_args(self.profile)
+                command += self.resources.ffmpeg_args() + ['-y', '-loglevel', 'error', output_path]
+                started = time.time()
+                self._run_ffmpeg(command)
+                samples.append({
+                    "frames": written,
+                    "video_seconds": video_seconds,
+                    "encode_seconds": time.time() - started,
+                    "intermediate_bytes": os.path.getsize(segment_path),
+                    "output_bytes": os.path.getsize(output_path),
+                })
+                progress_callback(int((index + 1) / len(windows) * 100), "采样编码")
+            if not samples:
+                raise IOError("无法从视频中读取采样帧")
+            return samples
+        finally:
+            backend.release()
+
+    def estimate(self, progress_callback=None):
+        progress_callback = progress_callback or (lambda percent, stage: None)
+        started = time.time()
+        windows = self._sample_windows()
+        work_dir = tempfile.mkdtemp(prefix='randframedel_estimate_')
+        try:
+            if self.pixel_mode == PIXEL_MODE_NATIVE:
+                samples = self._sample_native(windows, work_dir, progress_callback)
+            else:
+                samples = self._sample_bgr8(windows, work_dir, progress_callback)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        result = self._extrapolate(samples)
+        result["estimate_seconds"] = time.time() - started
+        progress_callback(100, "估算完成")
+        return result
+
+    def _extrapolate(self, samples):
+        sampled_frames = sum(sample["frames"] for sample in samples)
+        sampled_duration = sampled_frames / self.fps
+        plan = plan_deletions(self.frame_count, self.fps, self.interval_range, self.delete_frames, 0,
+                              frame_ranges=self.frame_ranges if self.time_ranges else None)
+        output_frames = self.range_frame_count - sum(len(frames) for _, frames in plan)
+        output_duration = output_frames / self.fps
+        has_audio = bool(self.video_info.get('是否包含音频'))
+
+        # 视频阶段按范围内的源帧数外推，编码（bgr8 模式在合成阶段）按输出帧数外推
+        video_seconds = sum(sample["video_seconds"] for sample in samples) / sampled_frames * self.range_frame_count
+        encode_seconds = sum(sample["encode_seconds"] for sample in samples) / sampled_frames * output_frames
+        resolution = self.video_info.get('分辨率')
+        codec = self.video_info.get('video_stream_info', {}).get('codec_name')
+        stages = ["audio", "merge"] if has_audio else ["merge"]
+        # 采样无法覆盖的阶段（音频渲染、流复制合成）沿用历史吞吐量
+        history = ThroughputStore().estimate_stage_seconds(resolution, codec, stages, self.range_frame_count)
+        audio_seconds = history.get("audio", 0.0) * self.variant_count
+        if self.pixel_mode == PIXEL_MODE_NATIVE:
+            merge_seconds = history["merge"] * self.variant_count
+        else:
+            merge_seconds = encode_seconds * self.variant_count
+
+        video_bytes_per_second = sum(sample["output_bytes"] for sample in samples) / sampled_duration
+        intermediate_bytes_per_second = sum(sample["intermediate_bytes"] for sample in samples) / sampled_duration
+        audio_bytes_per_second = int(self.profile['audio_bitrate'].replace('k', '')) * 1000 / 8 if has_audio else 0
+        output_bytes = int((video_bytes_per_second + audio_bytes_per_second) * output_duration * CONTAINER_OVERHEAD)
+
+        # 合成时中间分段、提取和渲染后的 WAV 以及输出文件同时存在
+        wav_bytes = 0
+        if has_audio:
+            audio_duration = self.video_info.get('音频时长') or output_duration
+            if self.time_ranges:
+                # 只提取第一个范围开始到最后一个范围结束之间的音频
+                audio_duration = (self.frame_ranges[-1][1] - self.frame_ranges[0][0]) / self.fps
+            sample_rate = self.video_info.get('音频采样率') or 48000
+            wav_bytes = int(audio_duration * sample_rate * ASSUMED_AUDIO_CHANNELS * PCM_SAMPLE_BYTES)
+        intermediate_bytes = int(intermediate_bytes_per_second * output_duration) * self.variant_count
+        scratch_bytes = intermediate_bytes + wav_bytes * (1 + self.variant_count) + output_bytes * self.variant_count
+
+        return {
+            "pixel_mode": self.pixel_mode,
+            "variant_count": self.variant_count,
+            "sample_windows": len(samples),
+            "sampled_frames": sampled_frames,
+            "sample_fps": sampled_frames / max(sum(s["video_seconds"] + s["encode_seconds"] for s in samples), 1e-6),
+            "output_frames": output_frames,
+            "output_duration": output_duration,
+            "video_bitrate_kbps": video_bytes_per_second * 8 / 1000,
+            "stage_seconds": {"video": video_seconds, "audio": audio_seconds, "merge": merge_seconds},
+            "total_seconds": video_seconds + audio_seconds + merge_seconds,
+            "output_bytes": output_bytes * self.variant_count,
+            "scratch_bytes": scratch_bytes,
+            "free_bytes": shutil.disk_usage(self.output_dir).free,
+        }
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}小时{minutes}分{seconds}秒"
+    return f"{minutes}分{seconds}秒"
+
+
+def format_estimate(estimate):
+    # 界面和命令行共用的文字说明
+    mb = 1024 * 1024
+    stages = estimate["stage_seconds"]
+    lines = [
+        "开销估算：",
+        f"采样：{estimate['sample_windows']} 个窗口共 {estimate['sampled_frames']} 帧，"
+        f"速度 {estimate['sample_fps']:.1f} 帧/秒",
+        f"预计处理时间：{_format_duration(estimate['total_seconds'])}"
+        f"（视频 {_format_duration(stages['video'])}，音频 {_format_duration(stages['audio'])}，"
+        f"合成 {_format_duration(stages['merge'])}）",
+        f"预计输出大小：{estimate['output_bytes'] / mb:.1f} MB（视频码率约 {estimate['video_bitrate_kbps']:.0f} kbps）",
+        f"临时文件峰值：{estimate['scratch_bytes'] / mb:.1f} MB，输出目录剩余空间 {estimate['free_bytes'] / mb:.0f} MB",
+    ]
+    if estimate["scratch_bytes"] > estimate["free_bytes"]:
+        lines.append("警告：输出目录剩余空间不足")
+    return "\n".join(lines)
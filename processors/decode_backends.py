@@ -0,0 +1,216 @@
+import wave
+import logging
+from fractions import Fraction
+
+import cv2
+import numpy as np
+
+# PyAV 为可选依赖，未安装时退回 OpenCV/ffmpeg
+try:
+    import av
+except ImportError:
+    av = None
+
+BACKEND_AUTO = 'auto'
+BACKEND_OPENCV = 'opencv'
+BACKEND_PYAV = 'pyav'
+
+logger = logging.getLogger(__name__)
+
+
+class DecodeBackend:
+    # 处理器使用的解码接口，与 cv2.VideoCapture 的 grab/retrieve 用法保持一致
+    name = None
+    supports_packets = False
+    supports_audio = False
+
+    def open(self, path):
+        raise NotImplementedError
+
+    def grab(self):
+        raise NotImplementedError
+
+    def retrieve(self, buffer=None):
+        raise NotImplementedError
+
+    def read(self, buffer=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(buffer)
+
+    def seek(self, frame_index):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def keyframe_times(self):
+        raise NotImplementedError(f"{self.name} 后端不支持读取关键帧信息")
+
+    def extract_audio_wav(self, output_path, should_continue=None):
+        raise NotImplementedError(f"{self.name} 后端不支持音频解码")
+
+
+class OpenCVBackend(DecodeBackend):
+    name = BACKEND_OPENCV
+
+    def __init__(self, threads=None):
+        self.cap = None
+        self.threads = threads
+
+    def open(self, path):
+        if self.threads and hasattr(cv2, 'CAP_PROP_N_THREADS'):
+            # 限制 OpenCV 内部 FFmpeg 解码器的线程数
+            self.cap = cv2.VideoCapture(path, cv2.CAP_ANY, [cv2.CAP_PROP_N_THREADS, self.threads])
+        else:
+            self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"无法打开视频文件: {path}")
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return self
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self, buffer=None):
+        return self.cap.retrieve(buffer)
+
+    def seek(self, frame_index):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class PyAVBackend(DecodeBackend):
+    # 在进程内完成解复用和解码，可访问数据包级信息（关键帧标记、pts）
+    name = BACKEND_PYAV
+    supports_packets = True
+    supports_audio = True
+
+    def __init__(self, threads=None):
+        self.threads = threads
+        self.container = None
+        self.path = None
+        self._frames = None
+        self._current = None
+        self._pending = None
+
+    def open(self, path):
+        self.path = path
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = 'AUTO'
+        if self.threads:
+            self.stream.thread_count = self.threads
+        context = self.stream.codec_context
+        self.width = context.width
+        self.height = context.height
+        rate = self.stream.average_rate or self.stream.guessed_rate
+        self.fps = float(rate) if rate else 0.0
+        self.frame_count = self.stream.frames or int((self.stream.duration or 0) * self.stream.time_base * self.fps)
+        self.start_pts = self.stream.start_time or 0
+        self._frames = self.container.decode(self.stream)
+        return self
+
+    def grab(self):
+        # 解码但不转换为 BGR，删除的帧只需要 grab
+        if self._pending is not None:
+            self._current, self._pending = self._pending, None
+            return True
+        self._current = next(self._frames, None)
+        return self._current is not None
+
+    def retrieve(self, buffer=None):
+        if self._current is None:
+            return False, None
+        # 转换为 BGR 后直接拷贝进调用方的缓冲区，流水线可以复用帧缓冲
+        frame = self._current.reformat(format='bgr24')
+        plane = frame.planes[0]
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(frame.height, plane.line_size)
+        image = rows[:, :frame.width * 3].reshape(frame.height, frame.width, 3)
+        if buffer is None or buffer.shape != image.shape or buffer.dtype != image.dtype:
+            return True, image.copy()
+        np.copyto(buffer, image)
+        return True, buffer
+
+    def _frame_pts(self, frame_index):
+        return self.start_pts + int(Fraction(frame_index) / Fraction(self.fps).limit_denominator(100000) / self.stream.time_base)
+
+    def seek(self, frame_index):
+        # 先跳到目标之前的关键帧，再向前解码到目标帧
+        target_pts = self._frame_pts(frame_index)
+        half_frame = int(1 / (2 * self.fps * self.stream.time_base)) if self.fps else 0
+        self.container.seek(target_pts, stream=self.stream, backward=True, any_frame=False)
+        self._frames = self.container.decode(self.stream)
+        self._pending = None
+        for frame in self._frames:
+            if frame.pts is None or frame.pts >= target_pts - half_frame:
+                self._pending = frame
+                break
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+            self._frames = None
+
+    def keyframe_times(self):
+        # 只解复用不解码，读取关键帧时间
+        times = []
+        with av.open(self.path) as container:
+            stream = container.streams.video[0]
+            for packet in container.demux(stream):
+                if packet.is_keyframe and packet.pts is not None:
+                    times.append(float((packet.pts - (stream.start_time or 0)) * stream.time_base))
+        return sorted(times)
+
+    def extract_audio_wav(self, output_path, should_continue=None):
+        # 复用已打开的容器解码音频，转为 16 位 PCM 写入 WAV
+        if not self.container.streams.audio:
+            raise IOError("视频中没有音频流")
+        stream = self.container.streams.audio[0]
+        channels = len(stream.layout.channels)
+        resampler = av.AudioResampler(format='s16', layout=stream.layout.name, rate=stream.rate)
+        self.container.seek(0)
+        with wave.open(output_path, 'wb') as wav_file:
+            wav_file.setnchannels(channels)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(stream.rate)
+            for frame in self.container.decode(stream):
+                if should_continue is not None and not should_continue():
+                    return False
+                for resampled in resampler.resample(frame):
+                    wav_file.writeframes(resampled.to_ndarray().tobytes())
+            for resampled in resampler.resample(None):
+                wav_file.writeframes(resampled.to_ndarray().tobytes())
+        # 音频解码改变了容器的读取位置，视频需要重新定位
+        self.seek(0)
+        return True
+
+
+def create_backend(name=BACKEND_AUTO, threads=None):
+    if name in (BACKEND_AUTO, BACKEND_PYAV) and av is not None:
+        return PyAVBackend(threads)
+    if name == BACKEND_PYAV:
+        logger.warning("未安装 PyAV，解码后端退回 OpenCV")
+    return OpenCVBackend(threads)
+
+
+def open_backend(path, name=BACKEND_AUTO, threads=None):
+    # threads 限制解码线程数，None 表示由解码库自行决定
+    backend = create_backend(name, threads)
+    try:
+        return backend.open(path)
+    except Exception as e:
+        if backend.name == BACKEND_OPENCV:
+            raise
+        # PyAV 打开失败时同样退回 OpenCV
+        logger.warning(f"PyAV 无法打开 {path}，退回 OpenCV: {str(e)}")
+        backend.release()
+        return OpenCVBackend(threads).open(path)
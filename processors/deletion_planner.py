@@ -0,0 +1,101 @@
+import bisect
+import random
+
+# 按删除代价加权时，代价（灰度平均差）每增加一倍，被选中的权重约按平方下降
+COST_WEIGHT_POWER = 2
+
+
+def parse_interval_range(interval_range):
+    start_sec, end_sec = map(int, interval_range.split('-'))
+    return start_sec, end_sec
+
+
+def new_seed():
+    return random.SystemRandom().randrange(2 ** 32)
+
+
+def pick_frames(rng, frames_per_second, count, base, frame_costs=None):
+    # 在一秒内选出要删除的帧（相对序号）。提供逐帧删除代价时按代价加权无放回抽样
+    # （Efraimidis-Spirakis：取 u^(1/w) 最大的若干个），画面变化小的帧更容易被选中，仍保留随机性
+    if frame_costs is None or base + frames_per_second > len(frame_costs):
+        return rng.sample(range(frames_per_second), count)
+    keys = []
+    for offset in range(frames_per_second):
+        weight = 1.0 / (1.0 + float(frame_costs[base + offset])) ** COST_WEIGHT_POWER
+        keys.append((rng.random() ** (1.0 / weight), offset))
+    return [offset for _, offset in sorted(keys, reverse=True)[:count]]
+
+
+def second_rng(seed, second):
+    # 某一秒内抽取删除帧用的随机数生成器，只由种子和秒数决定，与其他秒的抽样无关
+    return random.Random(f"{seed}:{second}")
+
+
+def iter_deletions(fps, interval_range, delete_frames, seed, frame_costs=None):
+    # 按随机间隔选择秒数，在每个选中的秒内随机删除若干帧；不需要预先知道总帧数，
+    # 流式处理可以随着帧的到来逐步取出计划，与 plan_deletions 在完整的秒内得到相同的结果
+    # 选中哪些秒只取决于种子和间隔范围，相邻两次删除的间隔始终在间隔范围内；
+    # 每秒删除哪些帧只取决于种子、秒数、删除帧数和这一秒的删除代价，删除代价的局部变化不会改变其他秒
+    rng = random.Random(seed)
+    start_sec, end_sec = parse_interval_range(interval_range)
+    frames_per_second = int(fps)
+    count = min(delete_frames, frames_per_second)
+    current_sec = rng.randint(max(1, start_sec), end_sec)
+    while True:
+        frames_to_delete = pick_frames(second_rng(seed, current_sec), frames_per_second, count,
+                                       current_sec * frames_per_second, frame_costs)
+        if frames_to_delete:
+            yield current_sec, [frame + current_sec * frames_per_second for frame in frames_to_delete]
+        current_sec += rng.randint(max(1, start_sec), end_sec)
+
+
+def plan_deletions(frame_count, fps, interval_range, delete_frames, seed, frame_costs=None, frame_ranges=None):
+    # 相同的参数、种子和删除代价总是得到相同的计划；只在完整的秒内删除
+    # frame_ranges 为 [(start, end), ...] 时只保留完全落在这些范围内的删除，与整段计划在这些范围内相同
+    total_seconds = int(frame_count / fps)
+    deleted_frames_info = []
+    for current_sec, frames in iter_deletions(fps, interval_range, delete_frames, seed, frame_costs):
+        if current_sec >= total_seconds:
+            break
+        if frame_ranges is not None:
+            if current_sec * int(fps) >= frame_ranges[-1][1]:
+                break
+            if not any(start <= min(frames) and max(frames) < end for start, end in frame_ranges):
+                continue
+        deleted_frames_info.append((current_sec, frames))
+    return deleted_frames_info
+
+
+def deleted_frame_set(deleted_frames_info):
+    return set(frame for _, frames in deleted_frames_info for frame in frames)
+
+
+def kept_frame_ranges(deleted_frames, total_frames, frame_ranges=None):
+    # 把保留的帧合并为连续区间 [start, end)；frame_ranges 限定只保留这些范围内的帧
+    ranges = []
+    deleted = sorted(set(f for f in deleted_frames if 0 <= f < total_frames))
+    for range_start, range_end in frame_ranges or [(0, total_frames)]:
+        start = range_start
+        range_end = min(range_end, total_frames)
+        for frame in deleted[bisect.bisect_left(deleted, range_start):bisect.bisect_left(deleted, range_end)]:
+            if frame > start:
+                ranges.append((start, frame))
+            start = frame + 1
+        if start < range_end:
+            ranges.append((start, range_end))
+    return ranges
+
+
+def keyframe_segment_ranges(keyframes, total_frames, target_frames):
+    # 按目标长度切分 [0, total_frames)，边界对齐到关键帧，使每个分段都可以从关键帧开始独立解码
+    # 没有关键帧信息时按等长切分
+    target_frames = max(1, target_frames)
+    boundaries = [0]
+    if keyframes:
+        for frame in sorted(set(keyframes)):
+            if 0 < frame < total_frames and frame - boundaries[-1] >= target_frames:
+                boundaries.append(frame)
+    else:
+        boundaries = list(range(0, total_frames, target_frames)) or [0]
+    boundaries.append(total_frames)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
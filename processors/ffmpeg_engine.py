@@ -0,0 +1,87 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 高位深像素格式优先使用 libx265 编码，以保留位深
+HIGH_BIT_DEPTH_ENCODER = 'libx265'
+
+# ffprobe 中表示未知色彩信息的取值
+UNKNOWN_COLOR_VALUES = (None, '', 'unknown', 'unspecified', 'reserved')
+
+
+def is_high_bit_depth(pix_fmt):
+    return bool(pix_fmt) and any(depth in pix_fmt for depth in ('p10', 'p12', 'p14', 'p16'))
+
+
+def build_select_filter(local_deleted_frames, frame_limit, fps):
+    # 用 select 滤镜在 ffmpeg 内部丢弃帧，帧序号相对于本段起点
+    expression = f"lt(n,{frame_limit})"
+    if local_deleted_frames:
+        terms = '+'.join(f"eq(n,{frame})" for frame in sorted(local_deleted_frames))
+        expression += f"*not({terms})"
+    return f"select='{expression}',setpts=N/({fps}*TB)"
+
+
+def color_args(stream_info):
+    # 把源视频的色彩元数据原样写入输出
+    args = []
+    mapping = (
+        ('color_primaries', '-color_primaries'),
+        ('color_transfer', '-color_trc'),
+        ('color_space', '-colorspace'),
+        ('color_range', '-color_range'),
+    )
+    for key, option in mapping:
+        value = stream_info.get(key)
+        if value not in UNKNOWN_COLOR_VALUES:
+            args += [option, value]
+    return args
+
+
+def native_video_codec(stream_info, default_codec):
+    if is_high_bit_depth(stream_info.get('pix_fmt')):
+        return HIGH_BIT_DEPTH_ENCODER
+    return default_codec
+
+
+def video_encode_args(profile):
+    # 输出视频的编码参数，按目标码率限制峰值码率
+    video_bitrate = profile['video_bitrate']
+    return [
+        '-c:v', profile['video_codec'],
+        '-preset', profile['preset'],
+        '-b:v', video_bitrate,
+        '-maxrate', video_bitrate,
+        '-bufsize', f"{int(video_bitrate.replace('k', '')) * 2}k",
+    ]
+
+
+def build_native_segment_command(input_path, output_path, start_frame, frame_limit, local_deleted_frames,
+                                 fps, stream_info, profile, thread_args=()):
+    # 在源像素格式下完成解码、丢帧和编码，帧数据不经过 Python 和 BGR 转换
+    kept_frames = frame_limit - len(local_deleted_frames)
+    # 向前偏移半帧，避免浮点误差导致精确定位落到相邻帧
+    start_time = max(0.0, (start_frame - 0.5) / fps)
+    command = [
+        'ffmpeg',
+        '-ss', f"{start_time:.6f}",
+        '-i', input_path,
+        '-map', '0:v:0',
+        '-an', '-sn', '-dn',
+        '-vf', build_select_filter(local_deleted_frames, frame_limit, fps),
+        '-r', str(fps),
+        '-frames:v', str(kept_frames),
+    ] + video_encode_args(profile)
+    pix_fmt = stream_info.get('pix_fmt')
+    if pix_fmt:
+        command += ['-pix_fmt', pix_fmt]
+    command += color_args(stream_info)
+    command += list(thread_args)
+    command += [
+        '-y',
+        '-loglevel', 'error',
+        '-progress', 'pipe:1',
+        '-nostats',
+        output_path
+    ]
+    return command
@@ -0,0 +1,122 @@
+import queue
+import logging
+import threading
+
+import numpy as np
+
+# 解码线程与写入线程之间默认的帧队列长度
+DEFAULT_QUEUE_DEPTH = 8
+
+# 阻塞的队列操作每隔多久检查一次停止标志（秒）
+POLL_INTERVAL = 0.1
+
+
+class FramePipeline:
+    # 解码线程和写入线程通过有界队列连接，帧缓冲区预先分配并循环使用
+    # transform_pool 不为空时，帧在入队后交给变换进程池处理，写入线程按顺序等待各帧变换完成
+    def __init__(self, cap, frame_shape, queue_depth=DEFAULT_QUEUE_DEPTH, transform_pool=None):
+        self.cap = cap
+        self.logger = logging.getLogger(__name__)
+        self.transform_pool = transform_pool
+        self._free_buffers = queue.Queue()
+        if transform_pool is not None:
+            # 缓冲区是共享内存中的槽位，数量由进程池决定
+            buffers = transform_pool.buffers()
+            self.queue_depth = max(1, len(buffers) - 2)
+            for buffer in buffers:
+                self._free_buffers.put(buffer)
+            return
+        self.queue_depth = max(1, queue_depth)
+        # 队列中的帧、解码线程和写入线程各自持有的帧都需要缓冲区
+        for _ in range(self.queue_depth + 2):
+            self._free_buffers.put(np.empty(frame_shape, dtype=np.uint8))
+
+    def _put(self, target_queue, item, stop_event):
+        while not stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, source_queue, stop_event):
+        while not stop_event.is_set():
+            try:
+                return source_queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return None
+
+    def run(self, start, end, deleted_frames, write_frame, should_continue, on_frame=None):
+        # 处理 [start, end) 范围内的帧，返回 (下一帧位置, 写入帧数)
+        frame_queue = queue.Queue(maxsize=self.queue_depth)
+        stop_event = threading.Event()
+        state = {"position": start, "written": 0, "error": None}
+
+        def decode():
+            try:
+                for i in range(start, end):
+                    if not should_continue() or stop_event.is_set():
+                        break
+                    if i in deleted_frames:
+                        # 删除的帧只 grab 不 retrieve，省去解码后的颜色转换
+                        if not self.cap.grab():
+                            break
+                        state["position"] = i + 1
+                        continue
+
+                    buffer = self._get(self._free_buffers, stop_event)
+                    if buffer is None:
+                        break
+                    if not self.cap.grab():
+                        self._free_buffers.put(buffer)
+                        break
+                    ret, frame = self.cap.retrieve(buffer)
+                    if not ret:
+                        self._free_buffers.put(buffer)
+                        break
+                    state["position"] = i + 1
+                    if self.transform_pool is not None:
+                        # retrieve 没有写入共享内存槽位时复制一次，工作进程只能访问槽位
+                        if frame is not buffer:
+                            np.copyto(buffer, frame)
+                            frame = buffer
+                        self.transform_pool.submit(frame, i)
+                    if not self._put(frame_queue, (i, frame), stop_event):
+                        break
+            except Exception as e:
+                state["error"] = e
+                stop_event.set()
+            finally:
+                self._put(frame_queue, None, stop_event)
+
+        def write():
+            try:
+                while True:
+                    item = self._get(frame_queue, stop_event)
+                    if item is None:
+                        break
+                    i, frame = item
+                    if self.transform_pool is not None and not self.transform_pool.wait(frame, stop_event):
+                        break
+                    write_frame(frame)
+                    state["written"] += 1
+                    # retrieve 可能重新分配了数组，把实际使用的数组放回缓冲池
+                    self._free_buffers.put(frame)
+                    if on_frame is not None:
+                        on_frame(i)
+            except Exception as e:
+                state["error"] = e
+                stop_event.set()
+
+        decoder = threading.Thread(target=decode, name="frame-decoder", daemon=True)
+        writer = threading.Thread(target=write, name="frame-writer", daemon=True)
+        decoder.start()
+        writer.start()
+        decoder.join()
+        writer.join()
+
+        if state["error"] is not None:
+            raise state["error"]
+        return state["position"], state["written"]
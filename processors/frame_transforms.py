@@ -0,0 +1,194 @@
+import importlib
+
+import cv2
+import numpy as np
+
+# 帧变换规格："名称[:参数=值,参数=值]"，例如 noise:strength=3、watermark:text=demo,opacity=0.4
+# 名称可以是内置变换，也可以是插件类的完整路径（例如 mypackage.transforms.Blur）
+
+
+class FrameTransform:
+    # 帧变换插件的接口。实例在工作进程中创建，apply 直接修改传入的帧（共享内存中的 BGR uint8 视图），
+    # 不能改变帧的尺寸。随机数只能取自 rng：rng 由任务种子和帧序号决定，结果与并行调度无关
+    name = None
+
+    def setup(self, frame_shape):
+        pass
+
+    def apply(self, frame, index, rng):
+        raise NotImplementedError
+
+
+class NoiseTransform(FrameTransform):
+    # 轻微的高斯噪声，strength 为标准差（0-255 灰度级）
+    name = 'noise'
+
+    def __init__(self, strength=2.0):
+        self.strength = float(strength)
+        if self.strength <= 0:
+            raise ValueError(f"噪声强度必须大于 0: {strength}")
+        self._noise = None
+
+    def setup(self, frame_shape):
+        self._noise = np.empty(frame_shape, dtype=np.int16)
+
+    def apply(self, frame, index, rng):
+        cv2.setRNGSeed(int(rng.integers(2 ** 31)))
+        cv2.randn(self._noise, 0, self.strength)
+        cv2.add(frame, self._noise, dst=frame, dtype=cv2.CV_8U)
+
+
+class JitterTransform(FrameTransform):
+    # 随机裁掉边缘的一小部分再缩放回原尺寸，amount 为最大裁剪比例
+    name = 'jitter'
+
+    def __init__(self, amount=0.02):
+        self.amount = float(amount)
+        if not 0 < self.amount < 0.5:
+            raise ValueError(f"抖动比例必须在 0-0.5 之间: {amount}")
+
+    def apply(self, frame, index, rng):
+        height, width = frame.shape[:2]
+        scale = 1.0 - rng.uniform(0, self.amount)
+        crop_width = max(1, int(width * scale))
+        crop_height = max(1, int(height * scale))
+        x = int(rng.integers(0, width - crop_width + 1))
+        y = int(rng.integers(0, height - crop_height + 1))
+        region = frame[y:y + crop_height, x:x + crop_width]
+        frame[:] = cv2.resize(region, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+class WatermarkTransform(FrameTransform):
+    # 半透明文字或图片水印；image 为图片路径（PNG 的 alpha 通道作为透明度），position 为角落：tl/tr/bl/br
+    name = 'watermark'
+    POSITIONS = ('tl', 'tr', 'bl', 'br')
+
+    def __init__(self, text='RandFrameDel', image=None, opacity=0.3, scale=1.0, position='br', margin=16):
+        if position not in self.POSITIONS:
+            raise ValueError(f"水印位置应为 {'/'.join(self.POSITIONS)}: {position}")
+        self.text = str(text)
+        self.image = image
+        self.opacity = float(opacity)
+        self.scale = float(scale)
+        self.position = position
+        self.margin = int(margin)
+        self._overlay = None
+        self._alpha = None
+        self._origin = None
+
+    def _render_text(self):
+        thickness = max(1, int(round(2 * self.scale)))
+        (width, height), baseline = cv2.getTextSize(self.text, cv2.FONT_HERSHEY_SIMPLEX, self.scale, thickness)
+        patch = np.zeros((height + baseline, width, 3), dtype=np.uint8)
+        cv2.putText(patch, self.text, (0, height), cv2.FONT_HERSHEY_SIMPLEX, self.scale, (255, 255, 255),
+                    thickness, cv2.LINE_AA)
+        return patch, patch.max(axis=2).astype(np.float32) / 255
+
+    def _load_image(self):
+        image = cv2.imread(self.image, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f"无法读取水印图片: {self.image}")
+        if self.scale != 1.0:
+            image = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        if image.shape[2] == 4:
+            return image[:, :, :3].copy(), image[:, :, 3].astype(np.float32) / 255
+        return image, np.ones(image.shape[:2], dtype=np.float32)
+
+    def setup(self, frame_shape):
+        patch, alpha = self._load_image() if self.image else self._render_text()
+        frame_height, frame_width = frame_shape[:2]
+        # 水印大于画面时裁掉超出的部分
+        patch = patch[:frame_height - self.margin, :frame_width - self.margin]
+        alpha = alpha[:patch.shape[0], :patch.shape[1]]
+        height, width = patch.shape[:2]
+        x = self.margin if self.position in ('tl', 'bl') else frame_width - width - self.margin
+        y = self.margin if self.position in ('tl', 'tr') else frame_height - height - self.margin
+        self._origin = (max(0, x), max(0, y))
+        self._alpha = (alpha * self.opacity)[:, :, np.newaxis]
+        self._overlay = patch.astype(np.float32) * self._alpha
+
+    def apply(self, frame, index, rng):
+        x, y = self._origin
+        height, width = self._overlay.shape[:2]
+        region = frame[y:y + height, x:x + width]
+        region[:] = (region * (1 - self._alpha) + self._overlay).astype(np.uint8)
+
+
+TRANSFORMS = {cls.name: cls for cls in (NoiseTransform, JitterTransform, WatermarkTransform)}
+
+
+def register_transform(cls):
+    # 注册自定义变换，之后可以在规格中直接使用 cls.name
+    TRANSFORMS[cls.name] = cls
+    return cls
+
+
+def _parse_value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_transform(text):
+    name, _, params_text = str(text).strip().partition(':')
+    if not name:
+        raise ValueError(f"帧变换格式应为 \"名称[:参数=值,...]\"，实际为: {text}")
+    params = {}
+    for item in filter(None, params_text.split(',')):
+        key, sep, value = item.partition('=')
+        if not sep or not key.strip():
+            raise ValueError(f"帧变换参数格式应为 参数=值: {item}")
+        params[key.strip()] = _parse_value(value.strip())
+    return {"name": name, "params": params}
+
+
+def resolve_transform(name, allow_plugins=True):
+    # allow_plugins 为 False 时只接受已注册的变换，不按名称导入模块
+    if name in TRANSFORMS:
+        return TRANSFORMS[name]
+    module_name, _, class_name = name.rpartition('.')
+    if not module_name or not allow_plugins:
+        raise ValueError(f"未知的帧变换: {name}，可用的变换有 {', '.join(sorted(TRANSFORMS))}")
+    try:
+        cls = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"无法加载帧变换插件 {name}: {str(e)}")
+    if not (isinstance(cls, type) and issubclass(cls, FrameTransform)):
+        raise ValueError(f"{name} 不是 FrameTransform 的子类")
+    return cls
+
+
+def create_transform(spec, allow_plugins=True):
+    try:
+        return resolve_transform(spec["name"], allow_plugins)(**spec["params"])
+    except TypeError as e:
+        raise ValueError(f"帧变换 {spec['name']} 的参数无效: {str(e)}")
+
+
+def normalize_transforms(transforms, allow_plugins=True):
+    # 接受规格字符串或 {"name", "params"} 字典，按给定顺序依次执行；创建一次实例以便尽早发现参数错误
+    result = []
+    for item in transforms or []:
+        if isinstance(item, dict):
+            spec = {"name": str(item.get("name", "")), "params": dict(item.get("params") or {})}
+        else:
+            spec = parse_transform(item)
+        create_transform(spec, allow_plugins)
+        result.append(spec)
+    return result
+
+
+def build_transforms(specs, frame_shape):
+    transforms = [create_transform(spec) for spec in specs]
+    for transform in transforms:
+        transform.setup(frame_shape)
+    return transforms
+
+
+def frame_rng(seed, index):
+    return np.random.default_rng([seed or 0, index])
@@ -0,0 +1,158 @@
+import os
+import json
+import logging
+import time
+
+from utils.file_utils import get_file_checksum, get_file_fingerprint
+
+MANIFEST_VERSION = 1
+
+
+class JobManifest:
+    # 记录任务计划、种子和已完成的分段，任务中断后据此从最后完成的分段继续
+    def __init__(self, manifest_path, data):
+        self.manifest_path = manifest_path
+        self.data = data
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def manifest_path_for(output_path):
+        return output_path.rsplit('.', 1)[0] + '_job.json'
+
+    @classmethod
+    def load(cls, manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"读取任务清单失败，将重新开始: {str(e)}")
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(manifest_path, data)
+
+    @classmethod
+    def create(cls, manifest_path, input_path, params, seed, plan, segment_frames):
+        data = {
+            "version": MANIFEST_VERSION,
+            "created": time.time(),
+            "input_path": os.path.abspath(input_path),
+            "input_fingerprint": get_file_fingerprint(input_path),
+            "params": params,
+            "seed": seed,
+            "plan": [[sec, frames] for sec, frames in plan],
+            "segment_frames": segment_frames,
+            "segments": {},
+            "stages": {},
+        }
+        manifest = cls(manifest_path, data)
+        manifest.save()
+        return manifest
+
+    def matches(self, input_path, params, seed=None):
+        if self.data.get("input_path") != os.path.abspath(input_path):
+            return False
+        if self.data.get("params") != params:
+            return False
+        if seed is not None and self.data.get("seed") != seed:
+            return False
+        try:
+            return self.data.get("input_fingerprint") == get_file_fingerprint(input_path)
+        except OSError:
+            return False
+
+    @property
+    def seed(self):
+        return self.data["seed"]
+
+    @property
+    def plan(self):
+        return [(sec, frames) for sec, frames in self.data["plan"]]
+
+    @property
+    def segment_frames(self):
+        return self.data["segment_frames"]
+
+    @property
+    def segment_map(self):
+        # 可变长度的分段边界 [[start, end], ...]，未设置时按 segment_frames 等长分段
+        ranges = self.data.get("segment_map")
+        return [(start, end) for start, end in ranges] if ranges is not None else None
+
+    def set_segment_map(self, ranges):
+        self.data["segment_map"] = [[start, end] for start, end in ranges]
+        self.save()
+
+    def save(self):
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.manifest_path)
+
+    def _is_valid_entry(self, entry):
+        if entry and entry["path"] is None:
+            # 没有写入任何帧的分段
+            return True
+        if not entry or not os.path.exists(entry["path"]):
+            return False
+        try:
+            return get_file_checksum(entry["path"]) == entry["checksum"]
+        except OSError:
+            return False
+
+    def is_segment_done(self, index):
+        entry = self.data["segments"].get(str(index))
+        if entry is None:
+            return False
+        if self._is_valid_entry(entry):
+            return True
+        self.logger.warning(f"分段 {index} 校验失败，将重新处理")
+        del self.data["segments"][str(index)]
+        return False
+
+    def mark_segment_done(self, index, path, start_frame, end_frame, frames_written):
+        self.data["segments"][str(index)] = {
+            "path": path if frames_written > 0 else None,
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "frames_written": frames_written,
+            "checksum": get_file_checksum(path) if frames_written > 0 else None,
+        }
+        self.save()
+
+    def has_completed_segments(self):
+        return bool(self.data["segments"])
+
+    def segment_paths(self):
+        paths = [self.data["segments"][key]["path"] for key in sorted(self.data["segments"], key=int)]
+        return [path for path in paths if path is not None]
+
+    def is_stage_done(self, stage):
+        entry = self.data["stages"].get(stage)
+        if entry is None:
+            return False
+        if self._is_valid_entry(entry):
+            return True
+        del self.data["stages"][stage]
+        return False
+
+    def stage_path(self, stage):
+        return self.data["stages"][stage]["path"]
+
+    def mark_stage_done(self, stage, path):
+        self.data["stages"][stage] = {"path": path, "checksum": get_file_checksum(path)}
+        self.save()
+
+    def discard(self):
+        # 任务完成后删除清单和所有分段文件
+        paths = self.segment_paths() + [entry["path"] for entry in self.data["stages"].values()]
+        for path in paths + [self.manifest_path]:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    self.logger.warning(f"删除检查点文件失败 {path}: {str(e)}")
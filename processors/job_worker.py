@@ -0,0 +1,262 @@
+import time
+import signal
+import logging
+import threading
+import multiprocessing
+
+import psutil
+
+from processors.video_processor import VideoProcessingJob
+from processors.multi_variant_processor import MultiVariantJob
+from utils.logging_setup import setup_worker_logging, forward_worker_logs, current_levels
+
+# 处理任务上需要转发给界面的回调
+JOB_SIGNALS = ('progress', 'finished', 'frame_deleted_signal', 'current_second_signal', 'info_signal', 'eta_signal',
+               'resource_signal')
+# 只有部分任务类型才有的回调
+OPTIONAL_JOB_SIGNALS = ('variants_finished',)
+
+JOB_KIND_VIDEO = 'video'
+JOB_KIND_VARIANTS = 'variants'
+JOB_KINDS = {
+    JOB_KIND_VIDEO: VideoProcessingJob,
+    JOB_KIND_VARIANTS: MultiVariantJob,
+}
+
+# 每个工作进程最多执行的任务数，之后退出并由新进程替换，释放累积的内存碎片和解码器状态
+DEFAULT_MAX_JOBS_PER_WORKER = 4
+# 任务结束后工作进程常驻内存超过该值（MB）时提前回收
+DEFAULT_MAX_WORKER_RSS_MB = 1024
+# 保留的空闲工作进程数，下一个任务可以省去启动和导入的时间
+DEFAULT_MAX_IDLE_WORKERS = 1
+# 等待工作进程消息时每隔多久检查一次取消标志和进程状态（秒）
+POLL_INTERVAL = 0.1
+# 发出取消请求后等待任务退出的时间（秒），超时后强制结束工作进程
+STOP_TIMEOUT = 30
+# 退出空闲工作进程时等待的时间（秒）
+CLOSE_TIMEOUT = 5
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerDied(Exception):
+    pass
+
+
+def _run_job(job, send):
+    try:
+        job.run()
+    finally:
+        if not job.is_running:
+            job.cleanup()
+        send(("done",))
+
+
+def job_worker_main(conn, log_queue, log_levels):
+    # 工作进程：逐个执行主进程发来的任务，任务的回调经管道转发；收到 None 或管道关闭时退出
+    # 终端的 Ctrl+C 会发给整个进程组，工作进程的退出由主进程统一控制
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_worker_logging(log_queue, *log_levels)
+    send_lock = threading.Lock()
+
+    def send(message):
+        # 回调可能来自任务的多个线程
+        with send_lock:
+            conn.send(message)
+
+    job = None
+    runner = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            message = None
+        if message is None:
+            break
+        if message[0] == "stop":
+            if job is not None:
+                job.stop()
+            continue
+        _, kind, args, kwargs = message
+        if runner is not None:
+            runner.join()
+        try:
+            job = JOB_KINDS[kind](*args, **kwargs)
+        except Exception as e:
+            logger.error(f"创建处理任务失败: {str(e)}", exc_info=True)
+            job = None
+            send(("signal", "finished", (f"处理失败: {str(e)}", [], {})))
+            send(("done",))
+            continue
+        for name in JOB_SIGNALS + OPTIONAL_JOB_SIGNALS:
+            if hasattr(job, name):
+                getattr(job, name).connect(lambda *args, name=name: send(("signal", name, args)))
+        runner = threading.Thread(target=_run_job, args=(job, send), name="job-runner", daemon=True)
+        runner.start()
+
+    # 主进程退出或关闭管道时，停止正在运行的任务并清理临时文件
+    if runner is not None and runner.is_alive():
+        job.stop()
+        runner.join()
+    conn.close()
+
+
+class JobWorker:
+    # 主进程一侧的工作进程句柄，同一时间只执行一个任务
+    def __init__(self, context, log_queue):
+        self.context = context
+        self.log_queue = log_queue
+        self.process = None
+        self.conn = None
+        self.jobs_run = 0
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process is not None else None
+
+    def start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=job_worker_main, name="job-worker", daemon=True,
+                                            args=(child_conn, self.log_queue, current_levels()))
+        self.process.start()
+        child_conn.close()
+        logger.info(f"处理工作进程已启动: {self.process.pid}")
+        return self
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def rss_mb(self):
+        try:
+            return psutil.Process(self.process.pid).memory_info().rss / 1024 / 1024
+        except psutil.Error:
+            return 0
+
+    def _died(self):
+        self.process.join(1)
+        return JobWorkerDied(f"工作进程意外退出（退出码 {self.process.exitcode}）")
+
+    def run(self, kind, args, kwargs, on_signal, should_stop):
+        # 执行一个任务，回调在调用线程中执行；任务结束时返回 True，取消超时被强制结束时返回 False，
+        # 工作进程崩溃时抛出 JobWorkerDied
+        self.jobs_run += 1
+        try:
+            self.conn.send(("run", kind, args, kwargs))
+        except OSError:
+            raise self._died()
+        stop_sent_at = None
+        while True:
+            if stop_sent_at is None and should_stop():
+                stop_sent_at = time.time()
+                try:
+                    self.conn.send(("stop",))
+                except OSError:
+                    raise self._died()
+            elif stop_sent_at is not None and time.time() - stop_sent_at > STOP_TIMEOUT:
+                logger.warning(f"工作进程 {self.pid} 未在 {STOP_TIMEOUT} 秒内停止，强制结束")
+                self.kill()
+                return False
+            try:
+                if not self.conn.poll(POLL_INTERVAL):
+                    if not self.process.is_alive():
+                        raise self._died()
+                    continue
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                raise self._died()
+            if message[0] == "done":
+                return True
+            _, name, signal_args = message
+            on_signal(name, signal_args)
+
+    def kill(self):
+        # 连同任务启动的 ffmpeg 等子进程一起结束
+        try:
+            parent = psutil.Process(self.process.pid)
+            procs = parent.children(recursive=True) + [parent]
+        except psutil.Error:
+            procs = []
+        for proc in procs:
+            try:
+                proc.kill()
+            except psutil.Error:
+                pass
+        self.process.join()
+        self.conn.close()
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(CLOSE_TIMEOUT)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+        logger.info(f"处理工作进程已退出: {self.process.pid}，共执行 {self.jobs_run} 个任务")
+
+
+class JobWorkerPool:
+    # 处理任务在独立的工作进程中执行：解码器、moviepy/pydub 对象和内存碎片都留在工作进程里，
+    # 工作进程执行一定数量的任务或内存过大后退出，内存随之归还系统；编解码器崩溃也不会影响界面进程
+    def __init__(self, max_jobs_per_worker=DEFAULT_MAX_JOBS_PER_WORKER, max_rss_mb=DEFAULT_MAX_WORKER_RSS_MB,
+                 max_idle=DEFAULT_MAX_IDLE_WORKERS):
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker)
+        self.max_rss_mb = max_rss_mb
+        self.max_idle = max_idle
+        # spawn 在各平台上行为一致，工作进程不继承界面进程的 Qt 状态和线程
+        self.context = multiprocessing.get_context('spawn')
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._log_queue = None
+        self._log_listener = None
+
+    def acquire(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("处理工作进程池已关闭")
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+            if self._log_queue is None:
+                # 工作进程的日志交给本进程写入同一个日志文件
+                self._log_queue = self.context.Queue()
+                self._log_listener = forward_worker_logs(self._log_queue)
+            log_queue = self._log_queue
+        return JobWorker(self.context, log_queue).start()
+
+    def _retire_reason(self, worker):
+        if not worker.is_alive():
+            return "进程已退出"
+        if worker.jobs_run >= self.max_jobs_per_worker:
+            return f"已执行 {worker.jobs_run} 个任务"
+        rss_mb = worker.rss_mb()
+        if rss_mb > self.max_rss_mb:
+            return f"内存占用 {rss_mb:.0f} MB"
+        return None
+
+    def release(self, worker):
+        reason = self._retire_reason(worker)
+        with self._lock:
+            if reason is None and not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(worker)
+                return
+        if reason is not None:
+            logger.info(f"回收处理工作进程 {worker.pid}: {reason}")
+        worker.close()
+
+    def shutdown(self):
+        # 只退出空闲的工作进程；仍在执行任务的工作进程在任务结束归还时退出
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
@@ -0,0 +1,44 @@
+import bisect
+import logging
+
+from processors.video_analyzer import probe_keyframe_times
+from processors.decode_backends import open_backend, BACKEND_AUTO
+
+logger = logging.getLogger(__name__)
+
+
+def read_keyframe_times(path, backend=None):
+    # 优先用已打开的 PyAV 容器读取数据包标记，否则调用 ffprobe；都不解码帧数据
+    if backend is not None and backend.supports_packets:
+        return backend.keyframe_times()
+    return probe_keyframe_times(path)
+
+
+class KeyframeIndex:
+    # 关键帧的帧序号表，用于把任意位置的定位落到它之前最近的关键帧上
+    def __init__(self, frames):
+        self.frames = sorted(set(frames))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def floor(self, frame):
+        # 没有关键帧信息时返回原位置，由解码器自行定位
+        position = bisect.bisect_right(self.frames, frame) - 1
+        if position < 0:
+            return frame if not self.frames else 0
+        return self.frames[position]
+
+
+def load_keyframe_index(path, fps, backend_name=BACKEND_AUTO):
+    backend = None
+    try:
+        backend = open_backend(path, backend_name)
+        times = read_keyframe_times(path, backend)
+    except Exception as e:
+        logger.warning(f"读取关键帧失败，改由解码器自行定位: {str(e)}")
+        return KeyframeIndex([])
+    finally:
+        if backend is not None:
+            backend.release()
+    return KeyframeIndex(int(round(t * fps)) for t in times)
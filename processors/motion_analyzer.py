@@ -0,0 +1,144 @@
+import time
+import logging
+import threading
+import subprocess
+
+import numpy as np
+
+from utils.file_utils import get_file_fingerprint
+from utils.metadata_cache import MetadataCache
+from utils.process_utils import popen_hidden, kill_process_tree
+from utils.resource_governor import ResourceLimits
+
+# 分析用的灰度画面尺寸；帧间差异只需要粗略的画面，缩得越小越快
+ANALYSIS_WIDTH = 64
+ANALYSIS_HEIGHT = 36
+# 每次从管道读取并向量化计算的帧数
+CHUNK_FRAMES = 512
+
+logger = logging.getLogger(__name__)
+
+
+class MotionAnalysisCancelled(Exception):
+    pass
+
+
+def build_motion_probe_command(input_path, width=ANALYSIS_WIDTH, height=ANALYSIS_HEIGHT, thread_args=()):
+    # 跳过环路滤波以加快解码，缩小并转为灰度后以原始数据逐帧输出；不做帧率转换，帧序号与处理时一致
+    return [
+        'ffmpeg', '-loglevel', 'error',
+        '-skip_loop_filter', 'all',
+        '-i', input_path,
+        '-map', '0:v:0', '-an', '-sn', '-dn',
+        '-vf', f"scale={width}:{height}:flags=area,format=gray",
+        '-vsync', 'passthrough',
+    ] + list(thread_args) + ['-f', 'rawvideo', 'pipe:1']
+
+
+def frame_difference_scores(frames, previous=None):
+    # 每帧与前一帧灰度差的平均绝对值（0-255）；第一帧没有前一帧时记为 0
+    frames = frames.astype(np.int16)
+    if previous is None:
+        head = np.zeros(1, dtype=np.float32)
+        body = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2), dtype=np.float32)
+        return np.concatenate([head, body])
+    stacked = np.concatenate([previous.astype(np.int16)[np.newaxis], frames])
+    return np.abs(np.diff(stacked, axis=0)).mean(axis=(1, 2), dtype=np.float32)
+
+
+def deletion_costs(scores):
+    # 删除第 f 帧后，画面从 f-1 直接跳到 f+1，跳变约为进入和离开该帧的差异之和
+    following = np.append(scores[1:], scores[-1:]) if len(scores) else scores
+    return (scores + following).astype(np.float32)
+
+
+class MotionAnalyzer:
+    # 低分辨率灰度分析：一次解码得到逐帧的画面变化分数，结果按输入文件指纹缓存，
+    # 同一个文件再次处理时直接读取
+    def __init__(self, input_path, frame_count, resources=None, cache=None,
+                 width=ANALYSIS_WIDTH, height=ANALYSIS_HEIGHT):
+        self.input_path = input_path
+        self.frame_count = frame_count
+        self.resources = resources or ResourceLimits()
+        self.cache = cache or MetadataCache()
+        self.width = width
+        self.height = height
+        self.from_cache = False
+        self.is_running = True
+        self._process = None
+        self._process_lock = threading.Lock()
+
+    def cancel(self):
+        self.is_running = False
+        with self._process_lock:
+            process = self._process
+        kill_process_tree(process)
+
+    def _cache_name(self):
+        return f"motion_{self.width}x{self.height}"
+
+    def load_cached(self):
+        # 只读取缓存，不解码；没有缓存时返回 None
+        scores = self.cache.load(get_file_fingerprint(self.input_path), self._cache_name())
+        return self._fit(scores) if scores is not None else None
+
+    def analyze(self, progress_callback=None):
+        # 返回长度为 frame_count 的 float32 数组，取消时抛出 MotionAnalysisCancelled
+        progress_callback = progress_callback or (lambda fraction: None)
+        scores = self.load_cached()
+        if scores is not None:
+            self.from_cache = True
+            logger.info(f"使用缓存的画面变化分析: {self.input_path}")
+            progress_callback(1.0)
+            return scores
+
+        fingerprint = get_file_fingerprint(self.input_path)
+        started = time.time()
+        scores = self._decode_scores(progress_callback)
+        elapsed = time.time() - started
+        logger.info(f"画面变化分析完成: {len(scores)} 帧，用时 {elapsed:.2f} 秒")
+        self.cache.store(fingerprint, self._cache_name(), scores)
+        return self._fit(scores)
+
+    def _decode_scores(self, progress_callback):
+        frame_bytes = self.width * self.height
+        command = build_motion_probe_command(self.input_path, self.width, self.height, self.resources.ffmpeg_args())
+        process = popen_hidden(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.resources.apply_to_pid(process.pid)
+        with self._process_lock:
+            self._process = process
+        parts = []
+        previous = None
+        decoded = 0
+        try:
+            if not self.is_running:
+                kill_process_tree(process)
+            while True:
+                data = process.stdout.read(frame_bytes * CHUNK_FRAMES)
+                count = len(data) // frame_bytes
+                if count == 0:
+                    break
+                frames = np.frombuffer(data[:count * frame_bytes], dtype=np.uint8).reshape(count, self.height,
+                                                                                            self.width)
+                parts.append(frame_difference_scores(frames, previous))
+                previous = frames[-1]
+                decoded += count
+                if self.frame_count > 0:
+                    progress_callback(min(1.0, decoded / self.frame_count))
+            stderr = process.stderr.read()
+            process.wait()
+        finally:
+            with self._process_lock:
+                self._process = None
+        if not self.is_running:
+            raise MotionAnalysisCancelled()
+        if process.returncode != 0:
+            raise IOError(f"画面变化分析失败: {stderr.decode(errors='ignore')}")
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def _fit(self, scores):
+        # 容器报告的帧数与实际解码的帧数可能略有出入，缺少的帧按平均分数补齐
+        if len(scores) >= self.frame_count:
+            return scores[:self.frame_count]
+        fill = float(scores.mean()) if len(scores) else 0.0
+        return np.concatenate([scores, np.full(self.frame_count - len(scores), fill, dtype=np.float32)])
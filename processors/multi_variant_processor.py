@@ -0,0 +1,249 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from processors.video_processor import VideoProcessingJob
+from processors.deletion_planner import plan_deletions, new_seed, deleted_frame_set
+from utils.job_progress import JobProgress
+from utils.file_utils import get_variant_output_path
+from utils.signals import Signal
+
+# 每个编码线程待写入帧队列的长度
+WRITER_QUEUE_SIZE = 16
+
+
+class VariantWriter(threading.Thread):
+    # 每个版本一个编码线程，解码线程把保留的帧分发到各自的队列
+    def __init__(self, path, fps, frame_size, queue_size=WRITER_QUEUE_SIZE):
+        super().__init__(daemon=True)
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.frames_written = 0
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size)
+        if not self.writer.isOpened():
+            raise IOError(f"无法创建临时视频文件: {path}")
+
+    def run(self):
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                self.writer.write(frame)
+                self.frames_written += 1
+        except Exception as e:
+            self.error = e
+            # 继续取出剩余的帧，避免解码线程在队列已满时阻塞
+            while self.queue.get() is not None:
+                pass
+        finally:
+            self.writer.release()
+
+    def write(self, frame):
+        self.queue.put(frame)
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+
+
+class MultiVariantJob(VideoProcessingJob):
+    # 一次解码生成多个独立随机的版本：每个版本有自己的种子和删除计划
+
+    def __init__(self, input_path, interval_range, delete_frames, fps, audio_info, frame_count, original_video_info, seeds):
+        # 基类构造时会调用 _create_job_progress，版本数需要先确定
+        self.seeds = [seed if seed is not None else new_seed() for seed in seeds]
+        super().__init__(input_path, get_variant_output_path(input_path, 1), interval_range, delete_frames, fps,
+                         audio_info, frame_count, original_video_info, use_cache=False)
+        self.variants_finished = Signal()
+        self.variants = [
+            {"index": index + 1, "seed": seed, "output_path": get_variant_output_path(input_path, index + 1)}
+            for index, seed in enumerate(self.seeds)
+        ]
+        self._progress_lock = threading.Lock()
+
+    def _create_job_progress(self):
+        # 音频渲染和合成按版本数累加，视频解码只进行一次
+        count = len(self.seeds)
+        stages = ["video", "audio", "merge"] if self.audio_info.get("has_audio") else ["video", "merge"]
+        resolution, codec = self._throughput_key()
+        estimates = self.throughput_store.estimate_stage_seconds(resolution, codec, stages, self.frame_count)
+        return JobProgress([(stage, estimates[stage] * (1 if stage == "video" else count)) for stage in stages])
+
+    def _should_record_throughput(self):
+        return False
+
+    def _report_progress(self, stage, fraction, label):
+        with self._progress_lock:
+            super()._report_progress(stage, fraction, label)
+
+    def _variant_temp_path(self, variant, suffix):
+        path = variant["output_path"].rsplit('.', 1)[0] + suffix
+        self._temp_files.add(path)
+        return path
+
+    def run(self):
+        self.logger.info(f"开始多版本处理，共 {len(self.variants)} 个版本")
+        start_time = time.time()
+        self.resources.apply_to_current_thread()
+        self._start_resource_sampler()
+        try:
+            self._prepare_variant_plans()
+            if self.is_running:
+                self._run_stage("video", self._process_variant_videos)
+            if self.is_running:
+                self._run_stage("audio", self._process_variant_audio)
+            if self.is_running:
+                self._run_stage("merge", self._merge_variants)
+        except Exception as e:
+            if not self.is_running:
+                self.logger.info("处理已取消")
+                return
+            self.logger.error(f"多版本处理出错: {str(e)}", exc_info=True)
+            self.finished.emit(f"处理失败: {str(e)}", [], {})
+        else:
+            if not self.is_running:
+                self.logger.info("处理已取消")
+                return
+            processing_time = time.time() - start_time
+            self.logger.info(f"多版本处理完成，用时: {processing_time:.2f}秒")
+            results = []
+            for variant in self.variants:
+                final_video_info = self.get_final_video_info(variant["output_path"])
+                final_video_info['processing_time'] = processing_time
+                self._attach_resource_report(final_video_info)
+                results.append({
+                    "index": variant["index"],
+                    "seed": variant["seed"],
+                    "output_path": variant["output_path"],
+                    "deleted_frames_info": variant["plan"],
+                    "final_video_info": final_video_info,
+                })
+            self.variants_finished.emit(results)
+            first = results[0]
+            self.finished.emit(f"处理完成，共生成 {len(results)} 个版本。", first["deleted_frames_info"], first["final_video_info"])
+        finally:
+            self._stop_resource_sampler()
+            self._close_backend()
+            if self.is_running:
+                self.cleanup_temp_files()
+
+    def _prepare_variant_plans(self):
+        for variant in self.variants:
+            variant["plan"] = plan_deletions(self.frame_count, self.fps, self.interval_range, self.delete_frames, variant["seed"])
+            deleted_count = sum(len(frames) for _, frames in variant["plan"])
+            self.info_signal.emit(f"版本 {variant['index']}: 种子 {variant['seed']}，删除 {len(variant['plan'])} 处，共 {deleted_count} 帧")
+        self.deleted_frames_info = self.variants[0]["plan"]
+
+    def _process_variant_videos(self):
+        backend = self._open_backend()
+        writers = []
+        try:
+            frame_size = (backend.width, backend.height)
+            # 内存预算由所有版本的写入队列平分
+            count = len(self.variants)
+            queue_size = max(2, self.resources.queue_depth((backend.height, backend.width, 3), WRITER_QUEUE_SIZE * count) // count)
+            for variant in self.variants:
+                variant["video_path"] = self._variant_temp_path(variant, '_temp_video.mp4')
+                writer = VariantWriter(variant["video_path"], self.fps, frame_size, queue_size)
+                writer.start()
+                writers.append(writer)
+
+            deleted_sets = [deleted_frame_set(variant["plan"]) for variant in self.variants]
+            progress_step = max(1, self.frame_count // 100)
+            for i in range(self.frame_count):
+                if not self.is_running:
+                    break
+                if all(i in deleted for deleted in deleted_sets):
+                    # 所有版本都删除的帧只跳过，不做解码后的颜色转换
+                    if not backend.grab():
+                        break
+                    continue
+
+                ret, frame = backend.read()
+                if not ret:
+                    break
+                # 同一帧只读共享给各个编码线程
+                for writer, deleted in zip(writers, deleted_sets):
+                    if i not in deleted:
+                        writer.write(frame)
+
+                if i % progress_step == 0:
+                    self._report_progress("video", (i + 1) / self.frame_count, "多版本视频处理")
+
+            self._report_progress("video", 1.0, "多版本视频处理")
+        finally:
+            for writer in writers:
+                writer.close()
+
+        for writer in writers:
+            if writer.error is not None:
+                raise IOError(f"写入 {writer.path} 失败: {str(writer.error)}")
+
+    def _process_variant_audio(self):
+        if not self.audio_info["has_audio"]:
+            return
+        self.info_signal.emit("正在从视频中提取音频...")
+        audio_path = self.audio_info.get("audio_path")
+        if not audio_path or not os.path.exists(audio_path):
+            audio_path = self._temp_path('_temp_audio.wav')
+            self._extract_audio(audio_path)
+            if not self.is_running:
+                return
+
+        # 音频只解码一次，各版本从同一份 PCM 数据渲染
+        audio = self.audio_processor.load_audio(audio_path)
+        count = len(self.variants)
+        for position, variant in enumerate(self.variants):
+            if not self.is_running:
+                return
+
+            def audio_progress_callback(progress, remaining_time):
+                self._report_progress("audio", (position + progress) / count, f"音频处理 - 版本 {variant['index']}")
+
+            processed_audio = self.audio_processor.render_audio(
+                audio,
+                deleted_frame_set(variant["plan"]),
+                self.fps,
+                self.frame_count,
+                audio_progress_callback,
+                should_continue=lambda: self.is_running
+            )
+            if processed_audio is None:
+                return
+            variant["audio_path"] = self._variant_temp_path(variant, '_temp_processed_audio.wav')
+            processed_audio.export(variant["audio_path"], format="wav")
+        self.info_signal.emit("音频处理完成")
+
+    def _merge_variants(self):
+        self.info_signal.emit("开始合成各版本的视频和音频...")
+        duration = self.original_video_info.get('时长') or 0
+        count = len(self.variants)
+        merge_times = {}
+
+        def merge_variant(variant):
+            def merge_progress(current_time):
+                if duration > 0:
+                    merge_times[variant["index"]] = current_time
+                    self._report_progress("merge", sum(merge_times.values()) / (duration * count), "视频音频合成")
+
+            ffmpeg_cmd = self._build_merge_command(['-i', variant["video_path"]], variant.get("audio_path"), variant["output_path"])
+            self._run_ffmpeg_with_progress(ffmpeg_cmd, variant["output_path"], merge_progress)
+
+        # 各版本的编码互不依赖，并行运行
+        with ThreadPoolExecutor(max_workers=self.resources.worker_count(min(count, os.cpu_count() or 1))) as executor:
+            for future in [executor.submit(merge_variant, variant) for variant in self.variants]:
+                future.result()
+        if self.is_running:
+            self.info_signal.emit("各版本视频和音频合成完成")
+            self.progress.emit(100, "处理完成")
+
+    def cleanup_temp_files(self, remove_output=False):
+        if remove_output:
+            for variant in self.variants:
+                self._temp_files.add(variant["output_path"])
+        super().cleanup_temp_files(remove_output)
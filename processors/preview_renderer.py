@@ -0,0 +1,185 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from processors.keyframe_index import load_keyframe_index
+from processors.deletion_planner import kept_frame_ranges
+from utils.process_utils import popen_hidden, kill_process_tree
+from utils.resource_governor import ResourceLimits
+
+# 预览的删除点数量、每段预览的秒数和输出高度
+DEFAULT_PREVIEW_POINTS = 4
+DEFAULT_PREVIEW_SECONDS = 2.0
+DEFAULT_PREVIEW_HEIGHT = 360
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewCancelled(Exception):
+    pass
+
+
+def pick_preview_points(deleted_frames_info, count):
+    # 在删除计划中均匀挑选若干个删除点
+    if count <= 0 or not deleted_frames_info:
+        return []
+    if len(deleted_frames_info) <= count:
+        return list(deleted_frames_info)
+    if count == 1:
+        return [deleted_frames_info[len(deleted_frames_info) // 2]]
+    step = (len(deleted_frames_info) - 1) / (count - 1)
+    return [deleted_frames_info[int(round(index * step))] for index in range(count)]
+
+
+def build_preview_command(input_path, output_path, seek_frame, ranges, fps, has_audio, height, thread_args=()):
+    # 从关键帧 seek_frame 开始解码，只保留 ranges 中的帧（帧序号为全片序号）并拼接成低分辨率短片；
+    # 音频按相同的时间区间裁剪，与正式处理一样随删除的帧一起去掉
+    start_time = max(0.0, (seek_frame - 0.5) / fps)
+    count = len(ranges)
+    filters = [f"[0:v]split={count}" + ''.join(f"[vs{i}]" for i in range(count))]
+    if has_audio:
+        filters.append(f"[0:a]asplit={count}" + ''.join(f"[as{i}]" for i in range(count)))
+    inputs = ''
+    for index, (start, end) in enumerate(ranges):
+        relative_start, relative_end = start - seek_frame, end - seek_frame
+        filters.append(f"[vs{index}]trim=start_frame={relative_start}:end_frame={relative_end},"
+                       f"setpts=PTS-STARTPTS[v{index}]")
+        inputs += f"[v{index}]"
+        if has_audio:
+            # 输入从 seek_frame 前半帧处开始，音频时间相应偏移半帧
+            filters.append(f"[as{index}]atrim=start={(relative_start + 0.5) / fps:.6f}:"
+                           f"end={(relative_end + 0.5) / fps:.6f},asetpts=PTS-STARTPTS[a{index}]")
+            inputs += f"[a{index}]"
+    outputs = "[vc][aout]" if has_audio else "[vc]"
+    filters.append(f"{inputs}concat=n={count}:v=1:a={1 if has_audio else 0}{outputs}")
+    filters.append(f"[vc]scale=-2:{height}[vout]")
+
+    command = [
+        'ffmpeg',
+        '-ss', f"{start_time:.6f}",
+        '-i', input_path,
+        '-filter_complex', ';'.join(filters),
+        '-map', '[vout]',
+        '-r', str(fps),
+    ]
+    if has_audio:
+        command += ['-map', '[aout]', '-c:a', 'aac', '-b:a', '96k']
+    command += ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '28', '-pix_fmt', 'yuv420p']
+    command += list(thread_args)
+    command += ['-y', '-loglevel', 'error', output_path]
+    return command
+
+
+class PreviewRenderer:
+    # 按删除计划直接定位到少数几个删除点，渲染删除前后的低分辨率短片，不解码文件的其余部分
+    def __init__(self, input_path, video_info, deleted_frames_info, point_count=DEFAULT_PREVIEW_POINTS,
+                 clip_seconds=DEFAULT_PREVIEW_SECONDS, height=DEFAULT_PREVIEW_HEIGHT, resources=None):
+        self.input_path = input_path
+        self.fps = video_info['帧率']
+        self.frame_count = video_info['视频总帧数']
+        self.has_audio = bool(video_info.get('是否包含音频'))
+        self.deleted_frames_info = deleted_frames_info
+        self.point_count = point_count
+        self.clip_frames = max(1, int(clip_seconds * self.fps))
+        self.height = height
+        self.resources = resources or ResourceLimits()
+        self.output_dir = None
+        self.is_running = True
+        self._process_lock = threading.Lock()
+        self._processes = set()
+
+    def cancel(self):
+        self.is_running = False
+        with self._process_lock:
+            processes = list(self._processes)
+        for process in processes:
+            kill_process_tree(process)
+
+    def cleanup(self):
+        if self.output_dir is not None:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            self.output_dir = None
+
+    def _run_ffmpeg(self, command):
+        if not self.is_running:
+            raise PreviewCancelled()
+        process = popen_hidden(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.resources.apply_to_pid(process.pid)
+        with self._process_lock:
+            self._processes.add(process)
+        try:
+            _, stderr = process.communicate()
+        finally:
+            with self._process_lock:
+                self._processes.discard(process)
+        if not self.is_running:
+            raise PreviewCancelled()
+        if process.returncode != 0:
+            raise IOError(f"渲染预览失败: {stderr.decode(errors='ignore')}")
+
+    def _window(self, frames):
+        # 以删除点为中心取一段窗口，窗口内所有计划删除的帧都在"删除后"中去掉
+        center = frames[0]
+        start = max(0, min(center - self.clip_frames // 2, self.frame_count - self.clip_frames))
+        end = min(self.frame_count, start + self.clip_frames)
+        return start, end
+
+    def _render_point(self, index, point, keyframes, deleted):
+        sec, frames = point
+        start, end = self._window(frames)
+        seek_frame = keyframes.floor(start)
+        local_deleted = [frame - start for frame in deleted if start <= frame < end]
+        kept = [(a + start, b + start) for a, b in kept_frame_ranges(local_deleted, end - start)]
+        before_path = os.path.join(self.output_dir, f'preview{index:02d}_before.mp4')
+        after_path = os.path.join(self.output_dir, f'preview{index:02d}_after.mp4')
+        thread_args = self.resources.ffmpeg_args()
+        self._run_ffmpeg(build_preview_command(self.input_path, before_path, seek_frame, [(start, end)], self.fps,
+                                               self.has_audio, self.height, thread_args))
+        self._run_ffmpeg(build_preview_command(self.input_path, after_path, seek_frame, kept, self.fps,
+                                               self.has_audio, self.height, thread_args))
+        return {
+            "second": sec,
+            "deleted_frames": frames,
+            "start_frame": start,
+            "end_frame": end,
+            "decoded_frames": end - seek_frame,
+            "before_path": before_path,
+            "after_path": after_path,
+        }
+
+    def render(self, progress_callback=None):
+        progress_callback = progress_callback or (lambda percent, stage: None)
+        points = pick_preview_points(self.deleted_frames_info, self.point_count)
+        if not points:
+            return []
+        progress_callback(0, "读取关键帧")
+        keyframes = load_keyframe_index(self.input_path, self.fps)
+        deleted = sorted(frame for _, frames in self.deleted_frames_info for frame in frames)
+        self.output_dir = tempfile.mkdtemp(prefix='randframedel_preview_')
+        results = [None] * len(points)
+        done = [0]
+        lock = threading.Lock()
+
+        def render(index):
+            results[index] = self._render_point(index, points[index], keyframes, deleted)
+            with lock:
+                done[0] += 1
+                progress_callback(int(done[0] / len(points) * 100), "渲染预览")
+
+        workers = self.resources.worker_count(min(len(points), os.cpu_count() or 1))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for future in [executor.submit(render, index) for index in range(len(points))]:
+                future.result()
+        except Exception:
+            # 一个删除点失败时终止其余正在渲染的 ffmpeg
+            self.cancel()
+            executor.shutdown(wait=True)
+            self.cleanup()
+            raise
+        executor.shutdown(wait=True)
+        return results
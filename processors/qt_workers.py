@@ -0,0 +1,179 @@
+import logging
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from processors.video_analyzer import VideoProbe, AnalysisCancelled
+from processors.video_processor import VideoProcessingJob
+from processors.multi_variant_processor import MultiVariantJob
+from processors.cost_estimator import CostEstimator, EstimateCancelled
+from processors.preview_renderer import PreviewRenderer, PreviewCancelled
+from processors.job_worker import JOB_SIGNALS, JOB_KIND_VIDEO, JOB_KIND_VARIANTS, JobWorkerDied
+
+
+class VideoAnalyzer(QThread):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, video_path):
+        super().__init__()
+        self.video_path = video_path
+        self.logger = logging.getLogger(__name__)
+        self.probe = VideoProbe(video_path)
+
+    def run(self):
+        try:
+            result = self.probe.analyze(self.progress.emit)
+            self.finished.emit(result)
+
+        except AnalysisCancelled:
+            self.logger.info(f"视频分析已取消: {self.video_path}")
+        except Exception as e:
+            self.logger.error(f"视频分析出错: {str(e)}", exc_info=True)
+            self.error.emit(f"视频分析失败: {str(e)}")
+
+    def stop(self, timeout_ms=100):
+        # 协作式取消，终止正在运行的 ffprobe 而不是强行结束线程
+        self.logger.info("停止视频分析")
+        self.probe.cancel()
+        if not self.wait(timeout_ms):
+            self.wait()
+
+
+class CostEstimateWorker(QThread):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.logger = logging.getLogger(__name__)
+        self.estimator = CostEstimator(*args, **kwargs)
+
+    def run(self):
+        try:
+            self.finished.emit(self.estimator.estimate(self.progress.emit))
+        except EstimateCancelled:
+            self.logger.info("开销估算已取消")
+        except Exception as e:
+            self.logger.error(f"开销估算出错: {str(e)}", exc_info=True)
+            self.error.emit(f"开销估算失败: {str(e)}")
+
+    def stop(self):
+        self.estimator.cancel()
+        self.wait()
+
+
+class PreviewWorker(QThread):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(list)
+    error = pyqtSignal(str)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.logger = logging.getLogger(__name__)
+        self.renderer = PreviewRenderer(*args, **kwargs)
+
+    def run(self):
+        try:
+            self.finished.emit(self.renderer.render(self.progress.emit))
+        except PreviewCancelled:
+            self.logger.info("预览渲染已取消")
+        except Exception as e:
+            self.logger.error(f"预览渲染出错: {str(e)}", exc_info=True)
+            self.error.emit(f"预览渲染失败: {str(e)}")
+
+    def stop(self):
+        self.renderer.cancel()
+        self.wait()
+        self.renderer.cleanup()
+
+
+class JobThread(QThread):
+    # 处理任务的 Qt 信号，槽函数在界面线程中执行
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(str, list, dict)
+    frame_deleted_signal = pyqtSignal(int, list)
+    current_second_signal = pyqtSignal(int)
+    info_signal = pyqtSignal(str)
+    eta_signal = pyqtSignal(float)
+    resource_signal = pyqtSignal(dict)
+
+
+class VideoProcessor(JobThread):
+    # 在 QThread 中运行处理任务，把任务的回调转发为 Qt 信号
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.logger = logging.getLogger(__name__)
+        self.job = self.create_job(*args, **kwargs)
+        for name in JOB_SIGNALS:
+            getattr(self.job, name).connect(getattr(self, name).emit)
+
+    def create_job(self, *args, **kwargs):
+        return VideoProcessingJob(*args, **kwargs)
+
+    def run(self):
+        self.job.run()
+
+    def stop(self, timeout_ms=100):
+        self.job.stop()
+        if not self.wait(timeout_ms):
+            self.logger.warning("处理线程未在限定时间内退出，继续等待")
+            self.wait()
+        self.job.cleanup()
+
+
+class MultiVariantProcessor(VideoProcessor):
+    variants_finished = pyqtSignal(list)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.job.variants_finished.connect(self.variants_finished.emit)
+
+    def create_job(self, *args, **kwargs):
+        return MultiVariantJob(*args, **kwargs)
+
+
+class IsolatedVideoProcessor(JobThread):
+    # 在工作进程池的独立进程中运行处理任务，任务的回调经管道传回后转发为 Qt 信号；
+    # 界面进程中不创建解码器和音频对象，工作进程崩溃时任务以失败结束
+    job_kind = JOB_KIND_VIDEO
+
+    def __init__(self, worker_pool, *args, **kwargs):
+        super().__init__()
+        self.logger = logging.getLogger(__name__)
+        self.worker_pool = worker_pool
+        self.args = args
+        self.kwargs = kwargs
+        self._stop_requested = False
+
+    def run(self):
+        try:
+            worker = self.worker_pool.acquire()
+        except Exception as e:
+            self.logger.error(f"启动处理工作进程失败: {str(e)}", exc_info=True)
+            self.finished.emit(f"处理失败: {str(e)}", [], {})
+            return
+        try:
+            worker.run(self.job_kind, self.args, self.kwargs, self._forward, lambda: self._stop_requested)
+        except JobWorkerDied as e:
+            self.logger.error(f"处理工作进程 {worker.pid} 崩溃: {str(e)}")
+            if not self._stop_requested:
+                self.finished.emit(f"处理失败: {str(e)}", [], {})
+        finally:
+            self.worker_pool.release(worker)
+
+    def _forward(self, name, args):
+        getattr(self, name).emit(*args)
+
+    def stop(self, timeout_ms=100):
+        # 取消请求经管道发给工作进程，由工作进程停止任务并清理临时文件
+        self._stop_requested = True
+        if not self.wait(timeout_ms):
+            self.logger.warning("处理工作进程未在限定时间内退出，继续等待")
+            self.wait()
+
+
+class IsolatedMultiVariantProcessor(IsolatedVideoProcessor):
+    variants_finished = pyqtSignal(list)
+    job_kind = JOB_KIND_VARIANTS
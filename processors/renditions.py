@@ -0,0 +1,87 @@
+import re
+
+from processors.ffmpeg_engine import video_encode_args
+
+# 多分辨率输出的规格：高度:视频码率[:H.264 profile]，例如 720:2500k:main
+RENDITION_PATTERN = re.compile(r'^(\d+):(\d+)k(?::(\w+))?$')
+H264_PROFILES = ('baseline', 'main', 'high')
+# 各档输出统一使用 8 位 4:2:0 的 H.264，兼容常见的播放设备
+RENDITION_CODEC = 'libx264'
+RENDITION_PIX_FMT = 'yuv420p'
+
+
+def parse_rendition(text):
+    match = RENDITION_PATTERN.match(str(text).strip())
+    if not match:
+        raise ValueError(f"输出规格格式应为 \"高度:码率k[:profile]\"，例如 720:2500k:main，实际为: {text}")
+    height, bitrate, profile = match.groups()
+    return make_rendition(int(height), int(bitrate), profile)
+
+
+def make_rendition(height, bitrate_kbps, profile=None):
+    if height < 16 or height % 2:
+        raise ValueError(f"输出高度必须是不小于 16 的偶数: {height}")
+    if bitrate_kbps <= 0:
+        raise ValueError(f"输出码率必须大于 0: {bitrate_kbps}k")
+    if profile is not None and profile not in H264_PROFILES:
+        raise ValueError(f"未知的 H.264 profile: {profile}，可选 {', '.join(H264_PROFILES)}")
+    return {"height": height, "video_bitrate": f"{bitrate_kbps}k", "profile": profile}
+
+
+def normalize_renditions(renditions):
+    # 接受规格字符串或 {"height", "video_bitrate", "profile"} 字典，按高度从高到低排列，同一高度只保留一档
+    result = {}
+    for item in renditions or []:
+        if isinstance(item, dict):
+            try:
+                rendition = make_rendition(int(item["height"]), int(str(item["video_bitrate"]).rstrip('k')),
+                                           item.get("profile"))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"输出规格无效: {item} ({str(e)})")
+        else:
+            rendition = parse_rendition(item)
+        result[rendition["height"]] = rendition
+    return [result[height] for height in sorted(result, reverse=True)]
+
+
+def rendition_output_path(output_path, rendition):
+    base, ext = output_path.rsplit('.', 1)
+    return f"{base}_{rendition['height']}p.{ext}"
+
+
+def rendition_encode_args(profile, rendition):
+    args = video_encode_args(dict(profile, video_codec=RENDITION_CODEC, video_bitrate=rendition["video_bitrate"]))
+    if rendition.get("profile"):
+        args += ['-profile:v', rendition["profile"]]
+    return args + ['-pix_fmt', RENDITION_PIX_FMT]
+
+
+def build_ladder_command(video_input_args, audio_input_args, audio_stream, renditions, profile, main_output=None,
+                         copy_main_video=False, thread_args=()):
+    # 一个 ffmpeg 进程解码一次处理后的视频，split 给各档的缩放和编码器；
+    # 音频已经编码过一次，所有输出直接复制同一条音频流。
+    # main_output 为原分辨率输出（可选），copy_main_video 时其视频流直接复制分段
+    encode_main = main_output is not None and not copy_main_video
+    labels = [f"s{index}" for index in range(len(renditions) + (1 if encode_main else 0))]
+    filters = [f"[0:v]split={len(labels)}" + ''.join(f"[{label}]" for label in labels)]
+    rendition_labels = labels[1:] if encode_main else labels
+    for index, label in enumerate(rendition_labels):
+        filters.append(f"[{label}]scale=-2:{renditions[index]['height']}[r{index}]")
+
+    audio_args = ['-map', audio_stream, '-c:a', 'copy'] if audio_stream else ['-an']
+    command = ['ffmpeg'] + list(video_input_args) + list(audio_input_args) + [
+        '-filter_complex', ';'.join(filters),
+        '-loglevel', 'error',
+        '-progress', 'pipe:1',
+        '-nostats',
+    ]
+    if main_output is not None:
+        if copy_main_video:
+            command += ['-map', '0:v:0', '-c:v', 'copy']
+        else:
+            command += ['-map', f"[{labels[0]}]"] + video_encode_args(profile)
+        command += audio_args + list(thread_args) + ['-y', main_output]
+    for index, rendition in enumerate(renditions):
+        command += ['-map', f"[r{index}]"] + rendition_encode_args(profile, rendition)
+        command += audio_args + list(thread_args) + ['-y', rendition["output_path"]]
+    return command
@@ -0,0 +1,434 @@
+import os
+import sys
+import json
+import time
+import logging
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from fractions import Fraction
+
+from processors.deletion_planner import iter_deletions
+from processors.video_processor import build_encoding_profile, PIXEL_MODE_NATIVE
+from processors.ffmpeg_engine import video_encode_args, color_args, is_high_bit_depth
+from utils.process_utils import popen_hidden, kill_process_tree
+from utils.resource_governor import ResourceLimits
+
+STREAM_FORMAT_MP4 = 'mp4'
+STREAM_FORMAT_MPEGTS = 'mpegts'
+# 用于探测流参数的起始数据量，探测失败时加倍重试直到上限
+HEAD_BYTES = 64 * 1024
+MAX_HEAD_BYTES = 32 * 1024 * 1024
+READ_CHUNK_BYTES = 256 * 1024
+# 输入分发给各个解码器时，每个解码器最多积压的数据块数；所有解码器都积压到上限时暂停读取输入
+MAX_BACKLOG_CHUNKS = 64
+# 流式输出使用较快的编码预设，关键帧间隔决定每个分片的时长（秒）
+STREAM_PRESET = 'veryfast'
+FRAGMENT_SECONDS = 1
+# 每隔多少秒记录一次处理进度
+STATS_INTERVAL = 5.0
+# 可直接按原始像素格式传递的格式：(色度宽度除数, 色度高度除数, 每个采样的字节数)，其他格式转换为 yuv420p
+RAW_PLANE_LAYOUTS = {
+    'yuv420p': (2, 2, 1),
+    'yuvj420p': (2, 2, 1),
+    'yuv422p': (2, 1, 1),
+    'yuvj422p': (2, 1, 1),
+    'yuv444p': (1, 1, 1),
+    'yuvj444p': (1, 1, 1),
+    'yuv420p10le': (2, 2, 2),
+    'yuv422p10le': (2, 1, 2),
+    'yuv444p10le': (1, 1, 2),
+}
+PCM_SAMPLE_BYTES = 2
+
+logger = logging.getLogger(__name__)
+
+
+class StreamCancelled(Exception):
+    pass
+
+
+def raw_pixel_format(pix_fmt):
+    if pix_fmt in RAW_PLANE_LAYOUTS:
+        return pix_fmt
+    return 'yuv420p10le' if is_high_bit_depth(pix_fmt) else 'yuv420p'
+
+
+def raw_frame_size(width, height, pix_fmt):
+    chroma_w, chroma_h, sample_bytes = RAW_PLANE_LAYOUTS[pix_fmt]
+    chroma = -(-width // chroma_w) * -(-height // chroma_h)
+    return (width * height + 2 * chroma) * sample_bytes
+
+
+def read_some(source, size):
+    # 有数据就返回，不等凑满 size 字节，直播流的起始数据可以尽快送出
+    return source.read1(size) if hasattr(source, 'read1') else source.read(size)
+
+
+def parse_frame_rate(value):
+    try:
+        rate = Fraction(value or '0')
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+    return float(rate)
+
+
+def probe_stream_head(head):
+    # 把流的起始部分写入临时文件交给 ffprobe，得到分辨率、帧率和音频参数
+    fd, path = tempfile.mkstemp(prefix='randframedel_head_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(head)
+        command = ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', path]
+        process = popen_hidden(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, _ = process.communicate()
+    finally:
+        os.remove(path)
+    if process.returncode != 0:
+        return None
+    data = json.loads(stdout.decode('utf-8') or '{}')
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if video is None or not video.get('width') or not video.get('height'):
+        return None
+    fps = parse_frame_rate(video.get('avg_frame_rate')) or parse_frame_rate(video.get('r_frame_rate'))
+    if fps <= 0:
+        return None
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    return {
+        "width": int(video['width']),
+        "height": int(video['height']),
+        "fps": fps,
+        "has_audio": audio is not None,
+        "sample_rate": int(audio.get('sample_rate') or 0) if audio else 0,
+        "channels": int(audio.get('channels') or 2) if audio else 0,
+        "audio_bitrate": f"{int(audio['bit_rate']) // 1000}k" if audio and audio.get('bit_rate') else None,
+        "video_stream_info": {
+            "codec_name": video.get('codec_name'),
+            "pix_fmt": video.get('pix_fmt'),
+            "color_range": video.get('color_range'),
+            "color_space": video.get('color_space'),
+            "color_transfer": video.get('color_transfer'),
+            "color_primaries": video.get('color_primaries'),
+        },
+    }
+
+
+def build_stream_decode_command(raw_format, thread_args=()):
+    # 从标准输入解码视频，以原始像素格式逐帧写到标准输出
+    return ['ffmpeg', '-loglevel', 'error', '-i', 'pipe:0'] + list(thread_args) + [
+        '-map', '0:v:0', '-an', '-f', 'rawvideo', '-pix_fmt', raw_format, '-vsync', 'passthrough', 'pipe:1']
+
+
+def build_stream_audio_decode_command(info):
+    # 音频使用单独的解码器，不解码视频；容器中音视频交错的跨度再大也不会互相阻塞
+    return ['ffmpeg', '-loglevel', 'error', '-i', 'pipe:0', '-map', '0:a:0', '-vn', '-f', 's16le',
+            '-acodec', 'pcm_s16le', '-ar', str(info['sample_rate']), '-ac', str(info['channels']), 'pipe:1']
+
+
+class InputTee:
+    # 把输入数据分发给多个解码器，每路由各自的线程写入；
+    # 只有所有解码器都积压到上限时才暂停读取输入，积压的是压缩数据，占用的内存很少
+    def __init__(self, targets, max_backlog=MAX_BACKLOG_CHUNKS):
+        self.targets = targets
+        self.max_backlog = max_backlog
+        self.backlogs = [deque() for _ in targets]
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def put(self, chunk):
+        with self._condition:
+            while not self.closed and all(len(backlog) >= self.max_backlog for backlog in self.backlogs):
+                self._condition.wait()
+            for backlog in self.backlogs:
+                backlog.append(chunk)
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def drain(self, index):
+        backlog = self.backlogs[index]
+        target = self.targets[index]
+        try:
+            while True:
+                with self._condition:
+                    while not backlog and not self.closed:
+                        self._condition.wait()
+                    if not backlog:
+                        return
+                    chunk = backlog.popleft()
+                    self._condition.notify_all()
+                target.write(chunk)
+        finally:
+            target.close()
+
+
+def build_stream_encode_command(info, raw_format, profile, output, stream_format, audio_fd=None, thread_args=()):
+    # 边编码边封装；分片 MP4 在每个关键帧处输出一个分片，消费者不必等待整个文件。
+    # 视频从标准输入读取，音频从继承的管道 audio_fd 读取
+    command = ['ffmpeg', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', raw_format, '-s', f"{info['width']}x{info['height']}",
+               '-r', str(info['fps']), '-i', 'pipe:0']
+    if info['has_audio']:
+        command += ['-f', 's16le', '-ar', str(info['sample_rate']), '-ac', str(info['channels']),
+                    '-i', f'pipe:{audio_fd}']
+    command += ['-map', '0:v:0']
+    if info['has_audio']:
+        command += ['-map', '1:a:0', '-c:a', profile['audio_codec'], '-b:a', profile['audio_bitrate']]
+    command += video_encode_args(profile)
+    command += ['-g', str(max(1, int(round(info['fps'] * FRAGMENT_SECONDS)))), '-pix_fmt', profile['pix_fmt']]
+    command += color_args(info['video_stream_info'])
+    command += list(thread_args)
+    if stream_format == STREAM_FORMAT_MP4:
+        command += ['-movflags', 'frag_keyframe+empty_moov+default_base_moof', '-f', 'mp4']
+    else:
+        command += ['-f', 'mpegts']
+    command += ['-y', 'pipe:1' if output == '-' else output]
+    return command
+
+
+class StreamProcessor:
+    # 流式处理：从标准输入或 FIFO 读取，随着帧的到来逐步生成删除计划并丢帧，
+    # 同时输出分片 MP4 或 MPEG-TS；不需要可定位的输入，也不等所有阶段结束才输出。
+    # 视频和音频在各自的线程中按同一个计划丢弃，互不等待
+    def __init__(self, input_path, output_path, interval_range, delete_frames, seed,
+                 stream_format=STREAM_FORMAT_MP4, resources=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.interval_range = interval_range
+        self.delete_frames = delete_frames
+        self.seed = seed
+        self.stream_format = stream_format
+        self.resources = resources or ResourceLimits()
+        self.is_running = True
+        self.decoder = None
+        self.audio_decoder = None
+        self.encoder = None
+        self.stats = {"frames_in": 0, "frames_out": 0, "frames_deleted": 0, "points": 0}
+        self._errors = []
+
+    def stop(self):
+        self.is_running = False
+        for process in (self.decoder, self.audio_decoder, self.encoder):
+            kill_process_tree(process)
+
+    def _open_input(self):
+        if self.input_path == '-':
+            return sys.stdin.buffer
+        # 以只读方式打开 FIFO 会等待写入端连接
+        return open(self.input_path, 'rb')
+
+    def _close_input(self, source):
+        if source is not sys.stdin.buffer:
+            source.close()
+
+    def _read_head(self, source):
+        head = b''
+        limit = HEAD_BYTES
+        while True:
+            while len(head) < limit:
+                chunk = read_some(source, min(READ_CHUNK_BYTES, limit - len(head)))
+                if not chunk:
+                    break
+                head += chunk
+            if not head:
+                raise IOError("输入流为空")
+            info = probe_stream_head(head)
+            if info is not None:
+                return head, info
+            if len(head) < limit or limit >= MAX_HEAD_BYTES:
+                raise IOError(f"无法从输入流的前 {len(head)} 字节识别视频参数")
+            limit *= 2
+
+    def _guard(self, name, target, *args):
+        # 线程出错时停止整个流水线，错误在 run 结束时抛出
+        def run():
+            try:
+                target(*args)
+            except (BrokenPipeError, ValueError, OSError) as e:
+                if self.is_running:
+                    self._errors.append(f"{name}: {str(e)}")
+                    self.stop()
+            except Exception as e:
+                logger.error(f"{name} 出错: {str(e)}", exc_info=True)
+                self._errors.append(f"{name}: {str(e)}")
+                self.stop()
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def _pump_input(self, source, head, tee):
+        # 先送出探测时读取的起始数据，再原样转发其余部分
+        try:
+            tee.put(head)
+            while self.is_running:
+                chunk = read_some(source, READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                tee.put(chunk)
+        finally:
+            tee.close()
+            # 输入由转发线程关闭；读取阻塞时在其他线程关闭会一直等待
+            self._close_input(source)
+
+    def _deleted_frames(self, fps):
+        # 按帧序号顺序给出计划删除的帧，视频和音频线程各自持有一个，得到的序列相同
+        for _, frames in iter_deletions(fps, self.interval_range, self.delete_frames, self.seed):
+            yield from sorted(frames)
+
+    def _filter_video(self, source, target, frame_size, fps):
+        plan = self._deleted_frames(fps)
+        next_deleted = next(plan)
+        index = 0
+        last_log = time.time()
+        last_point = -1
+        frames_per_second = int(fps)
+        try:
+            while self.is_running:
+                frame = source.read(frame_size)
+                if len(frame) < frame_size:
+                    break
+                if index == next_deleted:
+                    self.stats["frames_deleted"] += 1
+                    if index // frames_per_second != last_point:
+                        last_point = index // frames_per_second
+                        self.stats["points"] += 1
+                    next_deleted = next(plan)
+                else:
+                    target.write(frame)
+                    self.stats["frames_out"] += 1
+                index += 1
+                self.stats["frames_in"] = index
+                if time.time() - last_log >= STATS_INTERVAL:
+                    last_log = time.time()
+                    logger.info(f"流式处理: 已读取 {index} 帧，删除 {self.stats['frames_deleted']} 帧")
+        finally:
+            target.close()
+
+    def _filter_audio(self, source, target, fps, sample_rate, channels):
+        # 每个视频帧对应的采样区间与 AudioProcessor.render_audio 的切分方式相同
+        sample_width = PCM_SAMPLE_BYTES * channels
+        samples_per_frame = sample_rate / fps
+        plan = self._deleted_frames(fps)
+        next_deleted = next(plan)
+        drop_start = int(round(next_deleted * samples_per_frame))
+        drop_end = int(round((next_deleted + 1) * samples_per_frame))
+        position = 0
+        pending = b''
+        try:
+            while self.is_running:
+                chunk = read_some(source, READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                pending += chunk
+                usable = len(pending) - len(pending) % sample_width
+                data, pending = pending[:usable], pending[usable:]
+                chunk_start = position
+                position += usable // sample_width
+                offset = chunk_start
+                while offset < position:
+                    if offset < drop_start:
+                        end = min(position, drop_start)
+                        target.write(data[(offset - chunk_start) * sample_width:(end - chunk_start) * sample_width])
+                        offset = end
+                    else:
+                        offset = min(position, drop_end)
+                    if offset >= drop_end:
+                        next_deleted = next(plan)
+                        drop_start = int(round(next_deleted * samples_per_frame))
+                        drop_end = int(round((next_deleted + 1) * samples_per_frame))
+        finally:
+            target.close()
+
+    def _start_processes(self, info, raw_format, profile):
+        # 返回编码器的音频输入管道，没有音频时返回 None
+        thread_args = self.resources.ffmpeg_args()
+        stdout = None if self.output_path == '-' else subprocess.DEVNULL
+        self.decoder = self._spawn(build_stream_decode_command(raw_format, thread_args),
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        if not info['has_audio']:
+            self.encoder = self._spawn(build_stream_encode_command(info, raw_format, profile, self.output_path,
+                                                                   self.stream_format, thread_args=thread_args),
+                                       stdin=subprocess.PIPE, stdout=stdout)
+            return None
+        self.audio_decoder = self._spawn(build_stream_audio_decode_command(info),
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        # 编码器的第二个输入通过 pipe:<描述符> 读取；子进程持有的一端在父进程中关闭，编码器退出时写入才会得到 EPIPE
+        audio_read, audio_write = os.pipe()
+        try:
+            self.encoder = self._spawn(build_stream_encode_command(info, raw_format, profile, self.output_path,
+                                                                   self.stream_format, audio_read, thread_args),
+                                       stdin=subprocess.PIPE, stdout=stdout, pass_fds=(audio_read,))
+        except Exception:
+            os.close(audio_write)
+            raise
+        finally:
+            os.close(audio_read)
+        return open(audio_write, 'wb')
+
+    def _spawn(self, command, **kwargs):
+        logger.debug(f"启动 ffmpeg: {' '.join(command)}")
+        process = popen_hidden(command, **kwargs)
+        self.resources.apply_to_pid(process.pid)
+        return process
+
+    def run(self):
+        started = time.time()
+        source = self._open_input()
+        pumping = False
+        try:
+            head, info = self._read_head(source)
+            if info['has_audio'] and os.name == 'nt':
+                logger.warning("Windows 上流式处理暂不支持音频，输出将不包含音轨")
+                info['has_audio'] = False
+            raw_format = raw_pixel_format(info['video_stream_info'].get('pix_fmt'))
+            frame_size = raw_frame_size(info['width'], info['height'], raw_format)
+            # 起始数据中的总码率不可靠（直播流通常没有），按默认码率编码
+            profile = build_encoding_profile({"total_bitrate": None,
+                                              "audio_info": {"audio_bitrate": info['audio_bitrate']},
+                                              "video_stream_info": info['video_stream_info']},
+                                             info['fps'], PIXEL_MODE_NATIVE)
+            profile['preset'] = STREAM_PRESET
+            profile['pix_fmt'] = profile.get('pix_fmt') or raw_format
+            logger.info(f"流式处理开始: {info['width']}x{info['height']} {info['fps']:.3f}fps，"
+                        f"音频: {'有' if info['has_audio'] else '无'}，种子: {self.seed}")
+
+            audio_target = self._start_processes(info, raw_format, profile)
+            decoders = [self.decoder] + ([self.audio_decoder] if info['has_audio'] else [])
+            tee = InputTee([decoder.stdin for decoder in decoders])
+            self._guard("输入转发", self._pump_input, source, head, tee)
+            pumping = True
+            threads = [self._guard(f"输入写入{index}", tee.drain, index) for index in range(len(decoders))]
+            threads.append(self._guard("视频丢帧", self._filter_video, self.decoder.stdout, self.encoder.stdin,
+                                       frame_size, info['fps']))
+            if info['has_audio']:
+                threads.append(self._guard("音频丢弃", self._filter_audio, self.audio_decoder.stdout, audio_target,
+                                           info['fps'], info['sample_rate'], info['channels']))
+            for thread in threads:
+                thread.join()
+            for decoder in decoders:
+                decoder.wait()
+            self.encoder.wait()
+            if self._errors:
+                raise IOError('; '.join(self._errors))
+            if not self.is_running:
+                raise StreamCancelled()
+            if self.encoder.returncode != 0:
+                raise IOError(f"流式编码失败，返回码 {self.encoder.returncode}")
+        finally:
+            self.stop()
+            if not pumping:
+                self._close_input(source)
+
+        self.stats.update({
+            "seed": self.seed,
+            "fps": info['fps'],
+            "resolution": f"{info['width']}x{info['height']}",
+            "has_audio": info['has_audio'],
+            "processing_time": time.time() - started,
+        })
+        return self.stats
@@ -0,0 +1,84 @@
+import logging
+
+import cv2
+
+from processors.decode_backends import open_backend, BACKEND_AUTO
+from processors.keyframe_index import load_keyframe_index
+from utils.file_utils import get_file_fingerprint
+from utils.thumbnail_cache import make_thumbnail_key
+
+DEFAULT_THUMBNAIL_HEIGHT = 72
+JPEG_QUALITY = 80
+# 没有关键帧信息时，目标在当前位置之后多少帧以内直接向前读取，否则重新定位
+FORWARD_READ_LIMIT = 60
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailExtractor:
+    # 按帧序号解码并缩小为 JPEG，结果放入 ThumbnailCache；
+    # 目标与当前位置之间没有关键帧时向前读取，否则定位到目标之前的关键帧，不解码无关的部分
+    def __init__(self, path, fps, cache, height=DEFAULT_THUMBNAIL_HEIGHT, backend_name=BACKEND_AUTO):
+        self.path = path
+        self.fps = fps
+        self.cache = cache
+        self.height = height
+        self.backend_name = backend_name
+        self.backend = None
+        self.keyframes = None
+        self.fingerprint = None
+        self.position = None
+
+    def open(self):
+        self.fingerprint = get_file_fingerprint(self.path)
+        self.keyframes = load_keyframe_index(self.path, self.fps, self.backend_name)
+        # 缩略图只解码少量帧，一个解码线程足够，不与处理任务争抢 CPU
+        self.backend = open_backend(self.path, self.backend_name, threads=1)
+        return self
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.release()
+            self.backend = None
+            self.position = None
+
+    def _should_read_forward(self, frame_index):
+        if self.position is None or frame_index < self.position:
+            return False
+        if len(self.keyframes):
+            return self.keyframes.floor(frame_index) <= self.position
+        return frame_index - self.position <= FORWARD_READ_LIMIT
+
+    def _decode(self, frame_index):
+        if self._should_read_forward(frame_index):
+            while self.position < frame_index:
+                if not self.backend.grab():
+                    return None
+                self.position += 1
+        else:
+            self.backend.seek(frame_index)
+            self.position = frame_index
+        ret, frame = self.backend.read()
+        if not ret:
+            self.position = None
+            return None
+        self.position = frame_index + 1
+        return frame
+
+    def thumbnail(self, frame_index):
+        # 返回 JPEG 数据，帧不存在时返回 None
+        key = make_thumbnail_key(self.fingerprint, frame_index, self.height)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        frame = self._decode(frame_index)
+        if frame is None:
+            return None
+        width = max(1, int(round(frame.shape[1] * self.height / frame.shape[0])))
+        small = cv2.resize(frame, (width, self.height), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            return None
+        data = encoded.tobytes()
+        self.cache.put(key, data)
+        return data
@@ -0,0 +1,74 @@
+# 处理范围："开始-结束"，时间可写成秒数（90、90.5）或 [时:]分:秒（1:30、01:02:03.5），
+# 结束留空表示到视频末尾，例如 "10:00-" ；多个范围按时间顺序拼接输出
+
+
+def parse_timestamp(text):
+    text = str(text).strip()
+    parts = text.split(':')
+    if not text or len(parts) > 3:
+        raise ValueError(f"时间格式应为秒数或 [时:]分:秒，实际为: {text}")
+    try:
+        values = [float(part) for part in parts]
+    except ValueError:
+        raise ValueError(f"时间格式应为秒数或 [时:]分:秒，实际为: {text}")
+    if any(value < 0 for value in values) or any(value >= 60 for value in values[1:]):
+        raise ValueError(f"时间无效: {text}")
+    seconds = 0.0
+    for value in values:
+        seconds = seconds * 60 + value
+    return seconds
+
+
+def parse_time_range(text):
+    start_text, sep, end_text = str(text).partition('-')
+    if not sep:
+        raise ValueError(f"处理范围格式应为 \"开始-结束\"，例如 1:00-2:30 或 600-，实际为: {text}")
+    start = parse_timestamp(start_text) if start_text.strip() else 0.0
+    end = parse_timestamp(end_text) if end_text.strip() else None
+    return [start, end]
+
+
+def normalize_time_ranges(ranges):
+    # 接受范围字符串或 [开始秒, 结束秒或 None]，按开始时间排序并合并重叠的范围
+    parsed = []
+    for item in ranges or []:
+        if isinstance(item, str):
+            start, end = parse_time_range(item)
+        else:
+            try:
+                start, end = item
+                start = float(start)
+                end = float(end) if end is not None else None
+            except (TypeError, ValueError):
+                raise ValueError(f"处理范围无效: {item}")
+        if start < 0 or (end is not None and end <= start):
+            raise ValueError(f"处理范围的结束时间必须晚于开始时间: {item}")
+        parsed.append([start, end])
+    merged = []
+    for start, end in sorted(parsed, key=lambda item: item[0]):
+        if merged and (merged[-1][1] is None or start <= merged[-1][1]):
+            if merged[-1][1] is not None:
+                merged[-1][1] = None if end is None else max(merged[-1][1], end)
+            continue
+        merged.append([start, end])
+    return merged
+
+
+def time_ranges_to_frames(time_ranges, fps, frame_count):
+    # 换算为帧范围 [(start, end), ...]；未指定范围时为整个视频
+    if not time_ranges:
+        return [(0, frame_count)]
+    frame_ranges = []
+    for start, end in time_ranges:
+        start_frame = min(frame_count, int(round(start * fps)))
+        end_frame = frame_count if end is None else min(frame_count, int(round(end * fps)))
+        if end_frame > start_frame:
+            frame_ranges.append((start_frame, end_frame))
+    if not frame_ranges:
+        raise ValueError("处理范围超出了视频时长")
+    return frame_ranges
+
+
+def frames_within(frame_ranges, position):
+    # [0, position) 中落在各范围内的帧数，用于按实际处理的帧计算进度
+    return sum(max(0, min(position, end) - start) for start, end in frame_ranges)
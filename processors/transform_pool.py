@@ -0,0 +1,133 @@
+import queue
+import signal
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from processors.frame_transforms import build_transforms, frame_rng
+
+# 阻塞等待结果时每隔多久检查一次停止标志和工作进程状态（秒）
+POLL_INTERVAL = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+def transform_worker(shm_name, slot_count, frame_shape, specs, seed, tasks, results):
+    # 工作进程：附加到共享内存，按槽位序号原地变换帧，只回传槽位序号
+    # 终端的 Ctrl+C 会发给整个进程组，工作进程的退出由主进程统一控制
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slot_count,) + tuple(frame_shape), dtype=np.uint8, buffer=shm.buf)
+    try:
+        try:
+            transforms = build_transforms(specs, frame_shape)
+        except Exception as e:
+            results.put((None, f"{type(e).__name__}: {str(e)}"))
+            return
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot, index = task
+            try:
+                rng = frame_rng(seed, index)
+                for transform in transforms:
+                    transform.apply(frames[slot], index, rng)
+            except Exception as e:
+                results.put((slot, f"{type(e).__name__}: {str(e)}"))
+            else:
+                results.put((slot, None))
+    finally:
+        del frames
+        shm.close()
+
+
+class TransformPool:
+    # 帧变换在多个工作进程中并行执行，不受主进程 GIL 限制。帧数据放在共享内存环形缓冲区中，
+    # 解码线程直接写入槽位，工作进程原地修改，写入线程按原顺序读取，进程间只传递槽位序号
+    def __init__(self, specs, frame_shape, workers, slot_count, seed):
+        self.specs = specs
+        self.frame_shape = tuple(frame_shape)
+        self.workers = max(1, workers)
+        self.slot_count = slot_count
+        self.seed = seed
+        self.shm = None
+        self.frames = None
+        self.tasks = None
+        self.results = None
+        self.processes = []
+        self._buffers = []
+        self._slots = {}
+        self._done = set()
+
+    def start(self):
+        frame_bytes = int(np.prod(self.frame_shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_count * frame_bytes)
+        self.frames = np.ndarray((self.slot_count,) + self.frame_shape, dtype=np.uint8, buffer=self.shm.buf)
+        self._buffers = [self.frames[slot] for slot in range(self.slot_count)]
+        self._slots = {id(buffer): slot for slot, buffer in enumerate(self._buffers)}
+        # spawn 在各平台上行为一致，也避免在已有解码线程的进程中 fork
+        context = multiprocessing.get_context('spawn')
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        for number in range(self.workers):
+            process = context.Process(
+                target=transform_worker, name=f"frame-transform-{number}", daemon=True,
+                args=(self.shm.name, self.slot_count, self.frame_shape, self.specs, self.seed, self.tasks, self.results)
+            )
+            process.start()
+            self.processes.append(process)
+        logger.info(f"帧变换进程池已启动: {self.workers} 个进程，{self.slot_count} 个共享帧槽位")
+        return self
+
+    def buffers(self):
+        # 共享内存中各槽位的 NumPy 视图，作为流水线的帧缓冲区
+        return list(self._buffers)
+
+    def submit(self, buffer, index):
+        self.tasks.put((self._slots[id(buffer)], index))
+
+    def wait(self, buffer, stop_event):
+        # 等待指定槽位变换完成；停止时返回 False，工作进程出错或退出时抛出异常
+        slot = self._slots[id(buffer)]
+        while slot not in self._done:
+            if stop_event.is_set():
+                return False
+            try:
+                done_slot, error = self.results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if any(not process.is_alive() for process in self.processes):
+                    raise RuntimeError("帧变换工作进程意外退出")
+                continue
+            if error is not None:
+                raise RuntimeError(f"帧变换失败: {error}")
+            self._done.add(done_slot)
+        self._done.discard(slot)
+        return True
+
+    def close(self):
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes = []
+        if self.tasks is not None:
+            self.tasks.cancel_join_thread()
+            self.tasks.close()
+            self.results.close()
+        self._buffers = []
+        self._slots = {}
+        self.frames = None
+        if self.shm is not None:
+            try:
+                self.shm.close()
+            except BufferError:
+                # 流水线仍持有槽位视图时无法立即解除映射，unlink 后由垃圾回收释放
+                pass
+            self.shm.unlink()
+            self.shm = None
@@ -1,109 +1,177 @@
-from PyQt5.QtCore import QThread, pyqtSignal
 import cv2
 import logging
 import time
 import os
-from moviepy.editor import AudioFileClip
 import subprocess
 import json
+import threading
+from utils.process_utils import popen_hidden, kill_process_tree
 
-class VideoAnalyzer(QThread):
-    progress = pyqtSignal(int, str)
-    finished = pyqtSignal(dict)
-    error = pyqtSignal(str)
 
+class AnalysisCancelled(Exception):
+    pass
+
+class VideoProbe:
+    # 不依赖 Qt 的视频分析逻辑，可在线程池或无界面的服务中使用
     def __init__(self, video_path):
-        super().__init__()
         self.video_path = video_path
         self.logger = logging.getLogger(__name__)
-
-    def run(self):
+        self.is_running = True
+        self._process_lock = threading.Lock()
+        self._process = None
+
+    def _check_cancelled(self):
+        if not self.is_running:
+            raise AnalysisCancelled()
+
+    def _run_ffprobe(self, ffprobe_cmd):
+        process = popen_hidden(ffprobe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with self._process_lock:
+            self._process = process
         try:
-            self.logger.info(f"开始分析视频: {self.video_path}")
-            start_time = time.time()
-            
-            self.progress.emit(0, "开始视频分析")
-
-            # 获取文件信息
-            file_size = os.path.getsize(self.video_path) / (1024 * 1024)  # 转换为MB
-            file_name = os.path.basename(self.video_path)
-
-            # 视频分析
-            cap = cv2.VideoCapture(self.video_path)
-            if not cap.isOpened():
-                raise IOError(f"无法打开视频文件: {self.video_path}")
-
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            duration = frame_count / fps if fps > 0 else 0
-
-            cap.release()
-
-            self.progress.emit(50, "视频分析完成")
-
-            # 音频分析
-            self.progress.emit(75, "开始音频分析")
-            with AudioFileClip(self.video_path) as audio:
-                has_audio = audio is not None
-                audio_duration = audio.duration if has_audio else 0
-                audio_fps = audio.fps if has_audio else 0
-
-            # 获取视频比特率信息
-            ffprobe_cmd = [
-                'ffprobe',
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_format',
-                '-show_streams',
-                self.video_path
-            ]
-            ffprobe_output = subprocess.check_output(ffprobe_cmd).decode('utf-8')
-            ffprobe_data = json.loads(ffprobe_output)
-
-            total_bitrate = ffprobe_data['format'].get('bit_rate')
-            if total_bitrate:
-                total_bitrate = f"{int(total_bitrate) // 1000}k"
-
-            audio_bitrate = None
-            for stream in ffprobe_data['streams']:
-                if stream['codec_type'] == 'audio':
-                    audio_bitrate = stream.get('bit_rate')
-                    if audio_bitrate:
-                        audio_bitrate = f"{int(audio_bitrate) // 1000}k"
-                    break
-
-            end_time = time.time()
-            analysis_duration = end_time - start_time
-
-            self.progress.emit(100, "分析完成")
-
-            result = {
-                "文件路径": os.path.abspath(self.video_path),  # 使用绝对路径
-                "文件名称": file_name,
-                "文件大小": f"{file_size:.2f}",
-                "视频总帧数": frame_count,
-                "帧率": fps,
-                "分辨率": f"{width}x{height}",
-                "时长": duration,
-                "是否包含音频": has_audio,
-                "音频时长": audio_duration if has_audio else None,
-                "音频采样率": audio_fps if has_audio else None,
-                "分析用时": analysis_duration,
-                "total_bitrate": total_bitrate,
-                "audio_info": {
-                    "audio_bitrate": audio_bitrate
+            if not self.is_running:
+                kill_process_tree(process)
+            stdout, stderr = process.communicate()
+        finally:
+            with self._process_lock:
+                self._process = None
+        self._check_cancelled()
+        if process.returncode != 0:
+            raise IOError(f"ffprobe 执行失败: {stderr.decode(errors='ignore')}")
+        return stdout.decode('utf-8')
+
+    def analyze(self, progress_callback=None):
+        # 分析视频文件并返回信息字典，取消时抛出 AnalysisCancelled
+        if progress_callback is None:
+            progress_callback = lambda value, stage: None
+        self.logger.info(f"开始分析视频: {self.video_path}")
+        start_time = time.time()
+        
+        progress_callback(0, "开始视频分析")
+
+        # 获取文件信息
+        file_size = os.path.getsize(self.video_path) / (1024 * 1024)  # 转换为MB
+        file_name = os.path.basename(self.video_path)
+
+        # 视频分析
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise IOError(f"无法打开视频文件: {self.video_path}")
+
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        duration = frame_count / fps if fps > 0 else 0
+
+        cap.release()
+        self._check_cancelled()
+
+        progress_callback(50, "视频分析完成")
+
+        # 音频分析
+        progress_callback(75, "开始音频分析")
+
+        # 获取视频比特率信息
+        ffprobe_cmd = [
+            'ffprobe',
+            '-v', 'quiet',
+            '-print_format', 'json',
+            '-show_format',
+            '-show_streams',
+            self.video_path
+        ]
+        ffprobe_output = self._run_ffprobe(ffprobe_cmd)
+        ffprobe_data = json.loads(ffprobe_output)
+
+        total_bitrate = ffprobe_data['format'].get('bit_rate')
+        if total_bitrate:
+            total_bitrate = f"{int(total_bitrate) // 1000}k"
+
+        audio_bitrate = None
+        has_audio = False
+        audio_duration = 0
+        audio_fps = 0
+        for stream in ffprobe_data['streams']:
+            if stream['codec_type'] == 'audio':
+                has_audio = True
+                audio_duration = float(stream.get('duration') or ffprobe_data['format'].get('duration') or 0)
+                audio_fps = int(stream.get('sample_rate') or 0)
+                audio_bitrate = stream.get('bit_rate')
+                if audio_bitrate:
+                    audio_bitrate = f"{int(audio_bitrate) // 1000}k"
+                break
+
+        video_stream_info = {"codec_name": None}
+        for stream in ffprobe_data['streams']:
+            if stream['codec_type'] == 'video':
+                # 像素格式和色彩元数据用于原始像素格式直通模式
+                video_stream_info = {
+                    "codec_name": stream.get('codec_name'),
+                    "pix_fmt": stream.get('pix_fmt'),
+                    "bits_per_raw_sample": stream.get('bits_per_raw_sample'),
+                    "color_range": stream.get('color_range'),
+                    "color_space": stream.get('color_space'),
+                    "color_transfer": stream.get('color_transfer'),
+                    "color_primaries": stream.get('color_primaries'),
                 }
-            }
-
-            self.finished.emit(result)
-
-        except Exception as e:
-            self.logger.error(f"视频分析出错: {str(e)}", exc_info=True)
-            self.error.emit(f"视频分析失败: {str(e)}")
-
-    def stop(self):
-        self.logger.info("停止视频分析")
-        self.terminate()
-        self.wait()
+                break
+
+        end_time = time.time()
+        analysis_duration = end_time - start_time
+
+        progress_callback(100, "分析完成")
+
+        result = {
+            "文件路径": os.path.abspath(self.video_path),  # 使用绝对路径
+            "文件名称": file_name,
+            "文件大小": f"{file_size:.2f}",
+            "视频总帧数": frame_count,
+            "帧率": fps,
+            "分辨率": f"{width}x{height}",
+            "时长": duration,
+            "是否包含音频": has_audio,
+            "音频时长": audio_duration if has_audio else None,
+            "音频采样率": audio_fps if has_audio else None,
+            "分析用时": analysis_duration,
+            "total_bitrate": total_bitrate,
+            "audio_info": {
+                "audio_bitrate": audio_bitrate
+            },
+            "video_stream_info": video_stream_info
+        }
+
+        return result
+
+    def cancel(self):
+        self.is_running = False
+        with self._process_lock:
+            process = self._process
+        kill_process_tree(process)
+
+
+def analyze_video(video_path, progress_callback=None):
+    return VideoProbe(video_path).analyze(progress_callback)
+
+
+
+def probe_keyframe_times(video_path):
+    # 只读取视频数据包的关键帧标记，不解码
+    ffprobe_cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        video_path
+    ]
+    process = popen_hidden(ffprobe_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    if process.returncode != 0:
+        raise IOError(f"ffprobe 执行失败: {stderr.decode(errors='ignore')}")
+    times = []
+    for line in stdout.decode('utf-8').splitlines():
+        parts = line.strip().split(',')
+        if len(parts) >= 2 and 'K' in parts[1] and parts[0] not in ('', 'N/A'):
+            times.append(float(parts[0]))
+    return sorted(times)
@@ -1,32 +1,92 @@
 import cv2
-import random
+import bisect
 import numpy as np
-from PyQt5.QtCore import QThread, pyqtSignal
 import time
 import logging
 import os
-from processors.audio_processor import AudioProcessor
+import threading
+import wave
+from processors.audio_processor import AudioProcessor, DEFAULT_AUDIO_CHUNK_BYTES
+from processors.deletion_planner import plan_deletions, new_seed, deleted_frame_set
+from processors.job_manifest import JobManifest
+from processors.frame_pipeline import FramePipeline, DEFAULT_QUEUE_DEPTH
+from processors.ffmpeg_engine import build_native_segment_command, native_video_codec, video_encode_args
+from processors.decode_backends import open_backend, BACKEND_AUTO
+from processors.renditions import build_ladder_command, rendition_output_path
+from processors.motion_analyzer import MotionAnalyzer, MotionAnalysisCancelled, deletion_costs
+from processors.frame_transforms import normalize_transforms
+from processors.transform_pool import TransformPool
+from processors.audio_splicer import AudioSplicer, AudioSpliceUnsupported, AUDIO_MODE_PCM, AUDIO_MODE_COPY
+from processors.time_ranges import normalize_time_ranges, time_ranges_to_frames, frames_within
+from utils.job_progress import JobProgress
+from utils.signals import Signal
+from utils.throughput_store import ThroughputStore
+from utils.process_utils import popen_hidden, kill_process_tree
+from utils.output_cache import (OutputCache, make_cache_key, make_segment_key, get_default_segment_cache_dir,
+                                DEFAULT_SEGMENT_CACHE_BYTES)
+from utils.resource_governor import ResourceLimits
+from utils.resource_sampler import ResourceSampler
+from utils.metadata_cache import MetadataCache
+from utils.file_utils import get_file_fingerprint
 from moviepy.editor import VideoFileClip, AudioFileClip
 import subprocess
 import json
 
-# 尝试导入 win32process 和 win32con，如果失败则设置为 None
-try:
-    from win32com import win32process
-    from win32com import win32con
-except ImportError:
-    win32process = None
-    win32con = None
-
-class VideoProcessor(QThread):
-    progress = pyqtSignal(int, str)
-    finished = pyqtSignal(str, list, dict)
-    frame_deleted_signal = pyqtSignal(int, list)
-    current_second_signal = pyqtSignal(int)
-    info_signal = pyqtSignal(str)
-
-    def __init__(self, input_path, output_path, interval_range, delete_frames, fps, audio_info, frame_count, original_video_info):
-        super().__init__()
+# 每个检查点分段包含的秒数
+DEFAULT_SEGMENT_SECONDS = 60
+
+# 像素处理模式：bgr8 经 OpenCV 转为 8 位 BGR；native 在 ffmpeg 内保持源像素格式
+PIXEL_MODE_BGR8 = 'bgr8'
+PIXEL_MODE_NATIVE = 'native'
+
+# 按数据包删除得到的音频文件，合成时直接复制音频流
+SPLICED_AUDIO_SUFFIX = '_temp_processed_audio.mka'
+
+
+def build_audio_info(video_info):
+    # 从分析结果中取出处理器需要的音频信息
+    return {
+        'has_audio': video_info['是否包含音频'],
+        'audio_duration': video_info.get('音频时长'),
+        'audio_fps': video_info.get('音频采样率')
+    }
+
+
+def build_encoding_profile(video_info, fps, pixel_mode):
+    # 输出编码参数，同时作为输出缓存键的一部分
+    total_bitrate = video_info.get('total_bitrate') or '5000k'
+    audio_bitrate = video_info.get('audio_info', {}).get('audio_bitrate') or '192k'
+    video_bitrate = int(total_bitrate.replace('k', '')) - int(audio_bitrate.replace('k', ''))
+    profile = {
+        "fps": fps,
+        "pixel_mode": pixel_mode,
+        "video_codec": "libx264",
+        "preset": "medium",
+        "video_bitrate": f"{video_bitrate}k",
+        "audio_codec": "aac",
+        "audio_bitrate": audio_bitrate,
+    }
+    if pixel_mode == PIXEL_MODE_NATIVE:
+        stream_info = video_info.get('video_stream_info', {})
+        profile["video_codec"] = native_video_codec(stream_info, profile["video_codec"])
+        profile["pix_fmt"] = stream_info.get('pix_fmt')
+    return profile
+
+
+class VideoProcessingJob:
+    # 不依赖 Qt 的处理核心，界面通过 processors.qt_workers 中的线程包装使用
+    def __init__(self, input_path, output_path, interval_range, delete_frames, fps, audio_info, frame_count, original_video_info,
+                 seed=None, segment_seconds=DEFAULT_SEGMENT_SECONDS, use_cache=True, queue_depth=None,
+                 pixel_mode=PIXEL_MODE_BGR8, backend=BACKEND_AUTO, resources=None, renditions=None,
+                 content_aware=False, audio_mode=AUDIO_MODE_PCM, transforms=None, time_ranges=None,
+                 reuse_seed=False):
+        self.progress = Signal()
+        self.finished = Signal()
+        self.frame_deleted_signal = Signal()
+        self.current_second_signal = Signal()
+        self.info_signal = Signal()
+        self.eta_signal = Signal()
+        self.resource_signal = Signal()
         self.input_path = input_path
         self.output_path = output_path
         self.interval_range = interval_range
@@ -35,201 +95,870 @@ class VideoProcessor(QThread):
         self.audio_info = audio_info
         self.frame_count = frame_count
         self.original_video_info = original_video_info
+        # 只处理并输出指定的时间范围，解码从第一个范围定位开始，读到最后一个范围结束即停止
+        self.time_ranges = normalize_time_ranges(time_ranges)
+        self.frame_ranges = time_ranges_to_frames(self.time_ranges, fps, frame_count)
+        self.range_frame_count = sum(end - start for start, end in self.frame_ranges)
+        self.seed = seed
+        # 未指定种子时沿用上次处理同一文件的种子，删除计划不变，分段可以复用；默认每次随机生成新种子
+        self.reuse_seed = reuse_seed
+        self.segment_seconds = segment_seconds
+        # 解码与写入之间缓存的帧数，4K 等大分辨率下可调小以限制内存；未指定时按内存预算自动计算
+        self.queue_depth = queue_depth
+        self.pixel_mode = pixel_mode
+        # 解码后端在视频和音频阶段之间共用，PyAV 不可用时退回 OpenCV/ffmpeg
+        self.backend_name = backend
+        self.backend = None
+        # 线程上限、优先级和内存预算，作用于解码、ffmpeg 子进程和帧队列
+        self.resources = resources or ResourceLimits()
+        self.resource_sampler = None
+        # 按画面变化分析结果优先删除低运动帧
+        self.content_aware = content_aware
+        self.motion_analyzer = None
+        self.frame_costs = None
+        # copy 模式在压缩域整包删除音频，不支持的编码退回 PCM 解码处理
+        self.audio_mode = audio_mode
+        self.audio_splicer = None
+        self.processed_audio_path = None
+        self.manifest = None
+        self.resumed = False
+        self.output_cache = OutputCache() if use_cache else None
+        # 保留已渲染的分段，重新处理时删除位置不变的分段直接复用；间隔范围和删除帧数的调整会改变所有分段
+        self.segment_cache = OutputCache(get_default_segment_cache_dir(), DEFAULT_SEGMENT_CACHE_BYTES) if use_cache else None
+        self.reused_segments = 0
+        # 记录每个文件最近一次的种子和删除的帧，用于 reuse_seed 以及检查哪些分段本应可以复用
+        self.plan_history = MetadataCache() if use_cache else None
+        self.previous_deleted_frames = None
+        self.unchanged_rerendered = 0
+        self.cache_key = None
+        # 合成失败时的错误信息；合成阶段自行处理异常，失败的合成不计入吞吐量
+        self.merge_error = None
         self.is_running = True
         self.deleted_frames_info = []
         self.logger = logging.getLogger(__name__)
+        # 额外输出的各档分辨率，在合成阶段与原分辨率输出一起编码
+        self.renditions = self._prepare_renditions(renditions or [])
+        # 逐帧变换插件，在进程池中并行执行
+        self.transforms = self._prepare_transforms(transforms)
+        self._process_lock = threading.Lock()
+        self._active_processes = set()
+        self._temp_files = set()
         self.audio_processor = AudioProcessor()
+        self.throughput_store = ThroughputStore()
+        self.job_progress = self._create_job_progress()
+
+    def _prepare_renditions(self, renditions):
+        # 不放大：高于源视频的档位跳过
+        try:
+            source_height = int(self.original_video_info.get('分辨率', '').split('x')[1])
+        except (IndexError, ValueError):
+            source_height = None
+        prepared = []
+        for rendition in renditions:
+            if source_height is not None and rendition["height"] > source_height:
+                self.logger.info(f"跳过高于源视频的输出档位: {rendition['height']}p")
+                continue
+            prepared.append(dict(rendition, output_path=rendition_output_path(self.output_path, rendition)))
+        return prepared
+
+    def _prepare_transforms(self, transforms):
+        transforms = normalize_transforms(transforms)
+        if transforms and self.pixel_mode == PIXEL_MODE_NATIVE:
+            # 原始像素格式模式下分段由 ffmpeg 直接输出，帧不经过 Python
+            self.logger.warning("原始像素格式模式不支持帧变换，已忽略")
+            return []
+        return transforms
+
+    def _temp_path(self, suffix):
+        # 生成临时文件路径并登记，取消或结束时统一删除
+        path = self.output_path.rsplit('.', 1)[0] + suffix
+        self._temp_files.add(path)
+        return path
+
+    def _start_process(self, command, **kwargs):
+        process = popen_hidden(command, **kwargs)
+        self.resources.apply_to_pid(process.pid)
+        with self._process_lock:
+            self._active_processes.add(process)
+        # 启动期间如果已经取消，立即终止
+        if not self.is_running:
+            kill_process_tree(process)
+        return process
+
+    def _release_process(self, process):
+        with self._process_lock:
+            self._active_processes.discard(process)
+
+    def _active_pids(self):
+        with self._process_lock:
+            return [process.pid for process in self._active_processes]
+
+    def _start_resource_sampler(self):
+        # 采样本任务的处理线程和它启动的 ffmpeg 子进程树，每个采样同时推送给界面
+        self.resource_sampler = ResourceSampler(on_sample=self.resource_signal.emit, child_pids=self._active_pids)
+        self.resource_sampler.track_current_thread()
+        self.resource_sampler.set_stage("prepare")
+        self.resource_sampler.start()
+
+    def _stop_resource_sampler(self):
+        if self.resource_sampler is not None:
+            self.resource_sampler.stop()
+
+    def _attach_resource_report(self, final_video_info):
+        # 资源时间线随结果一起返回，写入任务报告
+        self._stop_resource_sampler()
+        if self.resource_sampler is not None:
+            final_video_info['resource_summary'] = self.resource_sampler.summary()
+            final_video_info['resource_timeline'] = self.resource_sampler.timeline()
+        return final_video_info
+
+    def _open_backend(self):
+        if self.backend is None:
+            self.backend = open_backend(self.input_path, self.backend_name, self.resources.max_threads)
+            self.logger.info(f"解码后端: {self.backend.name}")
+        return self.backend
+
+    def _close_backend(self):
+        if self.backend is not None:
+            self.backend.release()
+            self.backend = None
+
+    def _throughput_key(self):
+        resolution = self.original_video_info.get('分辨率')
+        codec = self.original_video_info.get('video_stream_info', {}).get('codec_name')
+        return resolution, codec
+
+    def _create_job_progress(self):
+        # 根据历史吞吐量估算各阶段耗时，作为整体进度的权重
+        stages = ["video", "audio", "merge"] if self.audio_info.get("has_audio") else ["video", "merge"]
+        if self.content_aware:
+            stages.insert(0, "analysis")
+        resolution, codec = self._throughput_key()
+        return JobProgress([
+            (stage, self._stage_frames(stage) / self.throughput_store.get_stage_fps(resolution, codec, stage))
+            for stage in stages
+        ])
+
+    def _stage_frames(self, stage):
+        # 画面变化分析总是覆盖整个视频，其余阶段只处理指定范围内的帧
+        return self.frame_count if stage == "analysis" else self.range_frame_count
+
+    def _report_progress(self, stage, fraction, label):
+        percent = self.job_progress.update(stage, fraction)
+        self.progress.emit(percent, label)
+        self.eta_signal.emit(self.job_progress.remaining_seconds())
+
+    def _run_stage(self, stage, stage_func):
+        if stage not in self.job_progress.stages:
+            return
+        self.job_progress.start_stage(stage)
+        if self.resource_sampler is not None:
+            self.resource_sampler.set_stage(stage)
+        stage_func()
+        elapsed = self.job_progress.finish_stage(stage)
+        if self.is_running and self._should_record_throughput() and self._should_record_stage(stage):
+            resolution, codec = self._throughput_key()
+            self.throughput_store.record(resolution, codec, stage, self._stage_frames(stage), elapsed)
+
+    def _should_record_stage(self, stage):
+        # 多档输出的合成耗时、读取缓存的分析耗时都不代表该阶段的正常速度
+        if stage == "merge" and (self.renditions or self.merge_error is not None):
+            return False
+        if stage == "analysis" and self.motion_analyzer is not None and self.motion_analyzer.from_cache:
+            return False
+        if stage == "audio" and self.audio_splicer is not None:
+            return False
+        if stage == "video" and (self.transforms or self.reused_segments):
+            return False
+        return True
+
+    def _should_record_throughput(self):
+        # 从检查点恢复时本次只处理了部分帧，不计入吞吐量记录
+        return not self.resumed
 
     def run(self):
         self.logger.info("开始视频处理")
         start_time = time.time()
+        self.resources.apply_to_current_thread()
+        self._start_resource_sampler()
         try:
-            self.logger.info("开始视频处理步骤")
-            if self.is_running:
-                self._process_video()
-            self.logger.info("视频处理步骤完成")
-            if self.is_running:
-                self._process_audio()
-            self.logger.info("音频处理步骤完成")
-            if self.is_running:
-                self._merge_video_audio()
-            self.logger.info("视频音频合并步骤完成")
+            if self.content_aware:
+                self._run_stage("analysis", self._analyze_motion)
+                if not self.is_running:
+                    self.logger.info("处理已取消")
+                    return
+            self._prepare_plan()
+            if self._restore_from_cache():
+                if self.renditions and self.is_running:
+                    self._run_stage("merge", self._render_renditions_from_output)
+            else:
+                self.logger.info("开始视频处理步骤")
+                if self.is_running:
+                    self._run_stage("video", self._process_video)
+                self.logger.info("视频处理步骤完成")
+                if self.is_running:
+                    self._run_stage("audio", self._process_audio)
+                self.logger.info("音频处理步骤完成")
+                if self.is_running:
+                    self._run_stage("merge", self._merge_video_audio)
+                self.logger.info("视频音频合并步骤完成")
+                self.throughput_store.save()
         except Exception as e:
+            if not self.is_running:
+                self.logger.info("处理已取消")
+                return
             self.logger.error(f"视频处理出错: {str(e)}", exc_info=True)
             self.finished.emit(f"处理失败: {str(e)}", [], {})
         else:
+            if not self.is_running:
+                self.logger.info("处理已取消")
+                return
+            if self.merge_error is not None:
+                # 合成阶段自行捕获了异常，这里仍按失败结束任务
+                self.finished.emit(f"处理失败: {self.merge_error}", [], {})
+                return
             end_time = time.time()
             processing_time = end_time - start_time
             self.logger.info(f"处理完成，用时: {processing_time:.2f}秒")
             final_video_info = self.get_final_video_info(self.output_path)
             final_video_info['processing_time'] = processing_time
+            if self.renditions:
+                final_video_info['renditions'] = self._rendition_report()
+            self._attach_resource_report(final_video_info)
             self.finished.emit("处理完成。", self.deleted_frames_info, final_video_info)
+        finally:
+            self._stop_resource_sampler()
+            self._close_backend()
+            if self.is_running:
+                self.cleanup_temp_files()
+
+    def _plan_params(self):
+        params = {
+            "interval_range": self.interval_range,
+            "delete_frames": self.delete_frames,
+            "fps": self.fps,
+            "frame_count": self.frame_count,
+            "segment_seconds": self.segment_seconds,
+            "pixel_mode": self.pixel_mode,
+        }
+        if self.content_aware:
+            params["content_aware"] = True
+        if self.transforms:
+            params["transforms"] = self.transforms
+        if self.time_ranges:
+            params["time_ranges"] = self.time_ranges
+        return params
+
+    def _prepare_plan(self):
+        # 存在匹配的任务清单时沿用其中的种子和计划，否则重新生成
+        manifest_path = JobManifest.manifest_path_for(self.output_path)
+        params = self._plan_params()
+        manifest = JobManifest.load(manifest_path)
+        if manifest is not None and manifest.matches(self.input_path, params, self.seed):
+            self.resumed = manifest.has_completed_segments() or bool(manifest.data["stages"])
+            if self.resumed:
+                self.info_signal.emit("检测到未完成的任务，将从上次的检查点继续")
+        else:
+            if manifest is not None:
+                manifest.discard()
+            fingerprint = get_file_fingerprint(self.input_path)
+            previous_seed = self._load_previous_plan(fingerprint)
+            if self.seed is not None:
+                seed = self.seed
+            elif self.reuse_seed and previous_seed is not None:
+                seed = previous_seed
+                self.info_signal.emit("未指定随机种子，沿用上次处理该文件时的种子")
+            else:
+                seed = new_seed()
+            plan = plan_deletions(self.frame_count, self.fps, self.interval_range, self.delete_frames, seed,
+                                  self.frame_costs, self.frame_ranges if self.time_ranges else None)
+            self._remember_plan(fingerprint, seed, plan)
+            segment_frames = max(1, self.segment_seconds * int(self.fps))
+            manifest = JobManifest.create(manifest_path, self.input_path, params, seed, plan, segment_frames)
+        self.manifest = manifest
+        self.seed = manifest.seed
+        self.deleted_frames_info = manifest.plan
+        self.logger.info(f"删除计划: {len(self.deleted_frames_info)} 处，种子 {self.seed}")
+        self.info_signal.emit(f"随机种子: {self.seed}")
+        for sec, frames in self.deleted_frames_info:
+            self.frame_deleted_signal.emit(sec, frames)
+            self.current_second_signal.emit(sec)
+
+    def _load_previous_plan(self, fingerprint):
+        # 返回上次处理该文件时的种子，并记下上次删除的帧；没有记录时返回 None
+        if self.plan_history is None:
+            return None
+        seed = self.plan_history.load(fingerprint, "plan_seed")
+        deleted = self.plan_history.load(fingerprint, "plan_deleted")
+        if seed is None or deleted is None:
+            return None
+        self.previous_deleted_frames = deleted.tolist()
+        return int(seed[0])
+
+    def _remember_plan(self, fingerprint, seed, plan):
+        if self.plan_history is None:
+            return
+        # 种子可能超出 64 位整数的范围，按字符串保存
+        self.plan_history.store(fingerprint, "plan_seed", np.array([str(seed)]))
+        self.plan_history.store(fingerprint, "plan_deleted", np.array(sorted(deleted_frame_set(plan)), dtype=np.int64))
+
+    def _analyze_motion(self):
+        # 低分辨率灰度解码一遍，得到每帧的删除代价；同一文件的分析结果从元数据缓存读取
+        self.info_signal.emit("正在分析画面变化...")
+        self.motion_analyzer = MotionAnalyzer(self.input_path, self.frame_count, resources=self.resources)
+        try:
+            scores = self.motion_analyzer.analyze(
+                lambda fraction: self._report_progress("analysis", fraction, "画面变化分析"))
+        except MotionAnalysisCancelled:
+            return
+        self.frame_costs = deletion_costs(scores)
+        source = "已读取缓存的画面变化分析" if self.motion_analyzer.from_cache else "画面变化分析完成"
+        self.info_signal.emit(f"{source}，将优先删除低运动帧")
+
+    def _encoding_profile(self):
+        return build_encoding_profile(self.original_video_info, self.fps, self.pixel_mode)
+
+    def _restore_from_cache(self):
+        if self.output_cache is None:
+            return False
+        profile = self._encoding_profile()
+        if self.audio_mode == AUDIO_MODE_COPY:
+            profile = dict(profile, audio_mode=AUDIO_MODE_COPY)
+        if self.transforms:
+            # 变换中的随机量由种子决定
+            profile = dict(profile, transforms=self.transforms, transform_seed=self.seed)
+        if self.time_ranges:
+            profile = dict(profile, time_ranges=self.time_ranges)
+        self.cache_key = make_cache_key(self.manifest.data["input_fingerprint"], self.deleted_frames_info, profile)
+        try:
+            if not self.output_cache.lookup(self.cache_key, self.output_path):
+                return False
+        except OSError as e:
+            self.logger.warning(f"读取输出缓存失败: {str(e)}")
+            return False
+        self.manifest.discard()
+        self.info_signal.emit("命中输出缓存，直接使用已有的处理结果")
+        self.progress.emit(100, "处理完成")
+        return True
+
+    def _store_in_cache(self):
+        if self.output_cache is None or self.cache_key is None:
+            return
+        try:
+            self.output_cache.store(self.cache_key, self.output_path)
+        except OSError as e:
+            self.logger.warning(f"写入输出缓存失败: {str(e)}")
 
     def _process_video(self):
-        cap = cv2.VideoCapture(self.input_path)
-        out = None
+        if self.pixel_mode == PIXEL_MODE_NATIVE:
+            return self._process_video_native()
+
+        backend = self._open_backend()
+        width = backend.width
+        height = backend.height
+
+        frames_to_delete_set = deleted_frame_set(self.deleted_frames_info)
+        frame_shape = (height, width, 3)
+        if self.queue_depth:
+            # 指定的队列长度同样受内存预算限制
+            queue_depth = min(self.queue_depth, self.resources.queue_depth(frame_shape, self.queue_depth))
+        else:
+            queue_depth = self.resources.queue_depth(frame_shape, DEFAULT_QUEUE_DEPTH)
+        transform_pool = self._start_transform_pool(frame_shape, queue_depth) if self.transforms else None
+        pipeline = FramePipeline(backend, frame_shape, queue_depth, transform_pool)
         try:
-            if not cap.isOpened():
-                raise IOError(f"无法打开视频文件: {self.input_path}")
+            self._render_segments(backend, pipeline, frames_to_delete_set, (width, height))
+        finally:
+            if transform_pool is not None:
+                transform_pool.close()
+        self._report_progress("video", 1.0, "视频处理")
 
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            temp_video_path = self.output_path.rsplit('.', 1)[0] + '_temp_video.mp4'
-            
-            out = cv2.VideoWriter(temp_video_path, fourcc, self.fps, (width, height))
-            if not out.isOpened():
-                raise IOError(f"无法创建临时视频文件: {temp_video_path}")
-
-            start_sec, end_sec = map(int, self.interval_range.split('-'))
-            self.deleted_frames_info = []
-
-            # 预先计算要删除的帧
-            total_seconds = int(self.frame_count / self.fps)
-            current_sec = random.randint(max(1, start_sec), end_sec)
-            while current_sec < total_seconds:
-                if current_sec not in [info[0] for info in self.deleted_frames_info]:
-                    frames_in_this_second = min(int(self.fps), self.frame_count - current_sec * int(self.fps))
-                    frames_to_delete = random.sample(range(frames_in_this_second), min(self.delete_frames, frames_in_this_second))
-                    global_frames_to_delete = [frame + current_sec * int(self.fps) for frame in frames_to_delete]
-                    if frames_to_delete:
-                        self.deleted_frames_info.append((current_sec, global_frames_to_delete))
-                        self.frame_deleted_signal.emit(current_sec, global_frames_to_delete)
-                        self.current_second_signal.emit(current_sec)
-                
-                interval = random.randint(max(1, start_sec), end_sec)
-                current_sec += interval
-
-            # 使用numpy优化帧处理
-            frames_to_delete_set = set(frame for _, frames in self.deleted_frames_info for frame in frames)
-            for i in range(self.frame_count):
-                if not self.is_running:
-                    break
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                if i not in frames_to_delete_set:
-                    out.write(frame)
-                
-                if i % (self.frame_count // 100) == 0:
-                    self.progress.emit(int((i + 1) / self.frame_count * 100), "视频处理")
-
-            self.progress.emit(100, "视频处理")
+    def _start_transform_pool(self, frame_shape, queue_depth):
+        # 每个工作进程至少有两个槽位在流转，保证进程池不会因缓冲区不足而空闲
+        workers = self.resources.worker_count(os.cpu_count() or 1)
+        slot_count = max(queue_depth, 2 * workers) + 2
+        names = ', '.join(spec["name"] for spec in self.transforms)
+        self.info_signal.emit(f"帧变换: {names}（{workers} 个进程）")
+        return TransformPool(self.transforms, frame_shape, workers, slot_count, self.seed).start()
+
+    def _segment_ranges(self):
+        # 各处理范围按 segment_frames 切分，范围之外的帧不解码也不输出
+        segment_frames = self.manifest.segment_frames
+        return [(start, min(start + segment_frames, range_end))
+                for range_start, range_end in self.frame_ranges
+                for start in range(range_start, range_end, segment_frames)]
+
+    def _video_progress(self, position):
+        # 按已处理的范围内帧数计算视频阶段进度
+        return frames_within(self.frame_ranges, position) / max(1, self.range_frame_count)
+
+    def _render_segments(self, backend, pipeline, frames_to_delete_set, frame_size):
+        position = 0
+        for index, (start, end) in enumerate(self._segment_ranges()):
+            if not self.is_running:
+                break
+            if self.manifest.is_segment_done(index):
+                self._report_progress("video", self._video_progress(end), "视频处理")
+                continue
+
+            segment_path = self._temp_path(f'_seg{index:05d}.mp4')
+            segment_key = self._segment_key(start, end, frames_to_delete_set)
+            if self._reuse_segment(index, start, end, frames_to_delete_set, segment_key, segment_path):
+                self._report_progress("video", self._video_progress(end), "视频处理")
+                continue
+            if position != start:
+                backend.seek(start)
+                position = start
+            # 复用的分段与分段缓存共享硬链接，重新渲染前先删除，避免原地覆盖缓存文件
+            if os.path.exists(segment_path):
+                os.remove(segment_path)
+            position, written = self._write_segment(pipeline, segment_path, start, end, frames_to_delete_set, frame_size)
+            if not self.is_running:
+                break
+            if written == 0 and os.path.exists(segment_path):
+                os.remove(segment_path)
+            self.manifest.mark_segment_done(index, segment_path, start, end, written)
+            # 已完成的分段作为检查点保留，不再作为临时文件清理
+            self._temp_files.discard(segment_path)
+            self._remember_segment(segment_key, segment_path, written)
+        self._report_reused_segments()
+
+    def _segment_render_params(self):
+        # 除删除位置外影响分段内容的参数
+        params = {"fps": self.fps, "pixel_mode": self.pixel_mode}
+        if self.pixel_mode == PIXEL_MODE_NATIVE:
+            params["profile"] = self._encoding_profile()
+        if self.transforms:
+            params.update(transforms=self.transforms, transform_seed=self.seed)
+        return params
+
+    def _segment_key(self, start, end, frames_to_delete_set):
+        deleted = [frame for frame in frames_to_delete_set if start <= frame < end]
+        return make_segment_key(self.manifest.data["input_fingerprint"], start, end, deleted,
+                                self._segment_render_params())
+
+    def _reuse_segment(self, index, start, end, frames_to_delete_set, segment_key, segment_path):
+        # 之前的任务渲染过删除位置完全相同的分段时直接复用，返回 True
+        kept = (end - start) - sum(1 for frame in frames_to_delete_set if start <= frame < end)
+        if self.segment_cache is None or kept <= 0:
+            return False
+        try:
+            found = self.segment_cache.lookup(segment_key, segment_path)
+        except OSError as e:
+            self.logger.warning(f"读取分段缓存失败: {str(e)}")
+            found = False
+        if not found:
+            if self._deletions_unchanged(start, end, frames_to_delete_set):
+                self.unchanged_rerendered += 1
+            return False
+        self.manifest.mark_segment_done(index, segment_path, start, end, kept)
+        self._temp_files.discard(segment_path)
+        self.reused_segments += 1
+        return True
+
+    def _remember_segment(self, segment_key, segment_path, written):
+        if self.segment_cache is None or written <= 0:
+            return
+        try:
+            self.segment_cache.store(segment_key, segment_path)
+        except OSError as e:
+            self.logger.warning(f"写入分段缓存失败: {str(e)}")
+
+    def _deletions_unchanged(self, start, end, frames_to_delete_set):
+        # 分段内删除的帧与上次处理该文件时的计划相同
+        if self.previous_deleted_frames is None:
+            return False
+        previous = self.previous_deleted_frames[bisect.bisect_left(self.previous_deleted_frames, start):
+                                                bisect.bisect_left(self.previous_deleted_frames, end)]
+        return previous == sorted(frame for frame in frames_to_delete_set if start <= frame < end)
+
+    def _report_reused_segments(self):
+        if self.reused_segments:
+            total = len(self._segment_ranges())
+            self.info_signal.emit(f"删除位置未变的 {self.reused_segments}/{total} 个分段直接复用了之前的渲染结果")
+        self._check_unchanged_segments()
+
+    def _check_unchanged_segments(self):
+        # 参数调整后应当只重新渲染删除位置变化的分段，否则说明渲染参数变了或分段缓存已被清理
+        if self.unchanged_rerendered:
+            self.logger.warning(f"{self.unchanged_rerendered} 个删除位置与上次相同的分段没有可复用的渲染结果，"
+                                f"已重新渲染（渲染参数改变或分段缓存已被清理）")
+
+    def _process_video_native(self):
+        # 每个分段由 ffmpeg 直接以源像素格式和最终编码参数输出，合成时视频流直接复制
+        frames_to_delete_set = deleted_frame_set(self.deleted_frames_info)
+        stream_info = self.original_video_info.get('video_stream_info', {})
+        profile = self._encoding_profile()
+        self.info_signal.emit(f"原始像素格式模式: {stream_info.get('pix_fmt') or '未知'}，编码器 {profile['video_codec']}")
+        for index, (start, end) in enumerate(self._segment_ranges()):
+            if not self.is_running:
+                break
+            if self.manifest.is_segment_done(index):
+                self._report_progress("video", self._video_progress(end), "视频处理")
+                continue
+
+            local_deleted = sorted(frame - start for frame in frames_to_delete_set if start <= frame < end)
+            kept = (end - start) - len(local_deleted)
+            segment_path = self._temp_path(f'_seg{index:05d}.mp4')
+            segment_key = self._segment_key(start, end, frames_to_delete_set)
+            if self._reuse_segment(index, start, end, frames_to_delete_set, segment_key, segment_path):
+                self._report_progress("video", self._video_progress(end), "视频处理")
+                continue
+            if kept > 0:
+                ffmpeg_cmd = build_native_segment_command(
+                    self.input_path, segment_path, start, end - start, local_deleted,
+                    self.fps, stream_info, profile, self.resources.ffmpeg_args()
+                )
+
+                def segment_progress(current_time, start=start, end=end):
+                    position = min(end, start + current_time * self.fps)
+                    self._report_progress("video", self._video_progress(position), "视频处理")
+
+                self._run_ffmpeg_with_progress(ffmpeg_cmd, segment_path, segment_progress)
+            if not self.is_running:
+                break
+            self.manifest.mark_segment_done(index, segment_path, start, end, kept)
+            self._temp_files.discard(segment_path)
+            self._remember_segment(segment_key, segment_path, kept)
+
+        self._report_reused_segments()
+        self._report_progress("video", 1.0, "视频处理")
+
+    def _write_segment(self, pipeline, segment_path, start, end, frames_to_delete_set, frame_size):
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(segment_path, fourcc, self.fps, frame_size)
+        if not out.isOpened():
+            raise IOError(f"无法创建临时视频文件: {segment_path}")
+
+        progress_step = max(1, self.range_frame_count // 100)
+
+        def on_frame(i):
+            if i % progress_step == 0:
+                self._report_progress("video", self._video_progress(i + 1), "视频处理")
+
+        try:
+            # 解码与编码在两个线程中并行进行
+            return pipeline.run(start, end, frames_to_delete_set, out.write, lambda: self.is_running, on_frame)
         finally:
-            cap.release()
-            if out is not None:
-                out.release()
+            out.release()
 
     def _process_audio(self):
         if self.audio_info["has_audio"] and self.is_running:
+            if self.manifest.is_stage_done("audio"):
+                self.processed_audio_path = self.manifest.stage_path("audio")
+                self.info_signal.emit("音频已在上次任务中处理完成")
+                return
             try:
                 self.info_signal.emit("开始处理音频...")
+                if self.audio_mode == AUDIO_MODE_COPY and self._splice_audio():
+                    return
                 audio_path = self.audio_info.get("audio_path")
+                # 提取的音频从 audio_offset 帧处开始，删除位置和处理范围按此平移
+                audio_offset = 0
                 if not audio_path or not os.path.exists(audio_path):
                     self.info_signal.emit("正在从视频中提取音频...")
-                    video = VideoFileClip(self.input_path)
-                    audio = video.audio
-                    audio_path = self.output_path.rsplit('.', 1)[0] + '_temp_audio.wav'
-                    audio.write_audiofile(audio_path, logger=None)
-                    video.close()
-
-                deleted_frames_flat = [frame for _, frames in self.deleted_frames_info for frame in frames]
-                
+                    audio_path = self._temp_path('_temp_audio.wav')
+                    if self.time_ranges:
+                        audio_offset = self._extract_audio_span(audio_path)
+                    else:
+                        self._extract_audio(audio_path)
+                    if not self.is_running:
+                        return
+
+                deleted_frames_flat = [frame - audio_offset for _, frames in self.deleted_frames_info for frame in frames]
+                frame_ranges = [(start - audio_offset, end - audio_offset) for start, end in self.frame_ranges]
+
                 def audio_progress_callback(progress, remaining_time):
-                    self.progress.emit(int(progress * 100), f"音频处理 - 预计剩余: {int(remaining_time)}秒")
-
-                processed_audio = self.audio_processor.process_audio(
-                    audio_path, 
-                    deleted_frames_flat, 
-                    self.fps, 
-                    self.frame_count,
-                    audio_progress_callback
-                )
-                processed_audio_path = self.output_path.rsplit('.', 1)[0] + '_temp_processed_audio.wav'
-                processed_audio.export(processed_audio_path, format="wav")
+                    self._report_progress("audio", progress, "音频处理")
+
+                processed_audio_path = self._temp_path('_temp_processed_audio.wav')
+                if not self._render_audio(audio_path, processed_audio_path, deleted_frames_flat, frame_ranges,
+                                          audio_progress_callback):
+                    return
+                self._finish_audio_stage(processed_audio_path)
                 self.info_signal.emit("音频处理完成")
 
             except Exception as e:
+                if not self.is_running:
+                    return
                 self.logger.error(f"音频处理失败: {str(e)}")
                 self.info_signal.emit(f"音频处理失败: {str(e)}")
 
+    def _finish_audio_stage(self, processed_audio_path):
+        self.manifest.mark_stage_done("audio", processed_audio_path)
+        self._temp_files.discard(processed_audio_path)
+        self.processed_audio_path = processed_audio_path
+
+    def _splice_audio(self):
+        # 压缩域处理：不解码、不重新编码；完成时返回 True，不支持时返回 False 由调用方改走 PCM
+        deleted_frames_flat = [frame for _, frames in self.deleted_frames_info for frame in frames]
+        processed_audio_path = self._temp_path(SPLICED_AUDIO_SUFFIX)
+        splicer = AudioSplicer(self.input_path)
+        try:
+            done = splicer.splice(
+                processed_audio_path, deleted_frames_flat, self.fps, self.frame_count,
+                lambda fraction: self._report_progress("audio", fraction, "音频处理"),
+                should_continue=lambda: self.is_running,
+                frame_ranges=self.frame_ranges if self.time_ranges else None
+            )
+        except AudioSpliceUnsupported as e:
+            self.logger.info(f"无法按数据包处理音频，改为解码处理: {str(e)}")
+            self.info_signal.emit(f"无法直接复制音频（{str(e)}），改为解码后重新编码")
+            return False
+        self.audio_splicer = splicer
+        if done:
+            self._finish_audio_stage(processed_audio_path)
+            self.info_signal.emit(
+                f"音频已按数据包处理，删除 {splicer.stats['dropped_packets']} 包，"
+                f"最大音画偏差 {splicer.stats['max_drift'] * 1000:.1f}ms")
+        return True
+
+    def _audio_is_encoded(self, audio_path):
+        return audio_path.endswith(SPLICED_AUDIO_SUFFIX)
+
+    def _render_audio(self, audio_path, output_path, deleted_frames, frame_ranges, progress_callback):
+        # 优先分块流式渲染，内存占用由资源设置中的分块大小决定；
+        # 不是标准 PCM WAV 时退回 pydub 整段载入
+        total_frames = frame_ranges[-1][1]
+        try:
+            return self.audio_processor.render_audio_file(
+                audio_path, output_path, deleted_frames, self.fps, total_frames, progress_callback,
+                should_continue=lambda: self.is_running,
+                chunk_bytes=self.resources.audio_chunk_bytes(DEFAULT_AUDIO_CHUNK_BYTES),
+                frame_ranges=frame_ranges
+            )
+        except wave.Error as e:
+            self.logger.info(f"无法流式读取音频，改为整段处理: {str(e)}")
+        processed_audio = self.audio_processor.process_audio(
+            audio_path, deleted_frames, self.fps, total_frames, progress_callback,
+            should_continue=lambda: self.is_running, frame_ranges=frame_ranges
+        )
+        if processed_audio is None:
+            return False
+        processed_audio.export(output_path, format="wav")
+        return True
+
+    def _extract_audio(self, audio_path):
+        backend = self._open_backend()
+        if backend.supports_audio:
+            # 与视频阶段共用同一个已打开的容器，在进程内解码
+            backend.extract_audio_wav(audio_path, should_continue=lambda: self.is_running)
+            return
+
+        ffmpeg_cmd = [
+            'ffmpeg', '-i', self.input_path,
+            '-vn', '-acodec', 'pcm_s16le',
+        ] + self.resources.ffmpeg_args() + [
+            '-y', '-loglevel', 'error',
+            audio_path
+        ]
+        self._run_extract_command(ffmpeg_cmd)
+
+    def _extract_audio_span(self, audio_path):
+        # 只提取第一个范围开始到最后一个范围结束之间的音频，输入端定位，不解码之前和之后的部分；
+        # 返回提取起点对应的帧序号
+        span_start = self.frame_ranges[0][0]
+        span_end = self.frame_ranges[-1][1]
+        ffmpeg_cmd = [
+            'ffmpeg', '-ss', f"{span_start / self.fps:.6f}", '-i', self.input_path,
+            '-t', f"{(span_end - span_start) / self.fps:.6f}",
+            '-vn', '-acodec', 'pcm_s16le',
+        ] + self.resources.ffmpeg_args() + [
+            '-y', '-loglevel', 'error',
+            audio_path
+        ]
+        self._run_extract_command(ffmpeg_cmd)
+        return span_start
+
+    def _run_extract_command(self, ffmpeg_cmd):
+        process = self._start_process(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            self._release_process(process)
+        if process.returncode != 0 and self.is_running:
+            raise Exception(f"提取音频失败: {stderr.decode(errors='ignore')}")
+
     def _merge_video_audio(self):
         if not self.is_running:
             return
         self.info_signal.emit("开始合成视频和音频...")
         try:
-            temp_video_path = self.output_path.rsplit('.', 1)[0] + '_temp_video.mp4'
-            processed_audio_path = self.output_path.rsplit('.', 1)[0] + '_temp_processed_audio.wav'
+            segment_list_path = self._write_segment_list()
+            processed_audio_path = self.processed_audio_path
+            video_input_args = ['-f', 'concat', '-safe', '0', '-i', segment_list_path]
 
-            # 获取原视频的比特率信息
-            total_bitrate = self.original_video_info.get('total_bitrate', '5000k')
-            audio_bitrate = self.original_video_info.get('audio_info', {}).get('audio_bitrate', '192k')
-            
-            # 计算视频比特率
-            video_bitrate = int(total_bitrate.replace('k', '')) - int(audio_bitrate.replace('k', ''))
-            video_bitrate = f"{video_bitrate}k"
-
-            # 使用 FFmpeg 合并视频和音频，并设置比特率
-            ffmpeg_cmd = [
-                'ffmpeg',
-                '-i', temp_video_path,
-                '-i', processed_audio_path,
-                '-c:v', 'libx264',
-                '-preset', 'medium',
-                '-b:v', video_bitrate,
-                '-maxrate', video_bitrate,
-                '-bufsize', f"{int(video_bitrate.replace('k', ''))*2}k",
-                '-c:a', 'aac',
+            if self.renditions:
+                ffmpeg_cmd = self._build_ladder_merge_command(video_input_args, processed_audio_path)
+            else:
+                ffmpeg_cmd = self._build_merge_command(video_input_args, processed_audio_path, self.output_path)
+            duration = self._output_duration()
+
+            def merge_progress(current_time):
+                if duration > 0:
+                    self._report_progress("merge", current_time / duration, "视频音频合成")
+
+            self._run_ffmpeg_with_progress(ffmpeg_cmd, self.output_path, merge_progress)
+            if not self.is_running:
+                return
+
+            self.info_signal.emit("视频和音频合成完成")
+            self.progress.emit(100, "处理完成")
+            # 任务已完整完成，删除检查点并写入输出缓存
+            self.manifest.discard()
+            self._store_in_cache()
+        except Exception as e:
+            if not self.is_running:
+                return
+            self.merge_error = str(e)
+            self.logger.error(f"合成视频和音频时出错: {str(e)}", exc_info=True)
+            self.info_signal.emit(f"合成视频和音频时出错: {str(e)}")
+            self.progress.emit(100, "处理出错")
+
+    def _output_duration(self):
+        # 合成进度的参考时长：只处理部分范围时为这些范围的总时长
+        if self.time_ranges:
+            return self.range_frame_count / self.fps
+        return self.original_video_info.get('时长') or 0
+
+    def _build_merge_command(self, video_input_args, audio_path, output_path):
+        # 根据原视频的比特率信息确定编码参数
+        profile = self._encoding_profile()
+        audio_bitrate = profile['audio_bitrate']
+        has_audio = audio_path is not None and os.path.exists(audio_path)
+
+        # 使用 FFmpeg 合并视频和音频，并设置比特率
+        ffmpeg_cmd = ['ffmpeg'] + video_input_args
+        if has_audio:
+            ffmpeg_cmd += ['-i', audio_path]
+        if profile['pixel_mode'] == PIXEL_MODE_NATIVE:
+            # 分段已按最终参数编码，视频流直接复制
+            ffmpeg_cmd += ['-c:v', 'copy']
+        else:
+            ffmpeg_cmd += video_encode_args(profile)
+        if has_audio and self._audio_is_encoded(audio_path):
+            ffmpeg_cmd += ['-c:a', 'copy']
+        elif has_audio:
+            ffmpeg_cmd += [
+                '-c:a', profile['audio_codec'],
                 '-b:a', audio_bitrate,
                 '-strict', 'experimental',
-                '-y',
-                '-loglevel', 'error',
-                self.output_path
             ]
+        else:
+            ffmpeg_cmd += ['-an']
+        ffmpeg_cmd += self.resources.ffmpeg_args()
+        ffmpeg_cmd += [
+            '-y',
+            '-loglevel', 'error',
+            '-progress', 'pipe:1',
+            '-nostats',
+            output_path
+        ]
+        return ffmpeg_cmd
 
-            # 使用 CREATE_NO_WINDOW 标志来隐藏控制台窗口
-            process = subprocess.Popen(
-                ffmpeg_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+    def _encode_audio_once(self, audio_path):
+        # 多档输出共用一次 AAC 编码，各输出直接复制音频流
+        encoded_path = self._temp_path('_temp_audio.m4a')
+        profile = self._encoding_profile()
+        self._run_ffmpeg_command([
+            'ffmpeg', '-i', audio_path, '-vn',
+            '-c:a', profile['audio_codec'], '-b:a', profile['audio_bitrate'],
+        ] + self.resources.ffmpeg_args() + ['-y', '-loglevel', 'error', encoded_path])
+        return encoded_path
+
+    def _build_ladder_merge_command(self, video_input_args, audio_path):
+        audio_input_args, audio_stream = [], None
+        if audio_path is not None and os.path.exists(audio_path):
+            if not self._audio_is_encoded(audio_path):
+                audio_path = self._encode_audio_once(audio_path)
+            audio_input_args = ['-i', audio_path]
+            audio_stream = '1:a:0'
+        for path in [self.output_path] + [rendition["output_path"] for rendition in self.renditions]:
+            if os.path.exists(path):
+                os.remove(path)
+        return build_ladder_command(
+            video_input_args, audio_input_args, audio_stream, self.renditions, self._encoding_profile(),
+            main_output=self.output_path, copy_main_video=self.pixel_mode == PIXEL_MODE_NATIVE,
+            thread_args=self.resources.ffmpeg_args()
+        )
 
-            # 读取 FFmpeg 的输出并更新进度
-            for line in process.stderr:
-                if "time=" in line and "bitrate=" in line:
+    def _render_renditions_from_output(self):
+        # 命中输出缓存时只缺各档输出：解码一次已有的输出，音频流直接复制
+        self.info_signal.emit(f"正在生成 {len(self.renditions)} 档分辨率输出...")
+        has_audio = bool(self.audio_info.get("has_audio"))
+        ffmpeg_cmd = build_ladder_command(
+            ['-i', self.output_path], [], '0:a:0?' if has_audio else None, self.renditions,
+            self._encoding_profile(), thread_args=self.resources.ffmpeg_args()
+        )
+        duration = self._output_duration()
+
+        def merge_progress(current_time):
+            if duration > 0:
+                self._report_progress("merge", current_time / duration, "多分辨率输出")
+
+        self._run_ffmpeg_with_progress(ffmpeg_cmd, self.renditions[0]["output_path"], merge_progress)
+
+    def _rendition_report(self):
+        report = []
+        for rendition in self.renditions:
+            path = rendition["output_path"]
+            report.append({
+                "path": path,
+                "height": rendition["height"],
+                "video_bitrate": rendition["video_bitrate"],
+                "profile": rendition.get("profile"),
+                "size": os.path.getsize(path) if os.path.exists(path) else None,
+            })
+        return report
+
+    def _run_ffmpeg_with_progress(self, ffmpeg_cmd, output_path, time_callback=None):
+        # 先删除旧输出，避免原地覆盖与输出缓存共享硬链接的文件
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+        process = self._start_process(
+            ffmpeg_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+
+        try:
+            # 读取 FFmpeg 的进度输出并更新进度
+            for line in process.stdout:
+                if line.startswith("out_time_us=") and time_callback is not None:
                     try:
-                        time_str = line.split("time=")[1].split()[0]
-                        current_time = sum(float(x) * 60 ** i for i, x in enumerate(reversed(time_str.split(":"))))
-                        progress = int((current_time / self.original_video_info['时长']) * 100)
-                        self.progress.emit(progress, "视频音频合成")
-                        self.info_signal.emit(f"合成进度: {progress}%")
-                    except:
+                        time_callback(int(line.split("=", 1)[1]) / 1000000)
+                    except ValueError:
                         pass
 
             stdout, stderr = process.communicate()
+        finally:
+            self._release_process(process)
 
-            if process.returncode != 0:
-                error_message = f"FFmpeg 合并失败。错误信息：\n{stderr}"
-                raise Exception(error_message)
+        if process.returncode != 0 and self.is_running:
+            error_message = f"FFmpeg 执行失败。错误信息：\n{stderr}"
+            raise Exception(error_message)
 
-            self.info_signal.emit("视频和音频合成完成")
-            self.progress.emit(100, "处理完成")
-            
-            final_video_info = self.get_final_video_info(self.output_path)
-            self.finished.emit("处理完成。", self.deleted_frames_info, final_video_info)
-        except Exception as e:
-            self.logger.error(f"合成视频和音频时出错: {str(e)}", exc_info=True)
-            self.info_signal.emit(f"合成视频和音频时出错: {str(e)}")
-            self.progress.emit(100, "处理出错")
+    def _write_segment_list(self):
+        # 生成 ffmpeg concat 分段列表，按顺序拼接所有已完成的分段
+        segment_list_path = self._temp_path('_temp_segments.txt')
+        with open(segment_list_path, 'w', encoding='utf-8') as f:
+            for path in self.manifest.segment_paths():
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        return segment_list_path
 
     def stop(self):
+        # 协作式取消：置位标志后终止所有 ffmpeg 子进程树，run() 会在下一次检查时返回
+        # run() 返回后由调用方执行 cleanup() 删除不完整的输出
         self.is_running = False
-        self.wait()
-        self.cleanup()
+        if self.motion_analyzer is not None:
+            self.motion_analyzer.cancel()
+        with self._process_lock:
+            processes = list(self._active_processes)
+        for process in processes:
+            kill_process_tree(process)
 
     def get_final_video_info(self, video_path):
         if not os.path.exists(video_path):
@@ -270,26 +999,38 @@ class VideoProcessor(QThread):
             }
 
     def cleanup(self):
-        self.logger.info("开始清理 VideoProcessor 资源")
+        self.logger.info("开始清理处理任务资源")
         if hasattr(self, 'video_clip'):
             self.video_clip.close()
         if hasattr(self, 'audio_clip'):
             self.audio_clip.close()
-        self.logger.info("VideoProcessor 资源清理完成")
+        self.cleanup_temp_files(remove_output=not self.is_running)
+        self.logger.info("处理任务资源清理完成")
 
-    def _run_ffmpeg_command(self, command):
-        # 使用subprocess.STARTUPINFO来隐藏ffmpeg窗口
-        startupinfo = subprocess.STARTUPINFO()
-        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        startupinfo.wShowWindow = subprocess.SW_HIDE
+    def cleanup_temp_files(self, remove_output=False):
+        paths = set(self._temp_files)
+        if remove_output:
+            # 取消时输出文件是不完整的，一并删除
+            paths.add(self.output_path)
+            paths.update(rendition["output_path"] for rendition in self.renditions)
+        for path in paths:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    self.logger.warning(f"删除临时文件失败 {path}: {str(e)}")
+        self._temp_files.clear()
 
-        process = subprocess.Popen(
+    def _run_ffmpeg_command(self, command):
+        process = self._start_process(
             command,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            startupinfo=startupinfo
+            stderr=subprocess.PIPE
         )
-        stdout, stderr = process.communicate()
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            self._release_process(process)
 
-        if process.returncode != 0:
+        if process.returncode != 0 and self.is_running:
             raise Exception(f"FFmpeg命令执行失败: {stderr.decode()}")
@@ -0,0 +1,147 @@
+import os
+import time
+import json
+import hashlib
+import logging
+
+from processors.video_processor import VideoProcessingJob, PIXEL_MODE_NATIVE
+from processors.keyframe_index import read_keyframe_times
+from processors.deletion_planner import deleted_frame_set, keyframe_segment_ranges
+from service.task_queue import (TaskQueue, TASK_DONE, TASK_FAILED, DEFAULT_LEASE_SECONDS,
+                                DEFAULT_MAX_ATTEMPTS)
+
+# 分布式模式下每个分段的目标秒数，分段越短越容易在节点间均衡
+DEFAULT_DISTRIBUTED_SEGMENT_SECONDS = 20
+
+# 协调节点检查任务状态和回收租约的间隔（秒）
+COORDINATOR_POLL_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class DistributedJob(VideoProcessingJob):
+    # 协调节点：生成删除计划和关键帧分段表，把分段发布到共享队列，由任意数量的工作节点渲染
+    # 分段直接按最终编码参数输出，全部完成后沿用原有的音频处理和合成流程
+    # 输入和输出目录需要位于所有节点都能以相同路径访问的共享文件系统上
+    def __init__(self, *args, queue_path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, **kwargs):
+        kwargs.setdefault('segment_seconds', DEFAULT_DISTRIBUTED_SEGMENT_SECONDS)
+        # 分段在工作节点上由 ffmpeg 直接编码，合成时视频流直接复制
+        kwargs['pixel_mode'] = PIXEL_MODE_NATIVE
+        super().__init__(*args, **kwargs)
+        self.task_queue = TaskQueue(queue_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.job_id = None
+
+    def _plan_params(self):
+        params = super()._plan_params()
+        params["distributed"] = True
+        return params
+
+    def _should_record_throughput(self):
+        # 渲染速度取决于工作节点数量，不代表本机吞吐量
+        return False
+
+    def _make_job_id(self):
+        key = json.dumps([os.path.abspath(self.output_path), self.seed, self._plan_params()], sort_keys=True)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+    def _keyframe_frames(self):
+        backend = self._open_backend()
+        try:
+            times = read_keyframe_times(self.input_path, backend)
+        except Exception as e:
+            self.logger.warning(f"读取关键帧失败，按固定长度分段: {str(e)}")
+            return []
+        return [int(round(t * self.fps)) for t in times]
+
+    def _segment_map(self):
+        # 分段表保存在任务清单中，协调节点重启后分段划分保持不变
+        segment_map = self.manifest.segment_map
+        if segment_map is None:
+            target_frames = max(1, int(self.segment_seconds * self.fps))
+            keyframes = self._keyframe_frames()
+            # 每个处理范围单独按关键帧分段，范围之外的帧不分配给工作节点
+            segment_map = [
+                (start + range_start, end + range_start)
+                for range_start, range_end in self.frame_ranges
+                for start, end in keyframe_segment_ranges(
+                    [frame - range_start for frame in keyframes if range_start < frame < range_end],
+                    range_end - range_start, target_frames)
+            ]
+            self.manifest.set_segment_map(segment_map)
+        return segment_map
+
+    def _process_video(self):
+        self.job_id = self._make_job_id()
+        segment_map = self._segment_map()
+        deleted = deleted_frame_set(self.deleted_frames_info)
+        stream_info = self.original_video_info.get('video_stream_info', {})
+        profile = self._encoding_profile()
+
+        tasks = []
+        pending = {}
+        segment_keys = {}
+        for index, (start, end) in enumerate(segment_map):
+            if self.manifest.is_segment_done(index):
+                continue
+            local_deleted = sorted(frame - start for frame in deleted if start <= frame < end)
+            segment_path = self.output_path.rsplit('.', 1)[0] + f'_seg{index:05d}.mp4'
+            if (end - start) == len(local_deleted):
+                self.manifest.mark_segment_done(index, segment_path, start, end, 0)
+                continue
+            segment_keys[index] = self._segment_key(start, end, deleted)
+            if self._reuse_segment(index, start, end, deleted, segment_keys[index], segment_path):
+                continue
+            tasks.append((index, {
+                "input_path": os.path.abspath(self.input_path),
+                "output_path": os.path.abspath(segment_path),
+                "start_frame": start,
+                "frame_limit": end - start,
+                "local_deleted": local_deleted,
+                "fps": self.fps,
+                "stream_info": stream_info,
+                "profile": profile,
+            }))
+            pending[index] = (start, end)
+
+        self.info_signal.emit(f"分布式任务 {self.job_id}: 共 {len(segment_map)} 个分段，待渲染 {len(pending)} 个，"
+                              f"复用 {self.reused_segments} 个")
+        self._check_unchanged_segments()
+        if pending:
+            self.task_queue.publish(self.job_id, tasks)
+        self._wait_for_segments(segment_map, pending, segment_keys)
+        self._report_progress("video", 1.0, "分布式渲染")
+
+    def _wait_for_segments(self, segment_map, pending, segment_keys):
+        total_frames = max(1, self.range_frame_count)
+        done_frames = sum(end - start for index, (start, end) in enumerate(segment_map) if index not in pending)
+        finished = False
+        try:
+            while pending and self.is_running:
+                self.task_queue.requeue_expired(self.job_id, self.max_attempts)
+                for task in self.task_queue.job_tasks(self.job_id):
+                    index = task["task_index"]
+                    if index not in pending:
+                        continue
+                    if task["status"] == TASK_FAILED:
+                        raise IOError(f"分段 {index} 多次渲染失败: {task['error']}")
+                    if task["status"] == TASK_DONE:
+                        start, end = pending.pop(index)
+                        result = task["result"]
+                        self.manifest.mark_segment_done(index, result["output_path"], start, end, result["frames"])
+                        self._remember_segment(segment_keys[index], result["output_path"], result["frames"])
+                        done_frames += end - start
+                        self.logger.info(f"分段 {index} 由 {result['worker']} 完成，用时 {result['elapsed']:.1f}秒")
+                self._report_progress("video", done_frames / total_frames, f"分布式渲染 ({len(segment_map) - len(pending)}/{len(segment_map)})")
+                if pending:
+                    time.sleep(COORDINATOR_POLL_INTERVAL)
+            finished = self.is_running
+        finally:
+            if not finished:
+                # 任务被取消、分段多次失败或协调进程出错时撤销其余分段，工作节点不再领取
+                self.task_queue.cancel_job(self.job_id)
+
+        if finished and self.job_id is not None:
+            # 所有分段已记录到任务清单，队列中的记录不再需要
+            self.task_queue.remove_job(self.job_id)
@@ -0,0 +1,69 @@
+import os
+import signal
+import asyncio
+import logging
+
+from service.scheduler import JobScheduler
+from service.hot_folder import FolderWatcher, DEFAULT_POLL_INTERVAL
+from service.http_api import JobApiServer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+logger = logging.getLogger(__name__)
+
+
+class IngestDaemon:
+    # 无界面的常驻服务：监视输入目录、调度处理任务，并提供本地 HTTP 任务接口
+    def __init__(self, watch_dir, done_dir, options, workers=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 poll_interval=DEFAULT_POLL_INTERVAL, work_dir=None, use_inotify=True):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.options = options
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.scheduler = JobScheduler(done_dir, work_dir=work_dir, max_workers=workers)
+        self.api_server = None
+        self.watcher = None
+        self._stop_event = None
+
+    def run(self):
+        try:
+            asyncio.run(self._main())
+        except KeyboardInterrupt:
+            logger.info("服务已中断")
+
+    def request_stop(self):
+        if self._stop_event is not None:
+            self.scheduler.loop.call_soon_threadsafe(self._stop_event.set)
+
+    def _on_new_file(self, path):
+        # 在监视线程中调用
+        if self.scheduler.registry.is_active(path):
+            return
+        self.scheduler.submit(path, self.options, source='watch')
+
+    async def _main(self):
+        os.makedirs(self.watch_dir, exist_ok=True)
+        self._stop_event = asyncio.Event()
+        await self.scheduler.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows 的事件循环不支持信号处理，Ctrl+C 以 KeyboardInterrupt 结束
+                pass
+
+        self.api_server = JobApiServer((self.host, self.port), self.scheduler, self.options)
+        self.api_server.start()
+        self.watcher = FolderWatcher(self.watch_dir, self._on_new_file, self.poll_interval, self.use_inotify)
+        self.watcher.start()
+        try:
+            await self._stop_event.wait()
+        finally:
+            logger.info("正在停止服务...")
+            self.watcher.stop()
+            self.api_server.stop()
+            await self.scheduler.shutdown()
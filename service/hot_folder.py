@@ -0,0 +1,101 @@
+import os
+import sys
+import logging
+import threading
+
+from utils.file_utils import is_valid_video_file, is_processed_output
+
+# inotify_simple 为可选依赖，仅在 Linux 上使用；不可用时退回定时扫描
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+    inotify_flags = None
+
+# 定时扫描时，文件大小连续两次不变才认为已经写入完成
+DEFAULT_POLL_INTERVAL = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+def is_candidate(path):
+    name = os.path.basename(path)
+    return not name.startswith('.') and is_valid_video_file(path) and not is_processed_output(path)
+
+
+class FolderWatcher(threading.Thread):
+    # 监视输入目录（不递归），新文件写入完成后调用 callback(path)
+    def __init__(self, folder, callback, poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True):
+        super().__init__(name="folder-watcher", daemon=True)
+        self.folder = os.path.abspath(folder)
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify and INotify is not None and sys.platform.startswith('linux')
+        self._stop_event = threading.Event()
+        self._reported = set()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _list_candidates(self):
+        try:
+            names = os.listdir(self.folder)
+        except OSError as e:
+            logger.warning(f"无法读取监视目录 {self.folder}: {str(e)}")
+            return []
+        return [os.path.join(self.folder, name) for name in sorted(names) if is_candidate(os.path.join(self.folder, name))]
+
+    def _report(self, path):
+        if path in self._reported:
+            return
+        self._reported.add(path)
+        try:
+            self.callback(path)
+        except Exception as e:
+            logger.error(f"提交文件 {path} 失败: {str(e)}")
+
+    def run(self):
+        logger.info(f"开始监视 {self.folder}（{'inotify' if self.use_inotify else '定时扫描'}）")
+        if self.use_inotify:
+            self._watch_inotify()
+        else:
+            self._watch_polling()
+
+    def _forget_missing(self):
+        # 已被移走的文件从记录中删除，同名文件再次放入时可以重新处理
+        self._reported = set(path for path in self._reported if os.path.exists(path))
+
+    def _watch_inotify(self):
+        inotify = INotify()
+        # 只关注写入完成和移入的文件，复制过程中的文件不会触发
+        inotify.add_watch(self.folder, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+        try:
+            # 启动前已存在的文件视为已写入完成
+            for path in self._list_candidates():
+                self._report(path)
+            while not self._stop_event.is_set():
+                events = inotify.read(timeout=int(self.poll_interval * 1000))
+                if events:
+                    self._forget_missing()
+                for event in events:
+                    path = os.path.join(self.folder, event.name)
+                    if event.name and is_candidate(path):
+                        self._report(path)
+        finally:
+            inotify.close()
+
+    def _watch_polling(self):
+        sizes = {}
+        while not self._stop_event.is_set():
+            self._forget_missing()
+            current = {}
+            for path in self._list_candidates():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                current[path] = (stat.st_size, stat.st_mtime)
+                if path not in self._reported and sizes.get(path) == current[path]:
+                    self._report(path)
+            sizes = current
+            self._stop_event.wait(self.poll_interval)
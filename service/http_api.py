@@ -0,0 +1,127 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from service.job_registry import FINAL_STATUSES
+from service.scheduler import normalize_options
+
+# 进度流在任务没有变化时多久发送一次心跳（秒）
+STREAM_HEARTBEAT = 15.0
+
+logger = logging.getLogger(__name__)
+
+
+class JobApiHandler(BaseHTTPRequestHandler):
+    # GET /jobs                 列出任务
+    # POST /jobs                提交任务 {"input_path": ..., "interval_range": ..., "delete_frames": ..., "seed": ...}
+    # GET /jobs/<id>            查询任务
+    # GET /jobs/<id>/events     以 JSON Lines 流式返回进度，任务结束后关闭连接
+    # DELETE /jobs/<id>         取消任务
+    server_version = "RandFrameDel/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path_parts(self):
+        return [part for part in self.path.split('?', 1)[0].split('/') if part]
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def do_GET(self):
+        parts = self._path_parts()
+        registry = self.server.scheduler.registry
+        if parts == ['jobs']:
+            self._send_json(200, {"jobs": registry.list()})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = registry.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": "任务不存在"})
+            else:
+                self._send_json(200, job)
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            self._stream_events(parts[1])
+        else:
+            self._send_json(404, {"error": "未知的接口"})
+
+    def do_POST(self):
+        if self._path_parts() != ['jobs']:
+            self._send_json(404, {"error": "未知的接口"})
+            return
+        try:
+            data = self._read_json()
+            # 接口提交的任务不能按模块路径加载帧变换插件，避免远程请求导入任意模块
+            options = normalize_options(data, self.server.default_options, allow_plugins=False)
+            job = self.server.scheduler.submit(data.get('input_path', ''), options, source='api')
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(201, job)
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._send_json(404, {"error": "未知的接口"})
+            return
+        job = self.server.scheduler.cancel(parts[1])
+        if job is None:
+            self._send_json(404, {"error": "任务不存在"})
+        else:
+            self._send_json(200, job)
+
+    def _stream_events(self, job_id):
+        registry = self.server.scheduler.registry
+        job = registry.get(job_id)
+        if job is None:
+            self._send_json(404, {"error": "任务不存在"})
+            return
+        # HTTP/1.0 下以关闭连接表示流结束，每行一个任务快照
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            while True:
+                self.wfile.write((json.dumps(job, ensure_ascii=False) + '\n').encode('utf-8'))
+                self.wfile.flush()
+                if job["status"] in FINAL_STATUSES or self.server.stopping.is_set():
+                    break
+                job = registry.wait_for_change(job_id, job["version"], STREAM_HEARTBEAT)
+                if job is None:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"进度流客户端已断开: {job_id}")
+
+
+class JobApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, scheduler, default_options):
+        super().__init__(address, JobApiHandler)
+        self.scheduler = scheduler
+        self.default_options = default_options
+        self.stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="job-api", daemon=True)
+        self._thread.start()
+        host, port = self.server_address[:2]
+        logger.info(f"任务接口已启动: http://{host}:{port}/jobs")
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
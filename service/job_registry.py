@@ -0,0 +1,94 @@
+import time
+import uuid
+import threading
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+FINAL_STATUSES = (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED)
+
+
+def new_job_id():
+    return uuid.uuid4().hex[:12]
+
+
+class JobRegistry:
+    # 所有任务的状态表，调度器、HTTP 接口线程共用；每次更新递增版本号并唤醒等待者
+    def __init__(self):
+        self._jobs = {}
+        self._order = []
+        self._version = 0
+        self._condition = threading.Condition()
+
+    def add(self, input_path, output_path, options, source='api', job_id=None):
+        # 同一输入文件已有排队或正在处理的任务时抛出 ValueError，避免两个任务争用同一份输出
+        job_id = job_id or new_job_id()
+        job = {
+            "id": job_id,
+            "input_path": input_path,
+            "output_path": output_path,
+            "options": options,
+            "source": source,
+            "status": STATUS_QUEUED,
+            "percent": 0,
+            "stage": "",
+            "eta": None,
+            # 最近一次资源采样（CPU、内存、IO、线程数）
+            "resources": None,
+            # 分析阶段得到的源视频信息（分辨率、帧率、时长等），分析完成前为 None
+            "video_info": None,
+            "message": "",
+            "report_path": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "version": 0,
+        }
+        with self._condition:
+            for other in self._jobs.values():
+                if other["input_path"] == input_path and other["status"] not in FINAL_STATUSES:
+                    raise ValueError(f"该文件已有未完成的任务 {other['id']}: {input_path}")
+            self._jobs[job_id] = job
+            self._order.append(job_id)
+            self._touch(job)
+        return dict(job)
+
+    def _touch(self, job):
+        self._version += 1
+        job["version"] = self._version
+        self._condition.notify_all()
+
+    def update(self, job_id, **fields):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            self._touch(job)
+            return dict(job)
+
+    def get(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self):
+        with self._condition:
+            return [dict(self._jobs[job_id]) for job_id in self._order]
+
+    def is_active(self, input_path):
+        with self._condition:
+            return any(job["input_path"] == input_path and job["status"] not in FINAL_STATUSES
+                       for job in self._jobs.values())
+
+    def wait_for_change(self, job_id, version, timeout):
+        # 等待任务版本号大于 version，返回最新的任务快照；超时返回当前快照
+        with self._condition:
+            self._condition.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id]["version"] > version, timeout)
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+import threading
+
+from processors.video_analyzer import VideoProbe
+from processors.video_processor import VideoProcessingJob, PIXEL_MODE_BGR8, PIXEL_MODE_NATIVE, build_audio_info
+from processors.ffmpeg_engine import is_high_bit_depth
+from processors.audio_splicer import AUDIO_MODE_PCM
+from service.coordinator import DistributedJob
+from utils.resource_governor import ResourceLimits
+
+# 工作进程每隔多久检查一次取消标志（秒）
+CANCEL_POLL_INTERVAL = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+def run_job(spec, events=None, cancel_event=None):
+    # 在工作进程中分析并处理一个文件，返回可序列化的结果字典
+    # spec: {"job_id", "input_path", "output_path", "options", 可选 "distributed"}；events 接收进度事件
+    job_id = spec["job_id"]
+    options = spec["options"]
+    started = time.time()
+
+    def publish(event_type, **fields):
+        if events is not None:
+            events.put(dict(fields, job_id=job_id, type=event_type))
+
+    result = {"status": "failed", "message": "", "deleted_frames_info": [], "final_video_info": {}}
+    probe = VideoProbe(spec["input_path"])
+    processor = None
+    done = threading.Event()
+
+    def watch_cancel():
+        # 取消标志来自调度进程，置位后终止分析或处理
+        while not done.wait(CANCEL_POLL_INTERVAL):
+            if cancel_event is not None and cancel_event.is_set():
+                probe.cancel()
+                if processor is not None:
+                    processor.stop()
+                return
+
+    watcher = threading.Thread(target=watch_cancel, daemon=True)
+    watcher.start()
+    try:
+        publish("stage", stage="分析视频")
+        video_info = probe.analyze()
+        if cancel_event is not None and cancel_event.is_set():
+            result["status"] = "cancelled"
+            return result
+        publish("analyzed", video_info=video_info)
+
+        pixel_mode = options.get("pixel_mode", PIXEL_MODE_BGR8)
+        if is_high_bit_depth(video_info.get('video_stream_info', {}).get('pix_fmt')):
+            pixel_mode = PIXEL_MODE_NATIVE
+        extra = {}
+        job_class = VideoProcessingJob
+        if spec.get("distributed"):
+            # 分布式模式：本进程作为协调节点，分段由共享队列上的工作节点渲染
+            job_class = DistributedJob
+            extra = dict(spec["distributed"])
+        processor = job_class(
+            spec["input_path"],
+            spec["output_path"],
+            options["interval_range"],
+            options["delete_frames"],
+            video_info['帧率'],
+            build_audio_info(video_info),
+            video_info['视频总帧数'],
+            video_info,
+            seed=options.get("seed"),
+            pixel_mode=pixel_mode,
+            resources=ResourceLimits.from_dict(options.get("resources")),
+            renditions=options.get("renditions"),
+            content_aware=options.get("content_aware", False),
+            audio_mode=options.get("audio_mode", AUDIO_MODE_PCM),
+            transforms=options.get("transforms"),
+            time_ranges=options.get("time_ranges"),
+            queue_depth=options.get("queue_depth"),
+            reuse_seed=options.get("reuse_seed", False),
+            **extra
+        )
+        last_percent = [-1]
+
+        def on_progress(percent, stage):
+            # 只在百分比变化时发送，避免进度事件淹没队列
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                publish("progress", percent=percent, stage=stage, eta=processor.job_progress.remaining_seconds())
+
+        def on_finished(message, deleted_frames_info, final_video_info):
+            result["message"] = message
+            result["deleted_frames_info"] = deleted_frames_info
+            result["final_video_info"] = final_video_info
+
+        processor.progress.connect(on_progress)
+        processor.info_signal.connect(lambda message: publish("info", message=message))
+        processor.resource_signal.connect(lambda sample: publish("resources", sample=sample))
+        processor.finished.connect(on_finished)
+        processor.run()
+
+        if not processor.is_running:
+            processor.cleanup()
+            result["status"] = "cancelled"
+        elif result["final_video_info"] and os.path.exists(spec["output_path"]):
+            result["status"] = "done"
+            result["seed"] = processor.seed
+        result["video_info"] = video_info
+        return result
+    except Exception as e:
+        if cancel_event is not None and cancel_event.is_set():
+            result["status"] = "cancelled"
+            return result
+        logger.error(f"处理任务 {job_id} 失败: {str(e)}", exc_info=True)
+        result["message"] = str(e)
+        return result
+    finally:
+        done.set()
+        result["processing_time"] = time.time() - started
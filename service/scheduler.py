@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from processors.deletion_planner import parse_interval_range
+from processors.video_processor import PIXEL_MODE_BGR8, PIXEL_MODE_NATIVE
+from processors.renditions import normalize_renditions
+from processors.audio_splicer import AUDIO_MODES, AUDIO_MODE_PCM
+from processors.frame_transforms import normalize_transforms
+from processors.time_ranges import normalize_time_ranges
+from service.job_registry import (JobRegistry, new_job_id, STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE,
+                                  STATUS_FAILED, STATUS_CANCELLED, FINAL_STATUSES)
+from service.job_runner import run_job
+from utils.file_utils import get_output_path, is_valid_video_file
+from utils.system_utils import recommended_worker_count
+from utils.resource_governor import ResourceLimits, MIN_QUEUE_DEPTH, MAX_QUEUE_DEPTH
+from utils.logging_setup import setup_worker_logging, forward_worker_logs, current_levels
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_options(data, defaults=None, allow_plugins=True):
+    # 合并默认参数并校验，参数无效时抛出 ValueError
+    # allow_plugins 为 False 时 data 中的帧变换只能使用已注册的名称；默认参数来自本地命令行，不受限制
+    options = dict(defaults or {})
+    options.update({key: data[key] for key in ('interval_range', 'delete_frames', 'seed', 'pixel_mode', 'resources',
+                                               'renditions', 'content_aware', 'audio_mode', 'transforms',
+                                               'time_ranges', 'queue_depth', 'reuse_seed')
+                    if key in data})
+    try:
+        start_sec, end_sec = parse_interval_range(str(options.get('interval_range', '')))
+    except ValueError:
+        raise ValueError("间隔范围格式应为 \"最小秒数-最大秒数\"")
+    if start_sec > end_sec or end_sec <= 0:
+        raise ValueError("间隔范围无效")
+    delete_frames = int(options.get('delete_frames') or 0)
+    if not 1 <= delete_frames <= 30:
+        raise ValueError("删除帧数必须在 1-30 之间")
+    seed = options.get('seed')
+    if seed is not None and (not str(seed).isdigit()):
+        raise ValueError("随机种子必须是非负整数")
+    pixel_mode = options.get('pixel_mode') or PIXEL_MODE_BGR8
+    if pixel_mode not in (PIXEL_MODE_BGR8, PIXEL_MODE_NATIVE):
+        raise ValueError(f"未知的像素处理模式: {pixel_mode}")
+    audio_mode = options.get('audio_mode') or AUDIO_MODE_PCM
+    if audio_mode not in AUDIO_MODES:
+        raise ValueError(f"未知的音频处理模式: {audio_mode}")
+    queue_depth = options.get('queue_depth')
+    if queue_depth is not None and (not isinstance(queue_depth, int) or
+                                    not MIN_QUEUE_DEPTH <= queue_depth <= MAX_QUEUE_DEPTH):
+        raise ValueError(f"帧队列长度必须是 {MIN_QUEUE_DEPTH}-{MAX_QUEUE_DEPTH} 之间的整数")
+    resources = dict(options.get('resources') or {})
+    for key in ('max_threads', 'nice', 'memory_budget_mb'):
+        value = resources.get(key)
+        if value is not None and not isinstance(value, int):
+            raise ValueError(f"资源设置 {key} 必须是整数")
+    if (resources.get('max_threads') or 1) < 1 or (resources.get('memory_budget_mb') or 1) < 1:
+        raise ValueError("线程上限和内存预算必须大于 0")
+    return {
+        'interval_range': f"{start_sec}-{end_sec}",
+        'delete_frames': delete_frames,
+        'seed': int(seed) if seed is not None else None,
+        'pixel_mode': pixel_mode,
+        'resources': ResourceLimits.from_dict(resources).to_dict(),
+        'renditions': normalize_renditions(options.get('renditions')),
+        'content_aware': bool(options.get('content_aware')),
+        'audio_mode': audio_mode,
+        'transforms': normalize_transforms(options.get('transforms'), allow_plugins or 'transforms' not in data),
+        'time_ranges': normalize_time_ranges(options.get('time_ranges')),
+        'queue_depth': queue_depth,
+        'reuse_seed': bool(options.get('reuse_seed')),
+    }
+
+
+class JobScheduler:
+    # asyncio 协程从队列取任务，交给进程池执行；并发数等于进程池大小
+    # 工作进程通过 Manager 队列回传进度，由单独的线程写入任务状态表
+    def __init__(self, done_dir, work_dir=None, max_workers=None, registry=None):
+        self.done_dir = os.path.abspath(done_dir)
+        self.work_dir = os.path.abspath(work_dir or os.path.join(self.done_dir, '.work'))
+        self.max_workers = max_workers or recommended_worker_count()
+        self.registry = registry or JobRegistry()
+        self.loop = None
+        self._queue = None
+        self._executor = None
+        self._executor_args = None
+        self._manager = None
+        self._events = None
+        self._event_thread = None
+        self._log_listener = None
+        self._workers = []
+        self._cancel_events = {}
+
+    async def start(self):
+        os.makedirs(self.done_dir, exist_ok=True)
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        # spawn 在各平台上行为一致，也避免在已有线程的进程中 fork
+        context = multiprocessing.get_context('spawn')
+        self._manager = context.Manager()
+        self._events = self._manager.Queue()
+        # 工作进程的日志经队列回到主进程，由主进程的日志线程统一写入
+        log_queue = self._manager.Queue()
+        self._log_listener = forward_worker_logs(log_queue)
+        self._executor_args = dict(max_workers=self.max_workers, mp_context=context,
+                                   initializer=setup_worker_logging, initargs=(log_queue, *current_levels()))
+        self._executor = ProcessPoolExecutor(**self._executor_args)
+        self._event_thread = threading.Thread(target=self._pump_events, name="job-events", daemon=True)
+        self._event_thread.start()
+        self._workers = [self.loop.create_task(self._worker()) for _ in range(self.max_workers)]
+        logger.info(f"任务调度器已启动，并发任务数 {self.max_workers}")
+
+    async def shutdown(self):
+        for job in self.registry.list():
+            if job["status"] not in FINAL_STATUSES:
+                self.cancel(job["id"])
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self.loop.run_in_executor(None, self._executor.shutdown, True)
+        self._events.put(None)
+        self._event_thread.join()
+        self._log_listener.stop()
+        self._manager.shutdown()
+        logger.info("任务调度器已停止")
+
+    def submit(self, input_path, options, source='api'):
+        # 可在任意线程调用，返回任务快照
+        input_path = os.path.abspath(input_path)
+        if not options.get('resources', {}).get('max_threads'):
+            # 未指定线程上限时，按并发任务数平分 CPU，避免多个任务互相争抢
+            resources = dict(options.get('resources') or {})
+            resources['max_threads'] = ResourceLimits.for_concurrent_jobs(self.max_workers).max_threads
+            options = dict(options, resources=resources)
+        if not is_valid_video_file(input_path):
+            raise ValueError(f"不是有效的视频文件: {input_path}")
+        # 每个任务使用单独的工作目录，同名输入的任务不会互相覆盖临时文件、分段和任务清单
+        job_id = new_job_id()
+        job_dir = os.path.join(self.work_dir, job_id)
+        output_path = os.path.join(job_dir, os.path.basename(get_output_path(input_path)))
+        job = self.registry.add(input_path, output_path, options, source, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, job["id"])
+        logger.info(f"任务 {job['id']} 已加入队列: {input_path}")
+        return job
+
+    def cancel(self, job_id):
+        job = self.registry.get(job_id)
+        if job is None or job["status"] in FINAL_STATUSES:
+            return job
+        if job["status"] == STATUS_QUEUED:
+            return self.registry.update(job_id, status=STATUS_CANCELLED, finished=time.time())
+        cancel_event = self._cancel_events.get(job_id)
+        if cancel_event is not None:
+            cancel_event.set()
+        return self.registry.get(job_id)
+
+    def _pump_events(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            job_id = event.pop("job_id")
+            event_type = event.pop("type")
+            if event_type == "progress":
+                self.registry.update(job_id, percent=event["percent"], stage=event["stage"], eta=event["eta"])
+            elif event_type == "stage":
+                self.registry.update(job_id, stage=event["stage"])
+            elif event_type == "info":
+                self.registry.update(job_id, message=event["message"])
+            elif event_type == "resources":
+                self.registry.update(job_id, resources=event["sample"])
+            elif event_type == "analyzed":
+                self.registry.update(job_id, video_info=event["video_info"])
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.registry.get(job_id)
+            if job is None or job["status"] != STATUS_QUEUED:
+                continue
+            cancel_event = self._manager.Event()
+            self._cancel_events[job_id] = cancel_event
+            self.registry.update(job_id, status=STATUS_RUNNING, started=time.time())
+            spec = {
+                "job_id": job_id,
+                "input_path": job["input_path"],
+                "output_path": job["output_path"],
+                "options": job["options"],
+            }
+            executor = self._executor
+            try:
+                result = await self.loop.run_in_executor(executor, run_job, spec, self._events, cancel_event)
+            except Exception as e:
+                logger.error(f"任务 {job_id} 的工作进程异常退出: {str(e)}", exc_info=True)
+                result = {"status": STATUS_FAILED, "message": str(e)}
+                if isinstance(e, BrokenProcessPool):
+                    self._replace_executor(executor)
+            finally:
+                self._cancel_events.pop(job_id, None)
+            try:
+                await self.loop.run_in_executor(None, self._finalize, job, result)
+            except Exception as e:
+                # 收尾失败也要结束任务，协程继续处理后续任务
+                logger.error(f"任务 {job_id} 收尾失败: {str(e)}", exc_info=True)
+                self.registry.update(job_id, status=STATUS_FAILED, message=f"任务收尾失败: {str(e)}",
+                                     eta=None, finished=time.time())
+
+    def _replace_executor(self, broken):
+        # 某个工作进程崩溃后整个进程池都不可用，重建后后续任务才能继续执行；多个协程同时发现时只重建一次
+        if self._executor is not broken:
+            return
+        logger.warning("任务进程池已损坏，重新创建")
+        broken.shutdown(wait=False)
+        self._executor = ProcessPoolExecutor(**self._executor_args)
+
+    def _done_path(self, job, path):
+        # 完成目录中已有同名文件（其他目录下的同名输入）时在文件名中加上任务编号
+        target = os.path.join(self.done_dir, os.path.basename(path))
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(os.path.basename(path))
+            target = os.path.join(self.done_dir, f"{stem}_{job['id']}{ext}")
+        return target
+
+    def _finalize(self, job, result):
+        # 把输出和报告移动到完成目录；监视目录中的源文件也移走，避免被再次处理
+        status = result.get("status", STATUS_FAILED)
+        base = os.path.splitext(os.path.basename(job["input_path"]))[0]
+        final_output = None
+        try:
+            if status == STATUS_DONE:
+                final_output = self._done_path(job, job["output_path"])
+                shutil.move(job["output_path"], final_output)
+                for rendition in (result.get("final_video_info") or {}).get("renditions", []):
+                    target = self._done_path(job, rendition["path"])
+                    shutil.move(rendition["path"], target)
+                    rendition["path"] = target
+            if job["source"] == 'watch' and status != STATUS_CANCELLED:
+                target_dir = os.path.join(self.done_dir, 'sources' if status == STATUS_DONE else 'failed')
+                os.makedirs(target_dir, exist_ok=True)
+                shutil.move(job["input_path"], os.path.join(target_dir, os.path.basename(job["input_path"])))
+        except OSError as e:
+            logger.error(f"移动任务 {job['id']} 的文件失败: {str(e)}")
+            status = STATUS_FAILED
+            result["message"] = f"移动文件失败: {str(e)}"
+        # 输出已移走，任务的工作目录中只剩临时文件，任务编号不会再被使用
+        shutil.rmtree(os.path.dirname(job["output_path"]), ignore_errors=True)
+
+        # 资源时间线单独放在报告顶层，不混在输出文件信息里
+        final_video_info = dict(result.get("final_video_info") or {})
+        resource_summary = final_video_info.pop("resource_summary", None)
+        resource_timeline = final_video_info.pop("resource_timeline", [])
+        report = {
+            "job_id": job["id"],
+            "status": status,
+            "input_path": job["input_path"],
+            "output_path": final_output,
+            "options": job["options"],
+            "seed": result.get("seed"),
+            "message": result.get("message", ""),
+            "processing_time": result.get("processing_time"),
+            "deleted_frames_info": result.get("deleted_frames_info", []),
+            "video_info": result.get("video_info", {}),
+            "final_video_info": final_video_info,
+            "resource_summary": resource_summary,
+            "resource_timeline": resource_timeline,
+        }
+        report_path = None
+        if status != STATUS_CANCELLED:
+            report_path = os.path.join(self.done_dir, f"{base}_{job['id']}_report.json")
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        self.registry.update(
+            job["id"],
+            status=status,
+            percent=100 if status == STATUS_DONE else self.registry.get(job["id"])["percent"],
+            output_path=final_output or job["output_path"],
+            report_path=report_path,
+            message=report["message"],
+            eta=0 if status == STATUS_DONE else None,
+            finished=time.time()
+        )
+        logger.info(f"任务 {job['id']} 结束: {status}")
@@ -0,0 +1,118 @@
+import os
+import time
+import socket
+import logging
+import threading
+import subprocess
+
+from processors.ffmpeg_engine import build_native_segment_command
+from service.task_queue import TaskQueue, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+from utils.process_utils import popen_hidden, kill_process_tree
+from utils.resource_governor import ResourceLimits
+
+# 没有可领取的任务时的等待间隔（秒）
+DEFAULT_POLL_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class SegmentWorker:
+    # 工作节点：从共享队列领取分段任务，用 ffmpeg 渲染到共享目录
+    # 渲染期间定期续约，租约丢失（被协调节点回收）时立即放弃该分段
+    def __init__(self, queue_path, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 poll_interval=DEFAULT_POLL_INTERVAL, idle_exit=None, max_attempts=DEFAULT_MAX_ATTEMPTS, resources=None):
+        self.task_queue = TaskQueue(queue_path)
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        # 连续空闲超过该秒数后退出，None 表示一直运行
+        self.idle_exit = idle_exit
+        self.max_attempts = max_attempts
+        # 工作节点按本机的资源设置渲染，与协调节点无关
+        self.resources = resources or ResourceLimits()
+        self.is_running = True
+        self.completed = 0
+
+    def stop(self):
+        self.is_running = False
+
+    def run(self):
+        logger.info(f"工作节点 {self.worker_id} 已启动")
+        idle_since = time.time()
+        while self.is_running:
+            task = self.task_queue.claim(self.worker_id, self.lease_seconds)
+            if task is None:
+                if self.idle_exit is not None and time.time() - idle_since >= self.idle_exit:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.process_task(task)
+            idle_since = time.time()
+        logger.info(f"工作节点 {self.worker_id} 退出，共完成 {self.completed} 个分段")
+        return self.completed
+
+    def process_task(self, task):
+        payload = task["payload"]
+        output_path = payload["output_path"]
+        # 先写入本节点独有的临时文件，完成后原子替换，避免两个节点同时写同一个分段
+        base, ext = os.path.splitext(output_path)
+        part_path = f"{base}.{self.worker_id}.part{ext}"
+        logger.info(f"领取分段 {task['job_id']}#{task['task_index']}（第 {task['attempts']} 次尝试）")
+        started = time.time()
+        try:
+            lease_lost = self._render(task, part_path)
+            if lease_lost:
+                logger.warning(f"分段 {task['job_id']}#{task['task_index']} 的租约已失效，放弃处理")
+                return
+            os.replace(part_path, output_path)
+            result = {
+                "output_path": output_path,
+                "frames": payload["frame_limit"] - len(payload["local_deleted"]),
+                "worker": self.worker_id,
+                "elapsed": time.time() - started,
+            }
+            if self.task_queue.complete(task["id"], self.worker_id, result):
+                self.completed += 1
+        except Exception as e:
+            logger.error(f"分段 {task['job_id']}#{task['task_index']} 处理失败: {str(e)}")
+            self.task_queue.fail(task["id"], self.worker_id, str(e), self.max_attempts)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def _render(self, task, part_path):
+        # 返回 True 表示租约丢失、渲染被中止
+        payload = task["payload"]
+        command = build_native_segment_command(
+            payload["input_path"], part_path, payload["start_frame"], payload["frame_limit"],
+            payload["local_deleted"], payload["fps"], payload["stream_info"], payload["profile"],
+            self.resources.ffmpeg_args()
+        )
+        process = popen_hidden(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self.resources.apply_to_pid(process.pid)
+        lease_lost = threading.Event()
+        finished = threading.Event()
+
+        def keep_alive():
+            while not finished.wait(self.lease_seconds / 3):
+                if not self.task_queue.heartbeat(task["id"], self.worker_id, self.lease_seconds):
+                    lease_lost.set()
+                    kill_process_tree(process)
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            _, stderr = process.communicate()
+        finally:
+            finished.set()
+            heartbeat.join()
+        if lease_lost.is_set():
+            return True
+        if process.returncode != 0:
+            raise IOError(f"ffmpeg 渲染分段失败: {stderr.decode(errors='ignore')}")
+        return False
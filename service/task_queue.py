@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+
+# 分段任务状态
+TASK_PENDING = 'pending'
+TASK_LEASED = 'leased'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+TASK_CANCELLED = 'cancelled'
+
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    task_index INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (job_id, task_index)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+'''
+
+
+class TaskQueue:
+    # 基于 SQLite 的分段任务队列：工作节点以租约方式领取任务，协调节点回收过期的租约
+    # 每次调用使用独立的连接，可以在多个线程和进程中同时使用
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self):
+        # isolation_level=None 时由 BEGIN IMMEDIATE 显式加写锁，领取任务不会被重复分配
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _transaction(self, func):
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(connection)
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            return result
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _task_dict(row):
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["result"] = json.loads(task["result"]) if task["result"] else None
+        return task
+
+    def publish(self, job_id, tasks):
+        # tasks: [(task_index, payload)]；已发布的任务保持原状，协调节点重启后可以继续
+        now = time.time()
+
+        def insert(connection):
+            connection.executemany(
+                'INSERT OR IGNORE INTO tasks (job_id, task_index, payload, status, updated) VALUES (?, ?, ?, ?, ?)',
+                [(job_id, index, json.dumps(payload, ensure_ascii=False), TASK_PENDING, now) for index, payload in tasks]
+            )
+            # 上次被取消或失败的任务重新排队，重试次数清零
+            connection.execute(
+                'UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, attempts = 0, updated = ? '
+                'WHERE job_id = ? AND status IN (?, ?)',
+                (TASK_PENDING, now, job_id, TASK_CANCELLED, TASK_FAILED)
+            )
+
+        self._transaction(insert)
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        now = time.time()
+
+        def take(connection):
+            row = connection.execute(
+                'SELECT * FROM tasks WHERE status = ? ORDER BY id LIMIT 1', (TASK_PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                'UPDATE tasks SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated = ? WHERE id = ?',
+                (TASK_LEASED, worker_id, now + lease_seconds, now, row["id"])
+            )
+            return self._task_dict(connection.execute('SELECT * FROM tasks WHERE id = ?', (row["id"],)).fetchone())
+
+        return self._transaction(take)
+
+    def heartbeat(self, task_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        # 延长租约；租约已被回收或任务已取消时返回 False，工作节点应放弃该任务
+        def extend(connection):
+            cursor = connection.execute(
+                'UPDATE tasks SET lease_expires = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?',
+                (time.time() + lease_seconds, time.time(), task_id, worker_id, TASK_LEASED)
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(extend)
+
+    def complete(self, task_id, worker_id, result):
+        def finish(connection):
+            cursor = connection.execute(
+                'UPDATE tasks SET status = ?, result = ?, lease_expires = NULL, updated = ? '
+                'WHERE id = ? AND worker = ? AND status = ?',
+                (TASK_DONE, json.dumps(result, ensure_ascii=False), time.time(), task_id, worker_id, TASK_LEASED)
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(finish)
+
+    def fail(self, task_id, worker_id, error, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        # 未超过重试次数的任务重新排队，否则标记为失败
+        def mark(connection):
+            row = connection.execute(
+                'SELECT attempts FROM tasks WHERE id = ? AND worker = ? AND status = ?', (task_id, worker_id, TASK_LEASED)
+            ).fetchone()
+            if row is None:
+                return False
+            status = TASK_PENDING if row["attempts"] < max_attempts else TASK_FAILED
+            connection.execute(
+                'UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, error = ?, updated = ? WHERE id = ?',
+                (status, error, time.time(), task_id)
+            )
+            return True
+
+        return self._transaction(mark)
+
+    def requeue_expired(self, job_id=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        # 回收过期的租约：工作节点崩溃或失联后，其任务重新分配给其他节点
+        now = time.time()
+
+        def requeue(connection):
+            query = 'SELECT id, attempts, worker FROM tasks WHERE status = ? AND lease_expires < ?'
+            args = [TASK_LEASED, now]
+            if job_id is not None:
+                query += ' AND job_id = ?'
+                args.append(job_id)
+            rows = connection.execute(query, args).fetchall()
+            for row in rows:
+                status = TASK_PENDING if row["attempts"] < max_attempts else TASK_FAILED
+                connection.execute(
+                    'UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, error = ?, updated = ? WHERE id = ?',
+                    (status, f"租约过期（工作节点 {row['worker']}）", now, row["id"])
+                )
+            return len(rows)
+
+        count = self._transaction(requeue)
+        if count:
+            logger.warning(f"回收了 {count} 个过期的任务租约")
+        return count
+
+    def cancel_job(self, job_id):
+        def cancel(connection):
+            connection.execute(
+                'UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, updated = ? '
+                'WHERE job_id = ? AND status IN (?, ?)',
+                (TASK_CANCELLED, time.time(), job_id, TASK_PENDING, TASK_LEASED)
+            )
+
+        self._transaction(cancel)
+
+    def job_tasks(self, job_id):
+        connection = self._connect()
+        try:
+            rows = connection.execute('SELECT * FROM tasks WHERE job_id = ? ORDER BY task_index', (job_id,)).fetchall()
+            return [self._task_dict(row) for row in rows]
+        finally:
+            connection.close()
+
+    def remove_job(self, job_id):
+        self._transaction(lambda connection: connection.execute('DELETE FROM tasks WHERE job_id = ?', (job_id,)))
@@ -0,0 +1,56 @@
+import os
+import time
+import tempfile
+import contextlib
+
+# Windows 没有 fcntl，改用 msvcrt 锁定锁文件的第一个字节
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Windows 上获取锁失败后重试的间隔（秒）
+LOCK_RETRY_INTERVAL = 0.05
+
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    # 跨进程的独占锁，阻塞直到获得；同一进程内的多个线程也通过它互斥
+    directory = os.path.dirname(lock_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(LOCK_RETRY_INTERVAL)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_text(path, text):
+    # 每个写入者使用唯一的临时文件，写完后原子替换，读取方不会看到写了一半的文件
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
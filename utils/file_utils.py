@@ -1,4 +1,5 @@
 import os
+import hashlib
 
 def get_file_size(file_path):
     return os.path.getsize(file_path)
@@ -7,6 +8,10 @@ def get_output_path(input_path):
     base, ext = os.path.splitext(input_path)
     return f"{base}_processed{ext}"
 
+def get_variant_output_path(input_path, index):
+    base, ext = os.path.splitext(input_path)
+    return f"{base}_processed_v{index}{ext}"
+
 def ensure_dir(file_path):
     directory = os.path.dirname(file_path)
     if not os.path.exists(directory):
@@ -15,3 +20,43 @@ def ensure_dir(file_path):
 def is_valid_video_file(file_path):
     valid_extensions = ('.mp4', '.avi', '.mov')
     return os.path.isfile(file_path) and file_path.lower().endswith(valid_extensions)
+
+
+def is_processed_output(file_path):
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    return name.endswith('_processed') or '_processed_v' in name
+
+
+def list_video_files(folder):
+    # 递归列出文件夹中的视频文件，跳过本程序生成的输出文件
+    video_files = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if is_valid_video_file(path) and not is_processed_output(path):
+                video_files.append(path)
+    return video_files
+
+
+def get_file_checksum(file_path, chunk_size=1024 * 1024):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def get_file_fingerprint(file_path, sample_size=1024 * 1024):
+    # 用文件大小、修改时间以及首尾内容的摘要标识输入文件，避免对整个大文件求哈希
+    stat = os.stat(file_path)
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        sha1.update(f.read(sample_size))
+        if stat.st_size > sample_size:
+            f.seek(max(sample_size, stat.st_size - sample_size))
+            sha1.update(f.read(sample_size))
+    return {
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+        "sample_sha1": sha1.hexdigest(),
+    }
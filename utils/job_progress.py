@@ -0,0 +1,63 @@
+import time
+
+
+class JobProgress:
+    # 按各阶段的预计耗时加权，把多个阶段的进度合并为一个整体进度
+    def __init__(self, stage_estimates):
+        # stage_estimates: [(阶段名, 预计秒数), ...]，按执行顺序排列
+        self.stages = [name for name, _ in stage_estimates]
+        self.estimates = {name: max(seconds, 1e-3) for name, seconds in stage_estimates}
+        total = sum(self.estimates.values())
+        self.weights = {name: seconds / total for name, seconds in self.estimates.items()}
+        self.fractions = {name: 0.0 for name in self.stages}
+        self.stage_started = {}
+        self.stage_elapsed = {}
+        self.current_stage = None
+
+    def start_stage(self, name):
+        self.current_stage = name
+        self.stage_started[name] = time.time()
+        self.fractions[name] = 0.0
+
+    def update(self, name, fraction):
+        if name not in self.fractions:
+            return self.overall_percent()
+        if name not in self.stage_started:
+            self.start_stage(name)
+        self.fractions[name] = min(max(fraction, 0.0), 1.0)
+        return self.overall_percent()
+
+    def finish_stage(self, name):
+        if name not in self.fractions:
+            return None
+        self.fractions[name] = 1.0
+        elapsed = time.time() - self.stage_started.get(name, time.time())
+        self.stage_elapsed[name] = elapsed
+        return elapsed
+
+    def overall_fraction(self):
+        return sum(self.weights[name] * self.fractions[name] for name in self.stages)
+
+    def overall_percent(self):
+        return int(self.overall_fraction() * 100)
+
+    def _speed_factor(self):
+        # 已完成阶段的实际耗时与预计耗时之比，用于校正后续阶段的预计时间
+        actual = 0.0
+        expected = 0.0
+        for name, elapsed in self.stage_elapsed.items():
+            if elapsed > 0:
+                actual += elapsed
+                expected += self.estimates[name]
+        name = self.current_stage
+        if name and name not in self.stage_elapsed and self.fractions[name] > 0.05:
+            actual += time.time() - self.stage_started[name]
+            expected += self.estimates[name] * self.fractions[name]
+        return actual / expected if expected > 0 else 1.0
+
+    def remaining_seconds(self):
+        factor = self._speed_factor()
+        remaining = 0.0
+        for name in self.stages:
+            remaining += self.estimates[name] * (1.0 - self.fractions[name]) * factor
+        return remaining
@@ -0,0 +1,160 @@
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+# 单个日志文件的大小上限和保留的历史文件数
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 5
+
+# 图形界面没有命令行参数，通过环境变量调整日志
+ENV_LOG_LEVEL = 'RANDFRAMEDEL_LOG_LEVEL'
+ENV_LOG_MODULES = 'RANDFRAMEDEL_LOG_MODULES'
+ENV_LOG_JSON = 'RANDFRAMEDEL_LOG_JSON'
+
+_listener = None
+
+
+class JsonLineFormatter(logging.Formatter):
+    # 每条日志一行 JSON，便于日志采集程序解析
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+            "process": record.process,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # 只在调用线程里合并消息参数和异常文本，格式化和写文件都交给监听线程
+    # 标准实现会在这里按默认格式整体格式化，JSON 格式就拿不到单独的字段
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_level(level):
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).strip().upper())
+    if not isinstance(value, int):
+        raise ValueError(f"未知的日志级别: {level}")
+    return value
+
+
+def parse_module_levels(spec):
+    # "processors=DEBUG,service.http_api=WARNING" -> {"processors": DEBUG, "service.http_api": WARNING}
+    levels = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, sep, level = item.partition('=')
+        if not sep or not name.strip():
+            raise ValueError(f"模块日志级别格式应为 模块=级别: {item}")
+        levels[name.strip()] = parse_level(level)
+    return levels
+
+
+def setup_logging(log_file=None, level=logging.INFO, module_levels=None, json_format=False, console=False,
+                  max_bytes=DEFAULT_LOG_MAX_BYTES, backup_count=DEFAULT_LOG_BACKUP_COUNT):
+    # 各线程只把日志记录放进内存队列，由监听线程格式化并写入按大小滚动的文件
+    global _listener
+    stop_logging()
+    formatter = JsonLineFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console or not handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        handlers.append(stream_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(parse_level(level))
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def setup_logging_from_env(log_file, default_level=logging.DEBUG):
+    # 环境变量格式错误时退回默认值，不影响程序启动
+    try:
+        level = parse_level(os.environ.get(ENV_LOG_LEVEL) or default_level)
+        module_levels = parse_module_levels(os.environ.get(ENV_LOG_MODULES))
+    except ValueError as e:
+        level, module_levels = default_level, {}
+        print(f"日志配置无效，使用默认设置: {str(e)}")
+    json_format = os.environ.get(ENV_LOG_JSON, '').lower() in ('1', 'true', 'yes')
+    return setup_logging(log_file, level, module_levels, json_format)
+
+
+class _ForwardHandler(logging.Handler):
+    # 把工作进程传回的日志记录交给本进程同名的 logger，和本进程的日志写到同一处
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def current_levels():
+    root = logging.getLogger()
+    module_levels = {name: logger.level for name, logger in root.manager.loggerDict.items()
+                     if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET}
+    return root.level, module_levels
+
+
+def setup_worker_logging(log_queue, level, module_levels):
+    # 工作进程的初始化函数：日志记录经跨进程队列交给主进程写入
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def forward_worker_logs(log_queue):
+    listener = logging.handlers.QueueListener(log_queue, _ForwardHandler())
+    listener.start()
+    return listener
+
+
+def stop_logging():
+    # 停止监听线程前会先写完队列中剩余的日志
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,82 @@
+import os
+import time
+import hashlib
+import logging
+
+import numpy as np
+
+# 元数据缓存的容量上限，超过后按最近使用时间淘汰
+DEFAULT_METADATA_BYTES = 256 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def get_default_metadata_dir():
+    return os.path.join(os.path.expanduser("~"), ".randframedel", "metadata")
+
+
+def fingerprint_key(input_fingerprint):
+    payload = f"{input_fingerprint['size']}|{input_fingerprint['mtime']}|{input_fingerprint['sample_sha1']}"
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class MetadataCache:
+    # 按输入文件指纹保存逐帧分析结果（NumPy 数组），文件内容不变时跨任务、跨进程复用
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_METADATA_BYTES):
+        self.cache_dir = cache_dir or get_default_metadata_dir()
+        self.max_bytes = max_bytes
+
+    def _path(self, input_fingerprint, name):
+        key = fingerprint_key(input_fingerprint)
+        return os.path.join(self.cache_dir, key[:2], f"{key}_{name}.npy")
+
+    def load(self, input_fingerprint, name):
+        path = self._path(input_fingerprint, name)
+        try:
+            array = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            if os.path.exists(path):
+                logger.warning(f"读取元数据缓存失败 {path}: {str(e)}")
+            return None
+        return array
+
+    def store(self, input_fingerprint, name, array):
+        path = self._path(input_fingerprint, name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"写入元数据缓存失败: {str(e)}")
+            return
+        self.prune()
+
+    def prune(self):
+        # 按访问时间从旧到新删除，直到总大小低于上限
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        started = time.time()
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        logger.info(f"元数据缓存已清理，用时 {time.time() - started:.2f} 秒")
@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+
+from utils.file_lock import file_lock, atomic_write_text
+
+# 缓存目录的默认容量上限（字节）
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024 * 1024
+# 分段缓存的默认容量上限（字节）
+DEFAULT_SEGMENT_CACHE_BYTES = 10 * 1024 * 1024 * 1024
+
+
+def get_default_cache_dir():
+    return os.path.join(os.path.expanduser("~"), ".randframedel", "output_cache")
+
+
+def get_default_segment_cache_dir():
+    return os.path.join(os.path.expanduser("~"), ".randframedel", "segment_cache")
+
+
+def make_segment_key(input_fingerprint, start_frame, end_frame, deleted_frames, render_params):
+    # 分段的内容只取决于输入、帧范围、范围内删除的帧和渲染参数，与其余部分的删除计划无关
+    payload = json.dumps({
+        "input": input_fingerprint,
+        "range": [start_frame, end_frame],
+        "deleted": sorted(deleted_frames),
+        "render": render_params,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_cache_key(input_fingerprint, plan, encoding_profile):
+    payload = json.dumps({
+        "input": input_fingerprint,
+        "plan": [[sec, sorted(frames)] for sec, frames in plan],
+        "profile": encoding_profile,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def link_or_copy(src_path, dest_path):
+    # 优先使用硬链接，跨设备等情况下退回到复制
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        shutil.copy2(src_path, dest_path)
+
+
+class OutputCache:
+    # 以（输入指纹, 删除计划, 编码参数）为键缓存处理结果，按最近使用时间淘汰
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+        # 同一缓存目录可能被多个任务线程、工作进程和服务进程同时使用，索引的读写都在文件锁内进行
+        self.lock_path = self.index_path + '.lock'
+        self.logger = logging.getLogger(__name__)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.warning(f"读取输出缓存索引失败: {str(e)}")
+            return {}
+
+    def _save_index(self, index):
+        atomic_write_text(self.index_path, json.dumps(index))
+
+    def _entry_path(self, key, entry):
+        return os.path.join(self.cache_dir, key + entry.get("ext", ""))
+
+    def lookup(self, key, dest_path):
+        with file_lock(self.lock_path):
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return False
+            cached_path = self._entry_path(key, entry)
+            if not os.path.exists(cached_path) or os.path.getsize(cached_path) != entry["size"]:
+                # 缓存文件丢失或被修改，删除该条目
+                self.logger.warning(f"输出缓存条目无效，已移除: {key}")
+                del index[key]
+                self._save_index(index)
+                return False
+            link_or_copy(cached_path, dest_path)
+            entry["last_used"] = time.time()
+            self._save_index(index)
+        self.logger.info(f"输出缓存命中: {key}")
+        return True
+
+    def store(self, key, src_path):
+        if not os.path.exists(src_path):
+            return
+        with file_lock(self.lock_path):
+            index = self._load_index()
+            entry = {
+                "ext": os.path.splitext(src_path)[1],
+                "size": os.path.getsize(src_path),
+                "last_used": time.time(),
+            }
+            if entry["size"] > self.max_bytes:
+                self.logger.info("输出文件超过缓存容量上限，不缓存")
+                return
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            link_or_copy(src_path, self._entry_path(key, entry))
+            index[key] = entry
+            self._evict(index)
+            self._save_index(index)
+        self.logger.info(f"已写入输出缓存: {key}")
+
+    def _evict(self, index):
+        total = sum(entry["size"] for entry in index.values())
+        for key, entry in sorted(index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            path = self._entry_path(key, entry)
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                self.logger.warning(f"删除缓存文件失败 {path}: {str(e)}")
+                continue
+            total -= entry["size"]
+            del index[key]
+            self.logger.info(f"输出缓存已淘汰: {key}")
+        self._sweep_orphans(index)
+
+    def _sweep_orphans(self, index):
+        # 删除不在索引中的文件：旧版本并发写索引时丢失的条目、中断的写入留下的临时文件
+        expected = {os.path.basename(self._entry_path(key, entry)) for key, entry in index.items()}
+        expected.update({os.path.basename(self.index_path), os.path.basename(self.lock_path)})
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name in expected or not os.path.isfile(path):
+                continue
+            try:
+                os.remove(path)
+                self.logger.info(f"已删除不在缓存索引中的文件: {name}")
+            except OSError as e:
+                self.logger.warning(f"删除缓存文件失败 {path}: {str(e)}")
@@ -0,0 +1,39 @@
+import subprocess
+import platform
+import logging
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+def popen_hidden(command, **kwargs):
+    # 在 Windows 上隐藏子进程的控制台窗口，其他系统直接启动
+    if platform.system() == "Windows":
+        kwargs.setdefault('creationflags', subprocess.CREATE_NO_WINDOW)
+    return subprocess.Popen(command, **kwargs)
+
+
+def kill_process_tree(process, timeout=0.1):
+    # 终止进程及其所有子进程，先 terminate，超时后 kill
+    if process is None or process.poll() is not None:
+        return
+    try:
+        parent = psutil.Process(process.pid)
+        procs = parent.children(recursive=True) + [parent]
+    except psutil.NoSuchProcess:
+        return
+    for proc in procs:
+        try:
+            proc.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    gone, alive = psutil.wait_procs(procs, timeout=timeout)
+    for proc in alive:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+    if alive:
+        psutil.wait_procs(alive, timeout=timeout)
+    logger.info(f"已终止进程树 {process.pid}（{len(procs)} 个进程）")
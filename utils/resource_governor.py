@@ -0,0 +1,107 @@
+import os
+import sys
+import logging
+import threading
+
+import cv2
+import psutil
+
+# 内存预算中留给帧队列的比例，其余留给解码器、编码器和音频
+FRAME_QUEUE_BUDGET_SHARE = 0.5
+# 内存预算中留给音频分块的比例
+AUDIO_CHUNK_BUDGET_SHARE = 0.05
+
+MIN_QUEUE_DEPTH = 2
+MAX_QUEUE_DEPTH = 64
+MIN_AUDIO_CHUNK_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _windows_priority_class(nice):
+    # Windows 没有 nice 值，按区间映射到进程优先级类别
+    if nice >= 15:
+        return psutil.IDLE_PRIORITY_CLASS
+    if nice > 0:
+        return psutil.BELOW_NORMAL_PRIORITY_CLASS
+    if nice < 0:
+        return psutil.ABOVE_NORMAL_PRIORITY_CLASS
+    return psutil.NORMAL_PRIORITY_CLASS
+
+
+class ResourceLimits:
+    # 单个任务的资源设置：线程上限、优先级（nice 值）和内存预算
+    # 各项为 None 时不做限制，保持原有行为
+    def __init__(self, max_threads=None, nice=None, memory_budget_mb=None):
+        self.max_threads = max_threads
+        self.nice = nice
+        self.memory_budget_mb = memory_budget_mb
+
+    def to_dict(self):
+        return {"max_threads": self.max_threads, "nice": self.nice, "memory_budget_mb": self.memory_budget_mb}
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(data.get("max_threads"), data.get("nice"), data.get("memory_budget_mb"))
+
+    @classmethod
+    def for_concurrent_jobs(cls, job_count, nice=None, memory_budget_mb=None):
+        # 多个任务共用一台机器时，平分 CPU 核心
+        cores = os.cpu_count() or 1
+        return cls(max(1, cores // max(1, job_count)), nice, memory_budget_mb)
+
+    def ffmpeg_args(self):
+        # 作为输出选项限制编码器（以及 x264/x265）的线程数
+        return ['-threads', str(self.max_threads)] if self.max_threads else []
+
+    def worker_count(self, requested):
+        # Python 线程池的大小不超过线程上限
+        if self.max_threads:
+            return max(1, min(requested, self.max_threads))
+        return max(1, requested)
+
+    def queue_depth(self, frame_shape, default):
+        # 按帧大小和内存预算计算帧队列长度；流水线另外持有两个缓冲区
+        if not self.memory_budget_mb:
+            return default
+        frame_bytes = 1
+        for size in frame_shape:
+            frame_bytes *= size
+        budget = self.memory_budget_mb * 1024 * 1024 * FRAME_QUEUE_BUDGET_SHARE
+        depth = int(budget // frame_bytes) - 2
+        return max(MIN_QUEUE_DEPTH, min(MAX_QUEUE_DEPTH, depth))
+
+    def audio_chunk_bytes(self, default):
+        if not self.memory_budget_mb:
+            return default
+        budget = int(self.memory_budget_mb * 1024 * 1024 * AUDIO_CHUNK_BUDGET_SHARE)
+        return max(MIN_AUDIO_CHUNK_BYTES, min(default, budget))
+
+    def apply_to_current_thread(self):
+        # OpenCV 的线程数对整个进程生效；nice 值在 Linux 上可以只作用于当前线程
+        if self.max_threads:
+            cv2.setNumThreads(self.max_threads)
+        if self.nice is None:
+            return
+        try:
+            if sys.platform.startswith('linux'):
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+            else:
+                self.apply_to_pid(os.getpid())
+        except (OSError, psutil.Error) as e:
+            logger.warning(f"设置处理线程优先级失败: {str(e)}")
+
+    def apply_to_pid(self, pid):
+        # 子进程（ffmpeg 等）启动后立即调整优先级，降低优先级不需要特殊权限
+        if self.nice is None:
+            return
+        try:
+            process = psutil.Process(pid)
+            if sys.platform == 'win32':
+                process.nice(_windows_priority_class(self.nice))
+            else:
+                process.nice(self.nice)
+        except psutil.Error as e:
+            logger.warning(f"设置进程 {pid} 的优先级失败: {str(e)}")
@@ -0,0 +1,178 @@
+import os
+import time
+import logging
+import threading
+
+import psutil
+
+# 默认采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 1.0
+# 时间线最多保留的采样数，超过后隔一个丢一个
+MAX_SAMPLES = 2000
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceSampler(threading.Thread):
+    # 定期采样任务所在进程及其整个子进程树（ffmpeg 等）的 CPU、内存、IO 和线程数，
+    # 同时单独统计登记过的处理线程的 CPU 占用；每个采样带有当时所处的处理阶段
+    # child_pids 返回任务自己启动的子进程，同一进程内并发多个任务时只统计本任务的子进程树
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, pid=None, on_sample=None, child_pids=None):
+        super().__init__(name="resource-sampler", daemon=True)
+        self.interval = interval
+        self.on_sample = on_sample
+        self.child_pids = child_pids
+        self.root = psutil.Process(pid or os.getpid())
+        self.samples = []
+        self.stage = ""
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._io_totals = {}
+        self._thread_ids = set()
+        self._thread_times = None
+        self._start_time = None
+        self._last_time = None
+
+    def set_stage(self, stage):
+        self.stage = stage
+
+    def track_current_thread(self):
+        self._thread_ids.add(threading.get_native_id())
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        self._start_time = time.time()
+        self._prime()
+        while not self._stop_event.wait(self.interval):
+            try:
+                sample = self.sample()
+            except psutil.Error as e:
+                logger.debug(f"资源采样失败: {str(e)}")
+                continue
+            with self._lock:
+                self.samples.append(sample)
+                if len(self.samples) > MAX_SAMPLES:
+                    self.samples = self.samples[::2]
+            if self.on_sample is not None:
+                self.on_sample(sample)
+
+    def _process_tree(self):
+        children = []
+        if self.child_pids is None:
+            try:
+                children = self.root.children(recursive=True)
+            except psutil.Error:
+                pass
+        else:
+            for pid in self.child_pids():
+                try:
+                    child = psutil.Process(pid)
+                    children.append(child)
+                    children.extend(child.children(recursive=True))
+                except psutil.Error:
+                    # 子进程已退出
+                    continue
+        tree = []
+        for process in [self.root] + children:
+            # 复用 Process 对象，cpu_percent 才能计算两次采样之间的占用
+            cached = self._processes.setdefault(process.pid, process)
+            tree.append(cached)
+        return tree
+
+    def _prime(self):
+        for process in self._process_tree():
+            try:
+                process.cpu_percent(None)
+            except psutil.Error:
+                pass
+        self._thread_times = self._tracked_thread_time()
+        self._last_time = time.time()
+
+    def _tracked_thread_time(self):
+        if not self._thread_ids:
+            return 0.0
+        try:
+            return sum(thread.user_time + thread.system_time for thread in self.root.threads()
+                       if thread.id in self._thread_ids)
+        except (psutil.Error, AttributeError):
+            return 0.0
+
+    def sample(self):
+        now = time.time()
+        cpu_percent = 0.0
+        rss = 0
+        threads = 0
+        tree = self._process_tree()
+        alive = 0
+        for process in tree:
+            try:
+                with process.oneshot():
+                    cpu_percent += process.cpu_percent(None)
+                    rss += process.memory_info().rss
+                    threads += process.num_threads()
+                    try:
+                        io = process.io_counters()
+                        # 子进程退出后保留其最后的 IO 计数，累计值不会回退
+                        self._io_totals[process.pid] = (io.read_bytes, io.write_bytes)
+                    except (AttributeError, psutil.AccessDenied):
+                        pass
+                alive += 1
+            except psutil.NoSuchProcess:
+                self._processes.pop(process.pid, None)
+
+        thread_time = self._tracked_thread_time()
+        elapsed = max(now - self._last_time, 1e-6)
+        thread_cpu = max(0.0, (thread_time - self._thread_times) / elapsed * 100)
+        self._thread_times = thread_time
+        self._last_time = now
+
+        return {
+            "t": round(now - self._start_time, 2),
+            "stage": self.stage,
+            "cpu_percent": round(cpu_percent, 1),
+            "thread_cpu_percent": round(thread_cpu, 1),
+            "rss_mb": round(rss / (1024 * 1024), 1),
+            "read_mb": round(sum(read for read, _ in self._io_totals.values()) / (1024 * 1024), 1),
+            "write_mb": round(sum(write for _, write in self._io_totals.values()) / (1024 * 1024), 1),
+            "threads": threads,
+            "processes": alive,
+        }
+
+    def timeline(self):
+        with self._lock:
+            return list(self.samples)
+
+    def summary(self):
+        # 按阶段汇总：平均/峰值 CPU、峰值内存和阶段内的 IO 量
+        samples = self.timeline()
+        stages = {}
+        previous = None
+        for sample in samples:
+            entry = stages.setdefault(sample["stage"] or "-", {
+                "samples": 0, "cpu_total": 0.0, "peak_cpu_percent": 0.0, "peak_rss_mb": 0.0,
+                "read_mb": 0.0, "write_mb": 0.0, "peak_threads": 0,
+            })
+            entry["samples"] += 1
+            entry["cpu_total"] += sample["cpu_percent"]
+            entry["peak_cpu_percent"] = max(entry["peak_cpu_percent"], sample["cpu_percent"])
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], sample["rss_mb"])
+            entry["peak_threads"] = max(entry["peak_threads"], sample["threads"])
+            if previous is not None:
+                entry["read_mb"] += max(0.0, sample["read_mb"] - previous["read_mb"])
+                entry["write_mb"] += max(0.0, sample["write_mb"] - previous["write_mb"])
+            previous = sample
+        for entry in stages.values():
+            entry["avg_cpu_percent"] = round(entry.pop("cpu_total") / entry["samples"], 1)
+            entry["read_mb"] = round(entry["read_mb"], 1)
+            entry["write_mb"] = round(entry["write_mb"], 1)
+        return {
+            "interval": self.interval,
+            "peak_cpu_percent": max((sample["cpu_percent"] for sample in samples), default=0.0),
+            "peak_rss_mb": max((sample["rss_mb"] for sample in samples), default=0.0),
+            "stages": stages,
+        }
@@ -0,0 +1,26 @@
+import threading
+
+
+class Signal:
+    # 与 pyqtSignal 的 connect/emit 用法一致的回调列表，供不依赖 Qt 的处理核心使用
+    # 回调在调用 emit 的线程中同步执行
+    def __init__(self):
+        self._slots = []
+        self._lock = threading.Lock()
+
+    def connect(self, slot):
+        with self._lock:
+            self._slots.append(slot)
+
+    def disconnect(self, slot=None):
+        with self._lock:
+            if slot is None:
+                self._slots.clear()
+            elif slot in self._slots:
+                self._slots.remove(slot)
+
+    def emit(self, *args):
+        with self._lock:
+            slots = list(self._slots)
+        for slot in slots:
+            slot(*args)
@@ -0,0 +1,24 @@
+import os
+
+import psutil
+
+# 单个处理任务大致占用的 CPU 核心数和内存（解码、编码线程以及帧队列）
+CORES_PER_JOB = 2
+MEMORY_PER_JOB = 1536 * 1024 * 1024
+
+# 并发任务数上限，超过后磁盘 IO 成为瓶颈
+MAX_CONCURRENT_JOBS = 8
+
+
+def recommended_worker_count():
+    # 根据 CPU 核心数和可用内存估算可以同时运行的处理任务数
+    cores = os.cpu_count() or 1
+    available_memory = psutil.virtual_memory().available
+    by_cpu = cores // CORES_PER_JOB
+    by_memory = available_memory // MEMORY_PER_JOB
+    return int(max(1, min(by_cpu, by_memory, MAX_CONCURRENT_JOBS)))
+
+
+def recommended_probe_count():
+    # 分析主要在等待 ffprobe，可以比处理任务开得更多
+    return max(2, min(8, os.cpu_count() or 1))
@@ -0,0 +1,96 @@
+import os
+import json
+import logging
+import threading
+
+from utils.file_lock import file_lock, atomic_write_text
+
+# 各处理阶段在没有历史数据时的默认吞吐量（帧/秒）
+DEFAULT_STAGE_FPS = {
+    "analysis": 600.0,
+    "video": 120.0,
+    "audio": 3000.0,
+    "merge": 150.0,
+}
+
+# 新测量值在滑动平均中所占的权重
+SMOOTHING = 0.3
+
+
+def get_default_store_path():
+    return os.path.join(os.path.expanduser("~"), ".randframedel", "throughput.json")
+
+
+def make_throughput_key(resolution, codec):
+    return f"{resolution or 'unknown'}|{codec or 'unknown'}"
+
+
+class ThroughputStore:
+    def __init__(self, store_path=None):
+        self.store_path = store_path or get_default_store_path()
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._data = self._load()
+        # 本实例记录、尚未写入文件的测量值，保存时合并到文件中的最新记录上
+        self._pending = []
+
+    def _load(self):
+        try:
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.warning(f"读取吞吐量记录失败: {str(e)}")
+            return {}
+
+    def save(self):
+        # 多个任务（线程或进程）会同时保存：在文件锁内重新读取并合并本实例的测量值，避免互相覆盖
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            with file_lock(self.store_path + '.lock'):
+                data = self._load()
+                for key, stage, fps in pending:
+                    self._apply(data, key, stage, fps)
+                atomic_write_text(self.store_path, json.dumps(data, ensure_ascii=False, indent=2))
+            with self._lock:
+                for key, stage, fps in self._pending:
+                    self._apply(data, key, stage, fps)
+                self._data = data
+        except Exception as e:
+            self.logger.warning(f"保存吞吐量记录失败: {str(e)}")
+
+    @staticmethod
+    def _apply(data, key, stage, fps):
+        stages = data.setdefault(key, {})
+        entry = stages.get(stage)
+        if entry:
+            entry["fps"] = entry["fps"] * (1 - SMOOTHING) + fps * SMOOTHING
+            entry["samples"] = entry.get("samples", 0) + 1
+        else:
+            stages[stage] = {"fps": fps, "samples": 1}
+
+    def get_stage_fps(self, resolution, codec, stage):
+        key = make_throughput_key(resolution, codec)
+        with self._lock:
+            entry = self._data.get(key, {}).get(stage)
+        if entry:
+            return entry["fps"]
+        return DEFAULT_STAGE_FPS.get(stage, DEFAULT_STAGE_FPS["video"])
+
+    def record(self, resolution, codec, stage, frames, elapsed):
+        if frames <= 0 or elapsed <= 0:
+            return
+        fps = frames / elapsed
+        key = make_throughput_key(resolution, codec)
+        with self._lock:
+            self._apply(self._data, key, stage, fps)
+            self._pending.append((key, stage, fps))
+        self.logger.info(f"记录吞吐量 {key} {stage}: {fps:.1f} 帧/秒")
+
+    def estimate_stage_seconds(self, resolution, codec, stages, frame_count):
+        return {stage: frame_count / self.get_stage_fps(resolution, codec, stage) for stage in stages}
@@ -0,0 +1,121 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+# 内存中最多保留的缩略图数量和总字节数
+DEFAULT_MEMORY_ITEMS = 512
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+# 磁盘缓存的容量上限，超过后按最近使用时间淘汰
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+# 每写入多少个文件检查一次磁盘缓存容量
+PRUNE_EVERY = 200
+
+logger = logging.getLogger(__name__)
+
+
+def get_default_thumbnail_dir():
+    return os.path.join(os.path.expanduser("~"), ".randframedel", "thumbnails")
+
+
+def make_thumbnail_key(input_fingerprint, frame_index, height):
+    payload = f"{input_fingerprint['size']}|{input_fingerprint['mtime']}|{input_fingerprint['sample_sha1']}"
+    return f"{hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]}_{frame_index}_{height}"
+
+
+class ThumbnailCache:
+    # 两级缓存：内存中按最近使用顺序保存编码后的 JPEG 数据，条数和字节数都有上限；
+    # 可选的磁盘层保存淘汰出内存的缩略图，重新打开同一个文件时不必再次解码
+    def __init__(self, max_items=DEFAULT_MEMORY_ITEMS, max_bytes=DEFAULT_MEMORY_BYTES, disk_dir=None,
+                 max_disk_bytes=DEFAULT_DISK_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.jpg")
+
+    def _remember(self, key, data):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._items and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                return data
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"写入缩略图缓存失败: {str(e)}")
+            return
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune_disk()
+
+    def prune_disk(self):
+        # 按访问时间从旧到新删除，直到总大小低于上限
+        if self.disk_dir is None or not os.path.isdir(self.disk_dir):
+            return
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_disk_bytes:
+            return
+        started = time.time()
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        logger.info(f"缩略图缓存已清理，用时 {time.time() - started:.2f} 秒")